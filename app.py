@@ -1,5 +1,5 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, send_from_directory
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import os
 import subprocess
 import serial.tools.list_ports
@@ -8,7 +8,6 @@ import time
 import json
 import socket
 from werkzeug.utils import secure_filename
-from queue import Queue
 import cv2
 try:
     import pyaudio
@@ -28,6 +27,64 @@ from firmware_validator import FirmwareValidator
 # Import HTTP video streamer
 from http_video_streamer import initialize_http_video_streaming, get_http_video_streamer
 
+# Import compiled serial matchers
+from serial_analysis import extract_commands, DEFAULT_PATTERN_TTL, DEFAULT_PATTERN_CAPACITY
+
+# Import indexed hub control registry
+from hub_control_registry import HubControlRegistry, control_port
+
+# Import reader control history
+from control_history import ControlHistoryStore, DEFAULT_HISTORY_POINTS
+
+# Import serial output batching
+from serial_streaming import SerialBatcher, ControlValuePublisher, DEFAULT_BATCH_WINDOW_MS, DEFAULT_BATCH_MAX_LINES
+from serial_streaming import DEFAULT_SCROLLBACK_LINES, DEFAULT_SCROLLBACK_PAGE
+
+# Import serial line framing
+from serial_framing import DEFAULT_MAX_LINE_LENGTH
+
+# Import event-driven serial reader
+from serial_reader import SerialPortReader, READ_MODES
+
+# Import per-port serial sessions
+from serial_sessions import SerialSession, SerialSessionManager
+
+# Import staged serial analysis pipeline
+from serial_pipeline import SerialPipeline, DEFAULT_STAGE_CAPACITY, DEFAULT_SHED_THRESHOLD, OVERFLOW_DROP_OLDEST
+
+# Import on-disk serial session recording
+from serial_log import SerialLogStore, DEFAULT_LOG_LIMIT
+
+# Import serial baud rate auto-detection
+from serial_autobaud import BaudDetector, COMMON_BAUD_RATES, DEFAULT_AUTOBAUD_BUDGET
+
+# Import TCP / RFC 2217 serial bridge
+from serial_bridge import SerialBridge, DEFAULT_BRIDGE_HOST, BRIDGE_MODE_RFC2217
+
+# Import coalescing serial write scheduler
+from serial_writer import DEFAULT_CONTROL_RATE_HZ
+
+# Import binary telemetry framing
+from serial_telemetry import create_telemetry_decoder
+
+# Import timed command sequencer
+from serial_sequencer import SequenceManager, parse_steps
+
+# Import closed-loop control rules
+from control_rules import ControlRuleEngine
+
+# Import binary audio framing
+from audio_frames import pack_audio_frame
+
+# Import audio codec stage
+from audio_codecs import create_audio_encoder, available_codecs, DEFAULT_AUDIO_CODEC
+
+# Import callback-driven audio capture
+from audio_capture import AudioCapture
+
+# Import cached audio device inventory
+from audio_devices import AudioDeviceInventory
+
 app = Flask(__name__, template_folder='page')
 app.config['UPLOAD_FOLDER'] = '.'
 app.config['ALLOWED_EXTENSIONS'] = {'hex', 'bin'}
@@ -36,6 +93,10 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # Initialize SocketIO
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
+# Coalesces reader values into 'hub_control_values' at a fixed UI rate
+control_value_publisher = ControlValuePublisher(socketio)
+control_value_publisher.start()
+
 # Initialize logic analyzer (moved after socketio initialization)
 logic_analyzer_manager = None
 
@@ -45,12 +106,15 @@ firmware_validator = None
 # Global variables for audio and serial streaming
 # Note: video_capture and video_streaming_active moved to HTTPVideoStreamer class
 audio_stream = None
-serial_connection = None
 audio_streaming_active = False
-serial_monitoring_active = False
+serial_sessions = SerialSessionManager()  # One session (connection, reader, room) per monitored port
 
-# Non-blocking queue for audio to prevent emit() blocking
-audio_data_queue = Queue(maxsize=1)  # Keep only 1 buffer max to minimize latency and prevent accumulation
+audio_codec = DEFAULT_AUDIO_CODEC  # Applied to every listener - each frame is encoded once
+audio_encoder = None  # Only touched by the audio dispatcher thread
+# PortAudio callback -> ring buffer -> one dispatcher thread that encodes and emits
+audio_capture = None
+# Working input devices, probed at startup and after hotplug - the slow open-and-read scan is off the request path
+audio_devices = AudioDeviceInventory(lambda in_use: check_audio_devices(in_use)[1])
 
 # Device configurations
 ARDUINO_IDS = {'2341', '2a03', '1a86'}
@@ -58,16 +122,26 @@ ESP32_IDS = {'10c4', '303a'}
 FT232_IDS = {'0403'}  # FTDI VID for FT232 USB to UART adapters
 USBASP_IDS={'16c0:05dc'}
 ESP_BAUD = "460800"
+SERIAL_MAX_LINE_LENGTH = DEFAULT_MAX_LINE_LENGTH  # Longer lines are flushed in pieces
+SERIAL_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serial_logs')
+serial_log_store = SerialLogStore(SERIAL_LOG_DIR)  # Recorded serial output served by /serial/log
+baud_detector = BaudDetector()  # Auto-baud results cached per port and USB serial number
+sequence_manager = SequenceManager()  # Server-timed command sequences started through /hub/sequences
 
 # Global variables for terminal output
 terminal_output = []
 upload_in_progress = False
 
 # Global variables for hub controls
-hub_controls = []
-hub_controls_lock = threading.Lock()  # Thread safety for hub control modifications
+# Indexed by id and name; all mutations go through its lock. A reader's history is dropped when
+# its template changes, so values matched by the old template don't mix into the new series
+hub_controls = HubControlRegistry(on_template_change=lambda control_id: control_history.remove(control_id))
 control_values = {}
-serial_value_patterns = {}
+control_history = ControlHistoryStore()  # Per-reader time series served by /hub/controls/<id>/history
+# Rules on reader values, evaluated where values are parsed - actions run via execute_rule_action,
+# and a definition only goes live once check_rule_controls accepts it
+control_rules = ControlRuleEngine(lambda rule, action, session: execute_rule_action(rule, action, session),
+                                  lambda rule: check_rule_controls(rule))
 deleted_reader_controls = set()  # Track permanently deleted reader control names (prevent auto-recreation)
 deleted_reader_controls_lock = threading.Lock()  # Thread safety for deleted controls tracking
 
@@ -114,156 +188,73 @@ def detect_control_type(value_name, context=""):
             'command_template': '{value}'
         }
 
-def analyze_serial_data_for_controls(data):
-    """Analyze serial data to detect potential control values and commands"""
-    global serial_value_patterns
-    import re
-
-
+def analyze_serial_data_for_controls(data, session):
+    """Analyze serial data from one session to detect potential control values and commands"""
+    serial_value_patterns = session.value_patterns
 
     # First, check any existing Reader controls that have a command_template set
     # and try to parse the incoming data using that template. This allows
     # patterns like 'Test={value}RPM' or '{value}RPM' to be matched against
     # serial lines such as '3RPM' or 'Test=3RPM'.
     detected_values = {}
-    detected_commands = set()
 
     try:
-        for control in hub_controls:
-            try:
-                if control.get('type') == 'reader':
-                    tmpl = control.get('config', {}).get('command_template')
-                    if tmpl and '{value}' in tmpl:
-                        # Convert the template into a permissive regex:
-                        # - replace {value} first before escaping
-                        # - escape literal characters
-                        # - allow optional whitespace around separators like '=' or ':'
-                        # Replace {value} placeholder first
-                        tmpl_pattern = tmpl.replace('{value}', '<<<VALUE>>>')
-                        # Escape special regex characters
-                        tmpl_escaped = re.escape(tmpl_pattern)
-                        # Replace the placeholder with numeric capture
-                        tmpl_escaped = tmpl_escaped.replace('<<<VALUE>>>', r'([+-]?\d*\.?\d+)')
-                        # Allow optional whitespace around = or :
-                        tmpl_escaped = tmpl_escaped.replace(r'\=', r'\s*=\s*')
-                        tmpl_escaped = tmpl_escaped.replace(r'\:', r'\s*:\s*')
-                        # Replace escaped spaces with flexible whitespace
-                        tmpl_escaped = tmpl_escaped.replace(r'\ ', r'\s+')
-
-                        try:
-                            m = re.search(tmpl_escaped, data, re.IGNORECASE)
-                        except re.error:
-                            m = None
-
-                        if m:
-                            try:
-                                num = float(m.group(1))
-                                detected_values[control['name']] = {
-                                    'name': control['name'],
-                                    'value': num,
-                                    'count': 1,
-                                    'last_seen': time.time()
-                                }
-                                
-                                # Only update the control value if NOT awaiting confirmation
-                                # This prevents auto-updates while user is still configuring the pattern
-                                if not control.get('awaiting_confirmation', False):
-                                    update_control_value(control['id'], num)
-                                    # Emit update to frontend with full control config
-                                    control_copy = control.copy()
-                                    control_copy['current_value'] = num
-                                    socketio.emit('hub_control_updated', {'control': control_copy})
-                            except ValueError:
-                                pass
-            except Exception:
-                # Ignore individual control parsing errors
+        # Templates are compiled once and evaluated in a single combined scan;
+        # the registry is rebuilt only after a control is created, updated or deleted
+        for control, raw_value in hub_controls.match_readers(data):
+            # Only controls bound to this port (or to whichever port is active) read its lines
+            if control_port(control) not in ('auto', session.port):
                 continue
+            try:
+                num = float(raw_value)
+                detected_values[control['name']] = {
+                    'name': control['name'],
+                    'value': num,
+                    'count': 1,
+                    'last_seen': time.time()
+                }
+
+                # Only update the control value if NOT awaiting confirmation
+                # This prevents auto-updates while user is still configuring the pattern
+                if not control.get('awaiting_confirmation', False):
+                    update_control_value(control['id'], num)
+                    control_history.record(control['id'], num)
+                    # Latest value wins - flushed to the frontend at the UI rate, config is not resent
+                    control_value_publisher.record(control['id'], num)
+                    # Closed-loop rules react on this thread, within the line that carried the value
+                    control_rules.observe(control['id'], num, session)
+            except ValueError:
+                pass
     except Exception:
         # If template-based parsing fails for any reason, continue to generic parsing
         detected_values = {}
 
-    # Patterns to detect value assignments and readings (generic fallbacks)
-    patterns = [
-        # Variable assignments: var = value
-        r'([a-zA-Z_][a-zA-Z0-9_]*)\s*[:=]\s*([+-]?\d*\.?\d+)',
-        # Labeled values: label: value
-        r'([a-zA-Z_][a-zA-Z0-9_]*)\s*:\s*([+-]?\d*\.?\d+)',
-        # Function calls with values: func(value)
-        r'([a-zA-Z_][a-zA-Z0-9_]*)\s*\(\s*([+-]?\d*\.?\d+)\s*\)',
-        # JSON-like: "key": value
-        r'"([a-zA-Z_][a-zA-Z0-9_]*)"\s*:\s*([+-]?\d*\.?\d+)',
-        # Value followed by unit/label without separator: 123RPM or 50Speed
-        r'([+-]?\d*\.?\d+)\s*([A-Za-z_][A-Za-z0-9_]*)'
-    ]
-
-    # Patterns to detect command options from help text
-    command_patterns = [
-        # "Enter 'on' to turn LED on, 'off' to turn LED off"
-        r"'([a-zA-Z0-9_]+)'\s*(?:\w+\s+)*([a-zA-Z0-9_]+)",
-        # "Use 'on' or 'off'"
-        r"'([a-zA-Z0-9_]+)'\s*or\s*'([a-zA-Z0-9_]+)'",
-        # "Commands: on, off"
-        r"(?:commands?|options?)\s*:\s*([a-zA-Z0-9_,\s]+)",
-        # Single quoted commands
-        r"'([a-zA-Z0-9_]+)'",
-    ]
-
-    # Detect command options from help text
-    for pattern in command_patterns:
-        matches = re.findall(pattern, data, re.IGNORECASE)
-        for match in matches:
-            if isinstance(match, tuple):
-                # Multiple commands in one match
-                for cmd in match:
-                    cmd = cmd.strip()
-                    if cmd and len(cmd) > 0:
-                        detected_commands.add(cmd.lower())
-            else:
-                # Single command
-                cmd = match.strip()
-                if cmd and len(cmd) > 0:
-                    detected_commands.add(cmd.lower())
+    # Detect command options from help text - one cheap scan for telemetry lines
+    detected_commands = extract_commands(data)
 
-    # Update global patterns and auto-update Reader controls
+    # Update session patterns and auto-update Reader controls
     for var_name, info in detected_values.items():
-        if var_name not in serial_value_patterns:
-            serial_value_patterns[var_name] = info
-        else:
-            serial_value_patterns[var_name].update(info)
+        serial_value_patterns.update(var_name, info)
 
         # Auto-update Reader controls with detected values (only if not awaiting confirmation)
-        for control in hub_controls:
-            if control['type'] == 'reader' and control['name'].lower() == var_name.lower():
-                # Only update if NOT awaiting user confirmation of the command pattern
-                if not control.get('awaiting_confirmation', False):
-                    # Update the control value
-                    update_control_value(control['id'], info['value'])
-                    # Emit update to frontend with full control config
-                    control_copy = control.copy()
-                    control_copy['current_value'] = info['value']
-                    socketio.emit('hub_control_updated', {'control': control_copy})
-
-    # Store detected commands globally
-    if not hasattr(analyze_serial_data_for_controls, 'detected_commands'):
-        analyze_serial_data_for_controls.detected_commands = set()
-
-    analyze_serial_data_for_controls.detected_commands.update(detected_commands)
-
-    # Clean up old patterns (older than 30 seconds)
-    current_time = time.time()
-    to_remove = []
-    for var_name, info in serial_value_patterns.items():
-        if current_time - info.get('last_seen', 0) > 30:
-            to_remove.append(var_name)
+        for control in hub_controls.readers_named(var_name):
+            if control_port(control) not in ('auto', session.port):
+                continue
+            # Only update if NOT awaiting user confirmation of the command pattern
+            if not control.get('awaiting_confirmation', False):
+                # Update the control value
+                update_control_value(control['id'], info['value'])
+                control_value_publisher.record(control['id'], info['value'])
 
-    for var_name in to_remove:
-        del serial_value_patterns[var_name]
+    # Store detected commands per session - newly discovered ones are queued for the next emit
+    session.command_tracker.observe(detected_commands)
 
-    return list(serial_value_patterns.keys())
+    # Drop patterns not seen within the TTL - only the oldest entries are inspected
+    return serial_value_patterns.expire(time.time())
 
 def create_hub_control(value_name, device_info=None, control_type=None):
     """Create a hub control for a detected value - thread-safe"""
-    global hub_controls, deleted_reader_controls, hub_controls_lock, deleted_reader_controls_lock
+    global hub_controls, deleted_reader_controls, deleted_reader_controls_lock
 
     # Validate input
     if not value_name or not isinstance(value_name, str):
@@ -288,11 +279,11 @@ def create_hub_control(value_name, device_info=None, control_type=None):
             return None
 
     # Thread-safe check and creation
-    with hub_controls_lock:
+    with hub_controls.lock:
         # Check if control already exists
-        for control in hub_controls:
-            if control['name'] == value_name:
-                return control
+        existing = hub_controls.find_by_name(value_name)
+        if existing:
+            return existing
 
         # Use provided type or detect control type
         if control_type:
@@ -333,8 +324,7 @@ def create_hub_control(value_name, device_info=None, control_type=None):
         if control_config['type'] == 'reader':
             control['awaiting_confirmation'] = True
 
-        hub_controls.append(control)
-        return control
+        return hub_controls.add(control)
 
 def update_control_value(control_id, value):
     """Update the value of a control"""
@@ -348,31 +338,65 @@ def get_control_value(control_id):
     """Get the current value of a control"""
     return control_values.get(control_id, {}).get('value')
 
+def build_control_command(control, value):
+    """Serial line that sets a control to a value"""
+    # For toggle controls, send the value directly (no template)
+    if control['type'] == 'toggle':
+        return str(value)
+    # For sliders and other controls, use command template
+    return control['config']['command_template'].replace('{value}', str(value))
+
+def execute_rule_action(rule, action, session):
+    """Perform a rule's action - written immediately, ahead of queued writes, on the calling thread"""
+    if 'control' in action:
+        control = hub_controls.get(action['control'])
+        if not control:
+            raise ValueError(f"unknown control '{action['control']}'")
+        value = action.get('value')
+        if 'step' in action:
+            # Relative setpoint change from the control's last value
+            value = (get_control_value(control['id']) or 0) + action['step']
+        target = serial_sessions.resolve(control_port(control)) or session
+        line = build_control_command(control, value)
+    else:
+        control, value = None, None
+        target = serial_sessions.resolve(action['port']) if action.get('port') else session
+        line = action['line']
+    if not target or not target.is_open():
+        raise ValueError('no open serial session for the action')
+
+    target.writer.send_now(line)
+    if control:
+        update_control_value(control['id'], value)
+    socketio.emit('hub_rule_fired', {
+        'id': rule.id,
+        'name': rule.name,
+        'value': rule.last_value,
+        'line': line,
+        'port': target.port,
+        'control_id': control['id'] if control else None,
+        'control_value': value,
+        'timestamp': time.time()
+    })
+
 def send_control_command(control_id, value):
     """Send a control command via serial"""
-    global serial_connection, hub_controls
+    global hub_controls
 
-    # Find the control
-    control = None
-    for c in hub_controls:
-        if c['id'] == control_id:
-            control = c
-            break
+    # Find the control and the session its device is bound to
+    control = hub_controls.get(control_id)
+    if not control:
+        return False
 
-    if not control or not serial_connection or not serial_connection.is_open:
+    session = serial_sessions.resolve(control_port(control))
+    if not session or not session.is_open():
         return False
 
     try:
-        # For toggle controls, send the value directly (no template)
-        if control['type'] == 'toggle':
-            command = str(value)
-        else:
-            # For sliders and other controls, use command template
-            command_template = control['config']['command_template']
-            command = command_template.replace('{value}', str(value))
+        command = build_control_command(control, value)
 
-        # Send command
-        serial_connection.write((command + '\n').encode('utf-8'))
+        # Queue command - a newer value for the same control replaces one not yet written
+        session.writer.send_control(control_id, command)
 
         # Update control value
         update_control_value(control_id, value)
@@ -384,8 +408,11 @@ def send_control_command(control_id, value):
 # Video capture initialization moved to HTTPVideoStreamer class in http_video_streamer.py
 # Use get_http_video_streamer().start_streaming() instead
 
-def check_audio_devices():
-    """Check if physical audio input devices are available and actually working"""
+def check_audio_devices(in_use=()):
+    """
+    Check if physical audio input devices are available and actually working
+    Devices named in `in_use` are held by our own stream - listed without opening them again
+    """
     if not PYAUDIO_AVAILABLE:
         return False, []
 
@@ -402,6 +429,10 @@ def check_audio_devices():
                 if any(skip_name in device_name for skip_name in ['pipewire', 'pulse', 'null', 'default', 'dummy']):
                     continue
 
+                if device_info.get('name') in in_use:
+                    working_devices.append(device_info)
+                    continue
+
                 if device_info.get('maxInputChannels') > 0:
                     # Test if device actually works by trying to read data
                      try:
@@ -443,55 +474,52 @@ def check_audio_devices():
 
 def initialize_audio_stream():
     """Initialize audio capture"""
-    global audio_stream
+    global audio_stream, audio_capture
 
     if not PYAUDIO_AVAILABLE:
         return False
 
-    # First check if audio devices are available
-    devices_available, device_list = check_audio_devices()
+    # Cached inventory, preferred (last working) device first
+    devices_available, device_list = audio_devices.get()
     if not devices_available:
         return False
 
     try:
         audio = pyaudio.PyAudio()
 
-        # Try to find a working input device
-        input_device_index = None
+        # Use optimized settings for cleaner audio - balance quality vs performance
+        SAMPLE_RATE = 44100  # Standard CD quality, more compatible and less bandwidth
+        FRAMES_PER_BUFFER = 4096  # Larger buffer (93ms) reduces jitter and network overhead
+        # The callback only copies into the ring; the dispatcher wakes once per frame to encode and emit
+        capture = AudioCapture(SAMPLE_RATE, FRAMES_PER_BUFFER, dispatch_audio_frame,
+                               is_alive=lambda: bool(audio_stream and audio_stream.is_active()))
+
+        # The inventory already proved these devices work - open the stream itself, no test open first
+        stream = None
         for device in device_list:
             try:
-                # Test if we can open this device
-                test_stream = audio.open(
+                stream = audio.open(
                     format=pyaudio.paInt16,
                     channels=1,
-                    rate=44100,
+                    rate=SAMPLE_RATE,  # Consistent sample rate throughout pipeline
                     input=True,
                     input_device_index=int(device['index']),
-                    frames_per_buffer=1024
+                    frames_per_buffer=FRAMES_PER_BUFFER,  # Larger buffer for better stability
+                    stream_callback=capture.callback  # PortAudio's thread delivers buffers - no blocking reads
                 )
-                test_stream.close()
-                input_device_index = int(device['index'])
-
+                audio_devices.mark_working(device)
                 break
             except Exception as e:
                 continue
 
-        if input_device_index is None:
+        if stream is None:
+            # Every cached device failed - the inventory is stale
             audio.terminate()
+            audio_devices.invalidate()
             return False
 
-        # Use optimized settings for cleaner audio - balance quality vs performance
-        SAMPLE_RATE = 44100  # Standard CD quality, more compatible and less bandwidth
-        FRAMES_PER_BUFFER = 4096  # Larger buffer (93ms) reduces jitter and network overhead
-        audio_stream = audio.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=SAMPLE_RATE,  # Consistent sample rate throughout pipeline
-            input=True,
-            input_device_index=input_device_index,
-            frames_per_buffer=FRAMES_PER_BUFFER,  # Larger buffer for better stability
-            stream_callback=None  # Use blocking mode for consistent timing
-        )
+        audio_stream = stream
+        audio_capture = capture
         return True
     except Exception as e:
         # Make sure to clean up any partial audio objects
@@ -503,135 +531,211 @@ def initialize_audio_stream():
         return False
 
 def initialize_serial_connection(port, baudrate=9600):
-    """Initialize serial connection for monitoring"""
-    global serial_connection
+    """Open a serial connection for monitoring; returns the connection or None"""
     try:
         import serial
-        serial_connection = serial.Serial(port, baudrate, timeout=1)
-        return True
+        return serial.Serial(port, baudrate, timeout=1)
     except Exception as e:
-        return False
+        return None
 
 # MJPEG frame generation now handled by http_video_streamer module
 
 
-def audio_stream_thread():
-    """Thread for audio streaming - non-blocking with queue"""
-    global audio_stream, audio_streaming_active, audio_data_queue
-    if not PYAUDIO_AVAILABLE or not audio_stream:
-        return
-
-    consecutive_errors = 0
-    max_consecutive_errors = 5  # Reduced for faster failure detection
-    buffer_size = 4096  # Larger buffer for better stability (matches initialize_audio_stream)
-    sample_rate = 44100  # Must match frontend 48000Hz for resampling, but capture at 44100
-    frame_duration = buffer_size / sample_rate  # Duration of one buffer in seconds (~93ms)
-
-
-    while audio_streaming_active and audio_stream:
+def dispatch_audio_frame(samples, seq, capture_time):
+    """Encode one captured frame with the current codec and send it to every listener - dispatcher thread"""
+    global audio_encoder
+    if audio_encoder is None or audio_encoder.name != audio_codec:
+        # First frame, or the codec switched mid-stream - a fresh encoder starts from clean state
+        audio_encoder = create_audio_encoder(audio_codec, audio_capture.sample_rate)
+    payload = audio_encoder.encode(samples)
+    # Encoded bytes behind a 20-byte header go out as a Socket.IO binary attachment
+    socketio.emit('audio_data', pack_audio_frame(payload, seq, capture_time, audio_encoder.sample_rate,
+                                                 audio_encoder.format))
+
+def stop_audio_capture():
+    """Stop the audio stream and its dispatcher"""
+    global audio_stream, audio_capture, audio_encoder
+    if audio_stream:
         try:
-            # Read audio data - this blocks for ~frame_duration naturally
-            # No additional sleep needed as read() is blocking
-            data = audio_stream.read(buffer_size, exception_on_overflow=False)
-
-            if data and len(data) > 0:
-                # Queue audio data non-blocking to avoid socketio.emit lock
-                try:
-                    audio_data_queue.put_nowait({'audio': data.hex()})
-                    consecutive_errors = 0  # Reset error counter on success
-                except Exception as queue_error:
-                    # Queue full, skip this frame (audio can handle dropped packets)
-                    # This prevents delay accumulation from stale buffered frames
-                    pass
-            else:
-                consecutive_errors += 1
-                if consecutive_errors >= max_consecutive_errors:
-                    print("Audio stream returning empty data, stopping thread")
-                    break
-
+            audio_stream.stop_stream()
+            audio_stream.close()
         except Exception as e:
-            consecutive_errors += 1
-            if consecutive_errors >= max_consecutive_errors:
-                audio_streaming_active = False  # Signal to stop
-                break
-            time.sleep(0.01)  # Small pause on error
-
+            pass
+        audio_stream = None
+    if audio_capture:
+        audio_capture.stop()
+    audio_encoder = None
+    audio_devices.release()
+
+
+def analyze_serial_line(session, complete_line):
+    """Run hub control detection on one line; returns (detected value names, newly discovered commands)"""
+    detected_values = analyze_serial_data_for_controls(complete_line, session)
+    return detected_values, session.command_tracker.take_new()
+
+def emit_serial_line(session, complete_line, capture_time, detected_values, new_commands):
+    """Emit one analyzed serial line to the session's room"""
+    # Kept at the emit point so late joiners see exactly what the room was sent
+    session.scrollback.append(complete_line, capture_time)
+
+    batcher = session.batcher
+    if batcher:
+        # Batched mode - lines, detected values and commands ride in one 'serial_batch'
+        batcher.add(complete_line, capture_time, detected_values, new_commands)
+        return
 
-def serial_monitor_thread():
-    """Thread for serial monitoring - optimized for performance with proper line buffering"""
-    global serial_connection, serial_monitoring_active
+    socketio.emit('serial_data', {'data': complete_line, 'port': session.port}, to=session.room)
+
+    if detected_values:
+        # Emit detected controls to frontend
+        socketio.emit('hub_controls_detected', {'values': detected_values, 'port': session.port}, to=session.room)
+
+    # Emit newly discovered commands to frontend for dropdown population (delta - see /hub/commands)
+    if new_commands:
+        socketio.emit('hub_commands_detected', {'commands': new_commands, 'delta': True, 'port': session.port}, to=session.room)
+
+def process_serial_line(session, complete_line):
+    """Hand one complete serial line to the session's pipeline, or analyze and emit it inline"""
+    session.lines_received += 1
+    capture_time = time.time()
+    recorder = session.recorder
+    if recorder:
+        recorder.append(complete_line, capture_time)
+    pipeline = session.pipeline
+    if pipeline:
+        pipeline.submit(complete_line, capture_time)
+        return
+    detected_values, new_commands = analyze_serial_line(session, complete_line)
+    emit_serial_line(session, complete_line, capture_time, detected_values, new_commands)
+
+def configure_serial_pipeline(session, pipeline_option):
+    """
+    Attach an analyzer/emitter pipeline to a session according to the client's 'pipeline' option
+    pipeline_option: True for defaults, False for inline processing on the reader thread,
+    or a dict with 'capacity', 'overflow' and 'shed_threshold'
+    """
+    if pipeline_option is False:
+        return None
 
-    if not serial_connection or not serial_connection.is_open:
+    options = pipeline_option if isinstance(pipeline_option, dict) else {}
+    pipeline = SerialPipeline(
+        lambda line: analyze_serial_line(session, line),
+        lambda line, capture_time, values, commands: emit_serial_line(session, line, capture_time, values, commands),
+        capacity=options.get('capacity', DEFAULT_STAGE_CAPACITY),
+        overflow=options.get('overflow', OVERFLOW_DROP_OLDEST),
+        shed_threshold=options.get('shed_threshold', DEFAULT_SHED_THRESHOLD)
+    )
+    pipeline.start()
+    session.pipeline = pipeline
+    return pipeline
+
+def process_telemetry_frames(session, channels):
+    """Feed one read's decoded binary frames to reader controls and history - no text or regex involved"""
+    timestamp = time.monotonic()
+    last_seen = time.time()
+    for name, samples in channels.items():
+        value = float(samples[-1])
+        session.value_patterns.update(name, {'name': name, 'value': value, 'count': 1, 'last_seen': last_seen})
+
+        for control in hub_controls.readers_named(name):
+            if control_port(control) not in ('auto', session.port):
+                continue
+            if not control.get('awaiting_confirmation', False):
+                # Every sample goes to history; the UI only needs the latest
+                control_history.record_many(control['id'], samples, timestamp)
+                update_control_value(control['id'], value)
+                control_value_publisher.record(control['id'], value)
+                if control_rules.watches(control['id']):
+                    # Every sample, in order, so no crossing between reads is missed
+                    control_rules.observe_many(control['id'], samples.tolist(), session)
+
+    session.value_patterns.expire(last_seen)
+
+def serial_monitor_thread(session):
+    """Thread for serial monitoring of one session - optimized for performance with proper line buffering"""
+    if not session.is_open():
         return
 
     consecutive_errors = 0
     max_consecutive_errors = 3
     buffer_size = 1024  # Read larger chunks for efficiency
-    line_buffer = ""  # Buffer for incomplete lines
+    line_framer = session.framer  # Bounded bytes buffer for incomplete lines
+    # Sleeps in the kernel until bytes arrive instead of polling in_waiting every 10 ms
+    reader = SerialPortReader(session.connection, buffer_size, session.read_mode)
+    session.reader = reader
+    if not session.active:
+        # Stopped before the reader existed
+        reader.wake()
 
-    print("Serial monitoring thread started")
+    print(f"Serial monitoring thread started on {session.port} ({reader.mode} reads)")
 
-    while serial_monitoring_active and serial_connection and serial_connection.is_open:
+    # Bytes already read while detecting the baud rate go through the framer first
+    pending_data = session.initial_data
+    session.initial_data = b''
+
+    while session.active and session.is_open():
         try:
-            # Use non-blocking read with timeout - prevent eventlet multiple reader error
-            if serial_connection.in_waiting > 0:
-                # Read available data in chunks
-                data = serial_connection.read(min(serial_connection.in_waiting, buffer_size))
-                if data:
-                    try:
-                        # Decode the data and add to line buffer
-                        decoded_data = data.decode('utf-8', errors='ignore')
-                        line_buffer += decoded_data
-
-                        # Process complete lines
-                        while '\n' in line_buffer:
-                            line_end = line_buffer.find('\n')
-                            complete_line = line_buffer[:line_end].strip()
-                            line_buffer = line_buffer[line_end + 1:]  # Remove processed line
-
-                            # Only emit non-empty lines
-                            if complete_line:
-                                socketio.emit('serial_data', {'data': complete_line})
-
-                                # Analyze serial data for potential hub controls
-                                detected_values = analyze_serial_data_for_controls(complete_line)
-                                if detected_values:
-                                    # Emit detected controls to frontend
-                                    socketio.emit('hub_controls_detected', {'values': detected_values})
-
-                                # Emit detected commands to frontend for dropdown population
-                                if hasattr(analyze_serial_data_for_controls, 'detected_commands'):
-                                    detected_commands = list(analyze_serial_data_for_controls.detected_commands)
-                                    if detected_commands:
-                                        socketio.emit('hub_commands_detected', {'commands': detected_commands})
-
-                        consecutive_errors = 0
-
-                    except UnicodeDecodeError:
-                        # If decoding fails, emit as hex and clear buffer
-                        if line_buffer:
-                            socketio.emit('serial_data', {'data': f'[HEX] {line_buffer.encode().hex()}'})
-                            line_buffer = ""
-                        consecutive_errors = 0
-            else:
-                # No data available, small sleep to prevent busy waiting
-                time.sleep(0.01)  # Increased sleep to prevent eventlet conflicts
+            data = pending_data or reader.read()
+            pending_data = b''
+            bridge = session.bridge
+            if data and bridge:
+                # Raw bytes fan out to TCP clients before any framing or decoding
+                bridge.broadcast(data)
+            if data and session.telemetry:
+                # Binary mode - whole reads are unpacked at once, nothing is decoded as text
+                channels = session.telemetry.feed(data)
+                if channels:
+                    process_telemetry_frames(session, channels)
+                consecutive_errors = 0
+            elif data:
+                # Split on newlines at the bytes level and decode only complete lines
+                for complete_line in line_framer.feed(data):
+                    # Only emit non-empty lines
+                    if complete_line:
+                        process_serial_line(session, complete_line)
+
+                consecutive_errors = 0
 
         except Exception as e:
+            if not session.active:
+                # Port was closed under us by stop_serial_monitor
+                break
             # Filter out eventlet multiple reader errors - don't log them as they spam the console
             error_msg = str(e)
             if "Second simultaneous read" not in error_msg and "multiple_readers" not in error_msg:
                 consecutive_errors += 1
                 if consecutive_errors >= max_consecutive_errors:
-                    serial_monitoring_active = False
+                    session.active = False
                     break
             time.sleep(0.1)  # Longer pause on error
 
+    reader.close()
+
+    # Let queued lines reach the client before the unterminated remainder
+    pipeline = session.pipeline
+    session.pipeline = None
+    if pipeline:
+        pipeline.stop()
+
     # Send any remaining data in buffer when stopping
-    if line_buffer.strip():
-        socketio.emit('serial_data', {'data': line_buffer.strip()})
+    remaining_line = line_framer.flush()
+    recorder = session.recorder
+    session.recorder = None
+    if remaining_line:
+        if recorder:
+            recorder.append(remaining_line, time.time())
+        batcher = session.batcher
+        if batcher:
+            batcher.add(remaining_line)
+            batcher.flush()
+        else:
+            socketio.emit('serial_data', {'data': remaining_line, 'port': session.port}, to=session.room)
+    # Detached only now, so batch-mode clients get the drained lines as batches too
+    session.close_batcher()
+    if recorder:
+        serial_log_store.close_recorder(recorder)
 
-    print("Serial monitoring thread stopped")
+    print(f"Serial monitoring thread stopped on {session.port}")
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -882,15 +986,12 @@ def init_audio_in_background():
             audio_init_in_progress = True
         
         if initialize_audio_stream():
-            print("Audio stream initialized successfully, starting thread")
+            print("Audio stream initialized successfully, starting dispatcher")
             with streaming_state_lock:
                 audio_streaming_active = True
-            audio_thread = threading.Thread(target=audio_stream_thread)
-            audio_thread.daemon = True
-            audio_thread.start()
-            # Start dispatcher thread if not already running
-            start_media_dispatcher()
-            socketio.emit('streaming_status', {'type': 'audio', 'status': 'started'})
+            audio_capture.start()
+            socketio.emit('streaming_status', {'type': 'audio', 'status': 'started', 'codec': audio_codec,
+                                               'codecs': available_codecs()})
         else:
             socketio.emit('streaming_status', {'type': 'audio', 'status': 'error', 'message': 'Could not initialize audio - no microphone detected'})
     except Exception as e:
@@ -902,6 +1003,24 @@ def init_audio_in_background():
 
 
 
+def set_audio_codec(codec):
+    """Switch the stream codec; the capture thread picks it up on its next frame"""
+    global audio_codec
+    if codec not in available_codecs():
+        return False
+    audio_codec = codec
+    return True
+
+@socketio.on('set_audio_codec')
+def handle_set_audio_codec(data):
+    """Change the audio codec for every listener while streaming"""
+    codec = (data or {}).get('codec')
+    if not set_audio_codec(codec):
+        emit('audio_codec', {'codec': audio_codec, 'codecs': available_codecs(),
+                             'error': f"Unsupported audio codec '{codec}'"})
+        return
+    socketio.emit('audio_codec', {'codec': audio_codec, 'codecs': available_codecs()})
+
 @socketio.on('start_streaming')
 def handle_start_streaming(data):
     """Handle start/stop streaming request for video and audio"""
@@ -925,8 +1044,15 @@ def handle_start_streaming(data):
         
         # Handle audio streaming
         if audio_requested:
-            # Check if audio devices are available
-            devices_available, device_list = check_audio_devices()
+            # Optional codec for the stream: 'pcm16', 'mulaw', 'alaw', 'ima_adpcm' or 'opus' (if installed)
+            if data.get('audio_codec') and not set_audio_codec(data['audio_codec']):
+                emit('streaming_status', {'type': 'audio', 'status': 'error',
+                                          'message': f"Unsupported audio codec '{data['audio_codec']}'",
+                                          'codecs': available_codecs()})
+                return
+
+            # Check if audio devices are available - answered from the cached inventory
+            devices_available, device_list = audio_devices.get()
             if not devices_available:
                 # No audio device - emit error notification and fall back
                 emit('streaming_status', {'type': 'audio', 'status': 'error', 'message': 'audio initialization problem, please try later'})
@@ -938,79 +1064,271 @@ def handle_start_streaming(data):
             # Stop audio if requested
             with streaming_state_lock:
                 audio_streaming_active = False
-            if audio_stream:
-                try:
-                    audio_stream.stop_stream()
-                    audio_stream.close()
-                except:
-                    pass
+            stop_audio_capture()
             emit('streaming_status', {'type': 'audio', 'status': 'stopped'})
     
     except Exception as e:
         print(f"Error in start_streaming handler: {e}")
         emit('streaming_status', {'type': 'audio', 'status': 'error', 'message': str(e)})
 
+def configure_serial_batcher(session, batch_option):
+    """
+    Attach a serial batcher to a session according to the client's 'batch' option
+    batch_option: falsy for per-line 'serial_data' events, True for defaults,
+    or a dict with 'window_ms' and 'max_lines'
+    """
+    if not batch_option:
+        return None
+
+    window_ms = DEFAULT_BATCH_WINDOW_MS
+    max_lines = DEFAULT_BATCH_MAX_LINES
+    if isinstance(batch_option, dict):
+        window_ms = batch_option.get('window_ms', window_ms)
+        max_lines = batch_option.get('max_lines', max_lines)
+
+    batcher = SerialBatcher(socketio, window_ms=window_ms, max_lines=max_lines, room=session.room, port=session.port)
+    batcher.start()
+    session.batcher = batcher
+    return batcher
+
+def clear_hub_controls_for_port(port):
+    """Remove controls bound to a port when fresh firmware starts on it while other ports keep running"""
+    for control in hub_controls.all():
+        if control_port(control) == port:
+            hub_controls.remove(control['id'])
+            control_values.pop(control['id'], None)
+            control_history.remove(control['id'])
+            control_value_publisher.discard(control['id'])
+            emit('hub_control_deleted', {'control': control})
+
 @socketio.on('start_serial_monitor')
 def handle_start_serial_monitor(data):
-    global serial_monitoring_active, serial_connection, hub_controls, serial_value_patterns, deleted_reader_controls
+    global hub_controls, deleted_reader_controls
     try:
         port = data.get('port')
         baudrate = data.get('baudrate', 9600)
+        auto_baud = data.get('auto_baud') or baudrate == 'auto'  # True or {'candidates', 'budget', 'cache'}
+        batch_option = data.get('batch', False)  # Opt-in batched 'serial_batch' events
+        max_line_length = data.get('max_line_length', SERIAL_MAX_LINE_LENGTH)
+        value_rate_hz = data.get('value_rate_hz')  # UI refresh rate for coalesced reader values
+        read_mode = data.get('read_mode')  # 'select', 'blocking' or legacy 'poll'; auto when omitted
+        telemetry_option = data.get('telemetry')  # Binary frame layout, omitted for text lines
+        scrollback_lines = data.get('scrollback_lines', DEFAULT_SCROLLBACK_LINES)  # Lines replayed to clients that join late
+        record = data.get('record', True)  # Append this session's lines to the on-disk serial log
+        pipeline_option = data.get('pipeline', True)  # Analyzer/emitter stages off the reader thread, False for inline
+        write_rate_hz = data.get('write_rate_hz', DEFAULT_CONTROL_RATE_HZ)  # Max control writes/sec, 0 = baud-paced only
+        pattern_ttl = data.get('pattern_ttl', DEFAULT_PATTERN_TTL)  # Seconds a detected value name survives unseen
+        pattern_capacity = data.get('pattern_capacity', DEFAULT_PATTERN_CAPACITY)  # Max detected value names per port
+        if read_mode not in READ_MODES:
+            read_mode = None
 
         if not port:
             emit('serial_status', {'status': 'error', 'message': 'No port specified'})
             return
 
-        if initialize_serial_connection(port, baudrate):
+        try:
+            max_line_length = max(64, int(max_line_length))
+        except (TypeError, ValueError):
+            max_line_length = SERIAL_MAX_LINE_LENGTH
+
+        try:
+            pattern_ttl = max(1.0, float(pattern_ttl))
+            pattern_capacity = max(1, int(pattern_capacity))
+        except (TypeError, ValueError):
+            pattern_ttl, pattern_capacity = DEFAULT_PATTERN_TTL, DEFAULT_PATTERN_CAPACITY
+
+        try:
+            scrollback_lines = int(scrollback_lines)
+        except (TypeError, ValueError):
+            scrollback_lines = DEFAULT_SCROLLBACK_LINES
+
+        try:
+            telemetry = create_telemetry_decoder(telemetry_option)
+        except (TypeError, ValueError) as e:
+            emit('serial_status', {'status': 'error', 'message': f'Invalid telemetry layout: {e}'})
+            return
+
+        # Restarting a port replaces its session; other ports keep running
+        previous_session = serial_sessions.remove(port)
+
+        if auto_baud:
+            # Fall back to an explicit rate (or the usual default) when nothing scores well
+            fallback_baudrate = baudrate if baudrate != 'auto' else 9600
+            baudrate = baud_detector.cached(port) or COMMON_BAUD_RATES[0]
+
+        connection = initialize_serial_connection(port, baudrate)
+        auto_report = None
+        if connection and auto_baud:
+            options = auto_baud if isinstance(auto_baud, dict) else {}
+            emit('serial_status', {'status': 'detecting_baud', 'port': port})
+            try:
+                auto_report = baud_detector.detect(connection, port, options.get('candidates'),
+                                                   float(options.get('budget', DEFAULT_AUTOBAUD_BUDGET)),
+                                                   options.get('cache', True))
+            except Exception as e:
+                connection.close()
+                emit('serial_status', {'status': 'error', 'message': f'Baud rate detection failed: {e}'})
+                return
+            baudrate = auto_report['baudrate'] or fallback_baudrate
+            connection.baudrate = baudrate
+
+        if connection:
+            session = SerialSession(port, baudrate, connection, max_line_length, read_mode,
+                                    pattern_ttl, pattern_capacity, scrollback_lines)
+            session.telemetry = telemetry
+            if previous_session:
+                # Same room - clients watching the old session keep watching this one
+                session.subscribers.update(previous_session.subscribers)
+            if auto_report:
+                # Bytes read at the winning rate are the session's first data, not discarded
+                session.initial_data = auto_report['sample']
+
             # Clear existing hub controls and patterns when starting serial monitor
             # This ensures fresh detection of controls from the new firmware
-            hub_controls.clear()
-            serial_value_patterns.clear()
-            deleted_reader_controls.clear()  # Reset deleted controls list for fresh firmware
-            # Clear detected commands
-            if hasattr(analyze_serial_data_for_controls, 'detected_commands'):
-                analyze_serial_data_for_controls.detected_commands.clear()
-
-            # Notify frontend to clear existing controls
-            emit('hub_controls_cleared')
-
-            serial_monitoring_active = True
-            serial_thread = threading.Thread(target=serial_monitor_thread)
+            if len(serial_sessions) == 0:
+                hub_controls.clear()
+                control_history.clear()
+                deleted_reader_controls.clear()  # Reset deleted controls list for fresh firmware
+
+                # Notify frontend to clear existing controls
+                emit('hub_controls_cleared')
+            else:
+                clear_hub_controls_for_port(port)
+
+            try:
+                batcher = configure_serial_batcher(session, batch_option)
+            except (TypeError, ValueError):
+                connection.close()
+                emit('serial_status', {'status': 'error', 'message': 'Invalid batch options'})
+                return
+
+            try:
+                pipeline = configure_serial_pipeline(session, pipeline_option)
+            except (TypeError, ValueError):
+                connection.close()
+                if batcher:
+                    batcher.stop()
+                emit('serial_status', {'status': 'error', 'message': 'Invalid pipeline options'})
+                return
+
+            if value_rate_hz is not None:
+                try:
+                    control_value_publisher.set_rate(value_rate_hz)
+                except (TypeError, ValueError):
+                    pass
+
+            try:
+                session.writer.set_control_rate(write_rate_hz)
+            except (TypeError, ValueError):
+                pass
+            session.writer.start()
+
+            if record:
+                session.recorder = serial_log_store.open_recorder(port)
+
+            # The requesting client receives this port's output through the session room
+            serial_sessions.add(session)
+            subscribe_serial_session(session)
+
+            status = {'status': 'started', 'port': port, 'baudrate': baudrate, 'room': session.room}
+            if auto_report:
+                status['auto_baud'] = {key: value for key, value in auto_report.items() if key != 'sample'}
+            if batcher:
+                status['batch'] = {'window_ms': batcher.window * 1000.0, 'max_lines': batcher.max_lines}
+            if telemetry:
+                status['telemetry'] = {'framing': telemetry.framing, 'channels': telemetry.channels}
+            if pipeline:
+                status['pipeline'] = {'capacity': pipeline.analyzer.capacity, 'overflow': pipeline.analyzer.overflow,
+                                      'shed_threshold': pipeline.shed_threshold}
+            # Status goes first - the page clears its terminal on 'started', and auto-baud
+            # sample lines are emitted as soon as the thread runs
+            emit('serial_status', status)
+
+            session.active = True
+            serial_thread = threading.Thread(target=serial_monitor_thread, args=(session,))
             serial_thread.daemon = True
+            session.thread = serial_thread
             serial_thread.start()
-            emit('serial_status', {'status': 'started', 'port': port, 'baudrate': baudrate})
         else:
             emit('serial_status', {'status': 'error', 'message': 'Could not open serial port'})
 
     except Exception as e:
         emit('serial_status', {'status': 'error', 'message': str(e)})
 
-@socketio.on('stop_serial_monitor')
-def handle_stop_serial_monitor():
-    global serial_monitoring_active, serial_connection
-    serial_monitoring_active = False
+def subscribe_serial_session(session):
+    """Put the requesting client in a session's room"""
+    join_room(session.room)
+    serial_sessions.subscribe(session, request.sid)
 
-    if serial_connection and serial_connection.is_open:
-        try:
-            serial_connection.close()
-        except Exception as e:
-            print(f"Error closing serial connection: {e}")
-        serial_connection = None
+def unsubscribe_serial_session(session):
+    """Take the requesting client out of a session's room - the session stops once it has stayed empty"""
+    leave_room(session.room)
+    serial_sessions.unsubscribe(session, request.sid)
+
+@socketio.on('stop_serial_monitor')
+def handle_stop_serial_monitor(data=None):
+    """Stop one port's session, or every session when no port is given"""
+    port = data.get('port') if isinstance(data, dict) else None
+
+    if port:
+        session = serial_sessions.remove(port)
+        if session:
+            leave_room(session.room)
+    else:
+        for session in serial_sessions.stop_all():
+            leave_room(session.room)
 
     # Stop serial plot if it's running
     emit('stop_serial_plot', {})
     
-    emit('serial_status', {'status': 'stopped'})
+    emit('serial_status', {'status': 'stopped', 'port': port})
+
+@socketio.on('join_serial_session')
+def handle_join_serial_session(data):
+    """Subscribe this client to a running session's output (e.g. a second browser on the same bench)"""
+    session = serial_sessions.resolve(data.get('port') if isinstance(data, dict) else None)
+    if not session:
+        emit('serial_status', {'status': 'error', 'message': 'No serial session on that port'})
+        return
+    subscribe_serial_session(session)
+    emit('serial_status', {'status': 'joined', 'port': session.port, 'baudrate': session.baudrate, 'room': session.room})
+
+    # Catch up with one compact batch instead of waiting for the next line
+    emit('serial_scrollback', dict(session.scrollback.page(), port=session.port))
+
+@socketio.on('serial_scrollback_request')
+def handle_serial_scrollback_request(data):
+    """Page further back through a session's scrollback - 'before' is the cursor from the previous page"""
+    data = data if isinstance(data, dict) else {}
+    session = serial_sessions.resolve(data.get('port'))
+    if not session:
+        emit('serial_status', {'status': 'error', 'message': 'No serial session on that port'})
+        return
+    try:
+        page = session.scrollback.page(data.get('before'), data.get('limit', DEFAULT_SCROLLBACK_PAGE))
+    except (TypeError, ValueError):
+        emit('serial_status', {'status': 'error', 'message': 'Invalid scrollback cursor'})
+        return
+    emit('serial_scrollback', dict(page, port=session.port))
+
+@socketio.on('leave_serial_session')
+def handle_leave_serial_session(data):
+    """Unsubscribe this client from a session's output"""
+    session = serial_sessions.resolve(data.get('port') if isinstance(data, dict) else None)
+    if session:
+        unsubscribe_serial_session(session)
 
 @socketio.on('send_serial_data')
 def handle_send_serial_data(data):
-    global serial_connection
     try:
-        if serial_connection and serial_connection.is_open:
+        # Route to the given port, or the most recently started session
+        session = serial_sessions.resolve(data.get('port'))
+        if session and session.is_open():
             message = data.get('data', '')
             if message:
-                serial_connection.write((message + '\n').encode('utf-8'))
-                emit('serial_sent', {'data': message})
+                # Manual lines are queued in order and never coalesced
+                session.writer.send_line(message)
+                emit('serial_sent', {'data': message, 'port': session.port})
     except Exception as e:
         emit('serial_status', {'status': 'error', 'message': str(e)})
 
@@ -1062,17 +1380,11 @@ def handle_update_hub_control(data):
             return
 
         # Find and update the control
-        for control in hub_controls:
-            if control['id'] == control_id:
-                if 'config' in data:
-                    control['config'].update(data['config'])
-                if 'device' in data:
-                    control['device'].update(data['device'])
-                if 'enabled' in data:
-                    control['enabled'] = data['enabled']
-
-                emit('hub_control_updated', {'control': control})
-                return
+        changes = {key: data[key] for key in ('config', 'device', 'enabled') if key in data}
+        control = hub_controls.update(control_id, changes)
+        if control:
+            emit('hub_control_updated', {'control': control})
+            return
 
         emit('hub_control_error', {'message': 'Control not found'})
     except Exception as e:
@@ -1080,7 +1392,7 @@ def handle_update_hub_control(data):
 
 @socketio.on('delete_hub_control')
 def handle_delete_hub_control(data):
-    global hub_controls, control_values, deleted_reader_controls, hub_controls_lock, deleted_reader_controls_lock
+    global hub_controls, control_values, deleted_reader_controls, deleted_reader_controls_lock
     try:
         control_id = data.get('id')
         if not control_id:
@@ -1095,23 +1407,24 @@ def handle_delete_hub_control(data):
         control_id = control_id.strip()
 
         # Thread-safe deletion
-        with hub_controls_lock:
+        with hub_controls.lock:
             # Find and remove the control
-            for i, control in enumerate(hub_controls):
-                if control['id'] == control_id:
-                    deleted_control = hub_controls.pop(i)
-                    # Clean up control values
-                    if control_id in control_values:
-                        del control_values[control_id]
-                    
-                    # If this is a reader control, track it to prevent auto-recreation
-                    if deleted_control.get('type') == 'reader':
-                        with deleted_reader_controls_lock:
-                            deleted_reader_controls.add(deleted_control['name'].lower())
-                        print(f"Marked reader control '{deleted_control['name']}' as permanently deleted")
-
-                    emit('hub_control_deleted', {'control': deleted_control})
-                    return
+            deleted_control = hub_controls.remove(control_id)
+            if deleted_control:
+                # Clean up control values
+                if control_id in control_values:
+                    del control_values[control_id]
+                control_history.remove(control_id)
+                control_value_publisher.discard(control_id)
+
+                # If this is a reader control, track it to prevent auto-recreation
+                if deleted_control.get('type') == 'reader':
+                    with deleted_reader_controls_lock:
+                        deleted_reader_controls.add(deleted_control['name'].lower())
+                    print(f"Marked reader control '{deleted_control['name']}' as permanently deleted")
+
+                emit('hub_control_deleted', {'control': deleted_control})
+                return
 
         # Control not found - this is not necessarily an error since controls might be deleted from other sessions
         print(f"Control {control_id} not found for deletion (might already be deleted)")
@@ -1145,8 +1458,10 @@ def handle_client_connect():
 
 @socketio.on('disconnect')
 def handle_client_disconnect():
-    """Clean up all resources when client disconnects (e.g., page reload)"""
-    cleanup_all_resources()
+    """Clean up resources when client disconnects (e.g., page reload)"""
+    # Serial sessions are shared - they outlive a reload and stop once their room stays empty
+    cleanup_all_resources(stop_serial=False)
+    serial_sessions.unsubscribe_all(request.sid)
 
 @app.route('/')
 def index():
@@ -1367,10 +1682,10 @@ def get_network_info():
 # Video streaming routes are now handled by http_video_streamer module
 # They will be registered in the initialization section below
 
-def cleanup_all_resources():
-    """Clean up all active resources (video, audio, serial, logic analyzer)"""
-    global audio_streaming_active, serial_monitoring_active
-    global audio_stream, serial_connection
+def cleanup_all_resources(stop_serial=True):
+    """Clean up all active resources (video, audio, serial unless stop_serial is False, logic analyzer)"""
+    global audio_streaming_active
+    global audio_stream
     
     # Stop video streaming using new HTTP video streamer
     try:
@@ -1384,23 +1699,15 @@ def cleanup_all_resources():
     # Stop audio streaming
     if audio_streaming_active or audio_stream:
         audio_streaming_active = False
-        if PYAUDIO_AVAILABLE and audio_stream:
-            try:
-                audio_stream.stop_stream()
-                audio_stream.close()
-            except Exception as e:
-                pass
-            audio_stream = None
+        if PYAUDIO_AVAILABLE:
+            stop_audio_capture()
     
     # Stop serial monitoring and plot
-    if serial_monitoring_active or serial_connection:
-        serial_monitoring_active = False
-        if serial_connection and serial_connection.is_open:
-            try:
-                serial_connection.close()
-            except Exception as e:
-                print(f"Error closing serial connection: {e}")
-            serial_connection = None
+    if stop_serial:
+        sequence_manager.cancel_all()
+    if stop_serial and len(serial_sessions) > 0:
+        serial_sessions.stop_all()
+        serial_log_store.close_all()
         # Notify frontend to stop serial plot
         try:
             socketio.emit('stop_serial_plot', {})
@@ -1427,6 +1734,10 @@ initialize_logic_analyzer()
 http_video_streamer = initialize_http_video_streaming(app, socketio)
 print("✓ HTTP video streaming initialized")
 
+# Probe audio devices in the background and re-probe on hotplug
+if PYAUDIO_AVAILABLE:
+    audio_devices.start()
+
 # Logic Analyzer Routes
 @app.route('/logic/start', methods=['POST'])
 def start_logic_analyzer():
@@ -1624,7 +1935,7 @@ def get_hub_controls():
     """Get all hub controls"""
     global hub_controls, control_values
     controls_data = []
-    for control in hub_controls:
+    for control in hub_controls.all():
         control_data = control.copy()
         control_data['current_value'] = get_control_value(control['id'])
         controls_data.append(control_data)
@@ -1659,20 +1970,10 @@ def update_hub_control(control_id):
         if not data:
             return jsonify({'error': 'No update data provided'}), 400
 
-        # Find and update the control
-        for control in hub_controls:
-            if control['id'] == control_id:
-                # Update allowed fields
-                if 'config' in data:
-                    control['config'].update(data['config'])
-                if 'device' in data:
-                    control['device'].update(data['device'])
-                if 'enabled' in data:
-                    control['enabled'] = data['enabled']
-                if 'awaiting_confirmation' in data:
-                    control['awaiting_confirmation'] = data['awaiting_confirmation']
-
-                return jsonify({'control': control}), 200
+        # Find and update the control (allowed fields only)
+        control = hub_controls.update(control_id, data)
+        if control:
+            return jsonify({'control': control}), 200
 
         return jsonify({'error': 'Control not found'}), 404
     except Exception as e:
@@ -1684,18 +1985,37 @@ def delete_hub_control(control_id):
     global hub_controls, control_values
     try:
         # Find and remove the control
-        for i, control in enumerate(hub_controls):
-            if control['id'] == control_id:
-                deleted_control = hub_controls.pop(i)
-                # Clean up control values
-                if control_id in control_values:
-                    del control_values[control_id]
-                return jsonify({'message': 'Control deleted', 'control': deleted_control}), 200
+        deleted_control = hub_controls.remove(control_id)
+        if deleted_control:
+            # Clean up control values
+            if control_id in control_values:
+                del control_values[control_id]
+            control_history.remove(control_id)
+            control_value_publisher.discard(control_id)
+            return jsonify({'message': 'Control deleted', 'control': deleted_control}), 200
 
         return jsonify({'error': 'Control not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/hub/controls/<control_id>/history')
+def get_hub_control_history(control_id):
+    """Get decimated value history for a reader control (min/max/mean per bucket)"""
+    try:
+        if not hub_controls.get(control_id):
+            return jsonify({'error': 'Control not found'}), 404
+
+        start = request.args.get('start', type=float)  # Epoch seconds, or negative = seconds ago
+        end = request.args.get('end', type=float)
+        points = request.args.get('points', DEFAULT_HISTORY_POINTS, type=int)  # Usually the plot width in pixels
+
+        history = control_history.query(control_id, start, end, points)
+        if history is None:
+            history = {'id': control_id, 'points': 0, 'samples': 0, 't': [], 'min': [], 'max': [], 'mean': []}
+        return jsonify(history), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/hub/controls/<control_id>/send', methods=['POST'])
 def send_control_command_endpoint(control_id):
     """Send a control command"""
@@ -1714,20 +2034,247 @@ def send_control_command_endpoint(control_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/hub/commands')
+def get_hub_commands():
+    """Get every known detected command - clients fetch this once, then apply hub_commands_detected deltas"""
+    port = request.args.get('port')
+    commands = []
+    for session in serial_sessions.all():
+        if port and session.port != port:
+            continue
+        for cmd in session.command_tracker.snapshot():
+            if cmd not in commands:
+                commands.append(cmd)
+    return jsonify({'commands': commands})
+
+@app.route('/serial/sessions')
+def get_serial_sessions():
+    """Get status of every running serial session"""
+    return jsonify({'sessions': [session.get_status() for session in serial_sessions.all()]})
+
+@app.route('/serial/bridge', methods=['POST'])
+def start_serial_bridge():
+    """Serve a running serial session over TCP (mode 'rfc2217' or 'raw')"""
+    try:
+        data = request.get_json() or {}
+        session = serial_sessions.resolve(data.get('port'))
+        if not session:
+            return jsonify({'error': 'No serial session on that port'}), 404
+        if session.bridge:
+            return jsonify({'error': 'Bridge already running', 'bridge': session.bridge.get_status()}), 409
+
+        try:
+            bridge = SerialBridge(session, data.get('tcp_port', 0), data.get('host', DEFAULT_BRIDGE_HOST),
+                                  data.get('mode', BRIDGE_MODE_RFC2217))
+            bridge.start()
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            return jsonify({'error': f'Could not start bridge: {e}'}), 400
+        session.bridge = bridge
+        return jsonify({'port': session.port, 'bridge': bridge.get_status()}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/serial/bridge', methods=['DELETE'])
+def stop_serial_bridge():
+    """Stop a session's TCP bridge"""
+    try:
+        session = serial_sessions.resolve(request.args.get('port'))
+        if not session or not session.bridge:
+            return jsonify({'error': 'No bridge on that port'}), 404
+        bridge = session.bridge
+        session.bridge = None
+        bridge.stop()
+        return jsonify({'port': session.port, 'message': 'Bridge stopped'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/serial/log')
+def get_serial_log():
+    """Get recorded serial lines for a port in a time range, oldest first"""
+    try:
+        since = request.args.get('since', type=float)  # Epoch seconds, or negative = seconds ago
+        until = request.args.get('until', type=float)
+        limit = request.args.get('limit', DEFAULT_LOG_LIMIT, type=int)
+
+        # Default to the most recent session, or the only port ever recorded
+        port = request.args.get('port')
+        if not port:
+            session = serial_sessions.resolve()
+            recorded = serial_log_store.ports()
+            if session:
+                port = session.port
+            elif len(recorded) == 1:
+                port = recorded[0]
+            else:
+                return jsonify({'error': 'Port is required', 'ports': recorded}), 400
+
+        result = serial_log_store.query(port, since, until, limit)
+        if result is None:
+            return jsonify({'error': 'No serial log for that port', 'ports': serial_log_store.ports()}), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def compile_sequence_steps(steps, port=None):
+    """
+    Resolve parsed steps to (offset, send, info) before the run starts, so no lookups happen on the clock
+    Control steps go to their control's session; raw line steps to `port` (or the only session)
+    """
+    compiled = []
+    offset = 0.0
+    for index, (delay_ms, kind, target, value) in enumerate(parse_steps(steps)):
+        offset += delay_ms / 1000.0
+        if kind == 'control':
+            control = hub_controls.get(target)
+            if not control:
+                raise ValueError(f"Step {index}: unknown control '{target}'")
+            session = serial_sessions.resolve(control_port(control))
+            line = build_control_command(control, value)
+            info = {'control_id': target, 'value': value}
+        else:
+            session = serial_sessions.resolve(port)
+            line = target
+            info = {}
+        if not session or not session.is_open():
+            raise ValueError(f'Step {index}: no open serial session for it')
+        info['line'] = line
+        info['port'] = session.port
+        compiled.append((offset, make_sequence_send(session, line, info.get('control_id'), value), info))
+    return compiled
+
+def make_sequence_send(session, line, control_id, value):
+    """Step action: write straight to the port, then mirror control values like a manual command"""
+    def send():
+        session.writer.send_now(line)
+        if control_id:
+            update_control_value(control_id, value)
+    return send
+
+def emit_sequence_steps(sequence, results):
+    socketio.emit('sequence_step', {'id': sequence.sequence_id, 'results': results})
+
+def emit_sequence_complete(sequence):
+    socketio.emit('sequence_complete', sequence.get_status(include_results=False))
+
+@app.route('/hub/sequences', methods=['POST'])
+def start_hub_sequence():
+    """Run a list of (delay_ms, control_id or raw line, value) steps on the server clock"""
+    try:
+        data = request.get_json() or {}
+        try:
+            repeat = int(data.get('repeat', 1))  # Times to run the whole list back to back
+            steps = compile_sequence_steps(data.get('steps'), data.get('port'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        sequence = sequence_manager.start(steps, repeat, emit_sequence_steps, emit_sequence_complete)
+        return jsonify(sequence.get_status(include_results=False)), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/hub/sequences')
+def get_hub_sequences():
+    """Get running and recently finished sequences"""
+    return jsonify({'sequences': [sequence.get_status(include_results=False) for sequence in sequence_manager.all()]})
+
+@app.route('/hub/sequences/<sequence_id>')
+def get_hub_sequence(sequence_id):
+    """Get a sequence's state and the actual send time of every step so far"""
+    sequence = sequence_manager.get(sequence_id)
+    if not sequence:
+        return jsonify({'error': 'Sequence not found'}), 404
+    return jsonify(sequence.get_status())
+
+@app.route('/hub/sequences/<sequence_id>', methods=['DELETE'])
+def cancel_hub_sequence(sequence_id):
+    """Cancel a running sequence before its next step"""
+    sequence = sequence_manager.get(sequence_id)
+    if not sequence:
+        return jsonify({'error': 'Sequence not found'}), 404
+    sequence.cancel()
+    return jsonify({'id': sequence_id, 'message': 'Sequence cancelled'}), 200
+
+@app.route('/hub/rules')
+def get_hub_rules():
+    """Get every closed-loop rule with its counters"""
+    return jsonify(control_rules.get_status())
+
+def check_rule_controls(rule):
+    """Reject rules that watch a non-reader or act on a control that doesn't exist"""
+    source = hub_controls.get(rule.source)
+    if not source or source.get('type') != 'reader':
+        return f"'{rule.source}' is not a reader control"
+    for action in (rule.then, rule.release):
+        if action and 'control' in action and not hub_controls.get(action['control']):
+            return f"Unknown control '{action['control']}'"
+    return None
+
+@app.route('/hub/rules', methods=['POST'])
+def create_hub_rule():
+    """
+    Create a rule, e.g. {"when": {"control": id, "op": ">", "threshold": 3000, "hysteresis": 100},
+    "then": {"line": "stop"}, "min_interval_ms": 500}
+    """
+    try:
+        try:
+            # Validated (check_rule_controls) before it goes live
+            rule = control_rules.add(request.get_json() or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'rule': rule.get_status()}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/hub/rules/<rule_id>', methods=['PUT'])
+def update_hub_rule(rule_id):
+    """Redefine a rule, or just enable/disable it with {"enabled": bool}"""
+    try:
+        data = request.get_json() or {}
+        previous = control_rules.get(rule_id)
+        if not previous:
+            return jsonify({'error': 'Rule not found'}), 404
+        if set(data) == {'enabled'}:
+            rule = control_rules.set_enabled(rule_id, data['enabled'])
+            return jsonify({'rule': rule.get_status()}), 200
+
+        try:
+            # An invalid definition leaves the running rule, its counters and cooldown untouched
+            rule = control_rules.replace(rule_id, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not rule:
+            return jsonify({'error': 'Rule not found'}), 404
+        return jsonify({'rule': rule.get_status()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/hub/rules/<rule_id>', methods=['DELETE'])
+def delete_hub_rule(rule_id):
+    """Delete a rule"""
+    rule = control_rules.remove(rule_id)
+    if not rule:
+        return jsonify({'error': 'Rule not found'}), 404
+    return jsonify({'message': 'Rule deleted', 'rule': rule.get_status()}), 200
+
 @app.route('/hub/detect', methods=['POST'])
 def detect_hub_controls():
     """Manually trigger control detection from current serial data"""
-    global serial_value_patterns, hub_controls
+    global hub_controls
 
     try:
-        detected_values = list(serial_value_patterns.keys())
-
-        # Auto-create controls for detected values
+        # Detected names from every session, bound to the port that reported them
+        detected_values = []
         new_controls = []
-        for value_name in detected_values:
-            control = create_hub_control(value_name)
-            if control:  # Only add if control was created (not None)
-                new_controls.append(control)
+        for session in serial_sessions.all():
+            for value_name in session.value_patterns.keys():
+                if value_name in detected_values:
+                    continue
+                detected_values.append(value_name)
+
+                # Auto-create controls for detected values
+                control = create_hub_control(value_name, {'type': 'auto', 'port': session.port})
+                if control:  # Only add if control was created (not None)
+                    new_controls.append(control)
 
         return jsonify({
             'detected_values': detected_values,
@@ -1737,47 +2284,16 @@ def detect_hub_controls():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-
-
-
-
-dispatcher_thread_running = False
-dispatcher_lock = threading.Lock()
-
-def start_media_dispatcher():
-    """Start the media dispatcher thread for audio (video now uses MJPEG HTTP stream)"""
-    global dispatcher_thread_running, dispatcher_lock
-    
-    with dispatcher_lock:
-        if not dispatcher_thread_running:
-            dispatcher_thread_running = True
-            dispatcher = threading.Thread(target=media_dispatcher_thread)
-            dispatcher.daemon = True
-            dispatcher.start()
-
-def media_dispatcher_thread():
-    """Thread to dispatch queued audio data without blocking capture threads"""
-    global audio_data_queue, audio_streaming_active, dispatcher_thread_running
-    try:
-        while audio_streaming_active:
-            try:
-                # Emit queued audio data - drain all queued frames to prevent accumulation
-                frames_emitted = 0
-                while not audio_data_queue.empty() and audio_streaming_active:
-                    try:
-                        audio_data = audio_data_queue.get_nowait()
-                        socketio.emit('audio_data', audio_data)
-                        frames_emitted += 1
-                    except:
-                        break
-                
-                # Small sleep to prevent busy waiting
-                time.sleep(0.001)
-                
-            except Exception as e:
-                time.sleep(0.01)
-    finally:
-        dispatcher_thread_running = False
+@app.route('/audio/status')
+def get_audio_status():
+    """Get audio capture counters - ring drops, PortAudio overruns and capture-to-emit latency"""
+    return jsonify({
+        'active': audio_streaming_active,
+        'codec': audio_codec,
+        'codecs': available_codecs(),
+        'capture': audio_capture.get_status() if audio_capture else None,
+        'devices': audio_devices.get_status()
+    })
 
 def print_network_info():
     """Print network information on startup"""
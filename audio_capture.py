@@ -0,0 +1,175 @@
+"""
+Audio Capture Module
+PyAudio callback capture into a preallocated NumPy ring, drained by one dispatcher thread
+that sleeps on an Event until a frame is ready
+Separated from app.py so the PortAudio callback only copies samples - encoding and emit happen elsewhere
+"""
+
+import time
+import threading
+
+import numpy as np
+
+DEFAULT_RING_FRAMES = 16  # ~1.5 s of 4096-sample buffers at 44.1 kHz
+PA_CONTINUE = 0  # pyaudio.paContinue
+PA_INPUT_OVERFLOW = 0x2  # pyaudio.paInputOverflow - PortAudio lost input before the callback ran
+IDLE_TIMEOUT = 1.0  # Dispatcher wake-up with no frames, to notice a dead stream
+
+
+class AudioRingBuffer:
+    """
+    Single-producer / single-consumer ring of fixed-size int16 frames
+    The producer only advances write_count and the consumer only read_count, so no lock is needed;
+    the slot after the newest frame is the one the producer writes next, so at most frames - 1 are
+    readable - a consumer that falls further behind skips ahead and counts the frames it lost
+    """
+
+    def __init__(self, frames, frame_samples):
+        self.frames = max(2, int(frames))
+        self.frame_samples = int(frame_samples)
+        self.samples = np.zeros((self.frames, self.frame_samples), dtype=np.int16)
+        self.lengths = np.zeros(self.frames, dtype=np.int32)
+        self.capture_times = np.zeros(self.frames, dtype=np.float64)
+        self.write_count = 0
+        self.read_count = 0
+        self.dropped = 0
+
+    def write(self, data, capture_time):
+        """Copy one buffer of int16 bytes into the next slot - producer side"""
+        incoming = np.frombuffer(data, dtype=np.int16)
+        count = min(len(incoming), self.frame_samples)
+        slot = self.write_count % self.frames
+        self.samples[slot, :count] = incoming[:count]
+        self.lengths[slot] = count
+        self.capture_times[slot] = capture_time
+        self.write_count += 1  # Publishes the slot
+
+    def pending(self):
+        return self.write_count - self.read_count
+
+    def read(self):
+        """Next frame as (samples copy, sequence number, capture time), or None - consumer side"""
+        while True:
+            available = self.write_count - self.read_count
+            if available <= 0:
+                return None
+            if available >= self.frames:
+                # Lapped by the producer - the oldest frames are gone, and the one a full ring
+                # behind shares its slot with the frame being written next
+                lost = available - self.frames + 1
+                self.read_count += lost
+                self.dropped += lost
+            index = self.read_count
+            slot = index % self.frames
+            samples = self.samples[slot, :self.lengths[slot]].copy()
+            capture_time = float(self.capture_times[slot])
+            if self.write_count - index >= self.frames:
+                # The producer reached this slot while it was being copied - skip it and take the next one
+                self.read_count = index + 1
+                self.dropped += 1
+                continue
+            self.read_count = index + 1
+            return samples, index + 1, capture_time
+
+
+class AudioCapture:
+    """
+    Owns the ring and the dispatcher
+    callback() is handed to pyaudio.open(stream_callback=...); dispatch(samples, seq, capture_time)
+    runs on the dispatcher thread for every frame, in order
+    """
+
+    def __init__(self, sample_rate, frame_samples, dispatch, ring_frames=DEFAULT_RING_FRAMES, is_alive=None):
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.frame_duration = frame_samples / float(sample_rate)
+        self.dispatch = dispatch
+        self.is_alive = is_alive  # Checked when no frame arrives for IDLE_TIMEOUT
+        self.ring = AudioRingBuffer(ring_frames, frame_samples)
+        self.ready = threading.Event()
+        self.running = False
+        self.thread = None
+        self.frames_captured = 0
+        self.frames_dispatched = 0
+        self.overruns = 0
+        self.dispatch_errors = 0
+        self.wakeups = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self.latency_total = 0.0
+
+    def callback(self, in_data, frame_count, time_info, status_flags):
+        """PortAudio callback - copy into the ring and wake the dispatcher, nothing else"""
+        if status_flags & PA_INPUT_OVERFLOW:
+            self.overruns += 1
+        # The callback runs once the buffer is full, so the first sample is one buffer old
+        self.ring.write(in_data, time.time() - frame_count / float(self.sample_rate))
+        self.frames_captured += 1
+        self.ready.set()
+        return None, PA_CONTINUE
+
+    def start(self):
+        """Start the dispatcher thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._dispatch_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the dispatcher; frames still in the ring are discarded"""
+        self.running = False
+        self.ready.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _dispatch_loop(self):
+        ring = self.ring
+        while self.running:
+            if not self.ready.wait(IDLE_TIMEOUT):
+                if self.is_alive and not self.is_alive():
+                    print("Audio stream is no longer delivering frames, stopping dispatcher")
+                    self.running = False
+                continue
+            # Clear before draining, so a frame written during the drain sets it again
+            self.ready.clear()
+            self.wakeups += 1
+            while self.running:
+                frame = ring.read()
+                if frame is None:
+                    break
+                samples, seq, capture_time = frame
+                try:
+                    self.dispatch(samples, seq, capture_time)
+                except Exception as e:
+                    self.dispatch_errors += 1
+                    print(f"Audio dispatch error: {e}")
+                # Time from the end of the buffer (when it could first be sent) to emit
+                latency = time.time() - capture_time - self.frame_duration
+                self.latency_last = latency
+                self.latency_total += latency
+                if latency > self.latency_max:
+                    self.latency_max = latency
+                self.frames_dispatched += 1
+
+    def get_status(self):
+        """Get capture counters"""
+        dispatched = self.frames_dispatched
+        return {
+            'running': self.running,
+            'ring_frames': self.ring.frames,
+            'ring_pending': self.ring.pending(),
+            'frames_captured': self.frames_captured,
+            'frames_dispatched': dispatched,
+            'dropped': self.ring.dropped,
+            'overruns': self.overruns,
+            'dispatch_errors': self.dispatch_errors,
+            'wakeups': self.wakeups,
+            'queue_latency_ms': {
+                'last': round(self.latency_last * 1000.0, 3),
+                'max': round(self.latency_max * 1000.0, 3),
+                'mean': round(self.latency_total * 1000.0 / dispatched, 3) if dispatched else 0.0
+            }
+        }
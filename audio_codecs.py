@@ -0,0 +1,297 @@
+"""
+Audio Codecs Module
+Codec stage between audio capture and emit - G.711 mu-law/A-law (2x), IMA-ADPCM (4x) and,
+when opuslib is installed, Opus
+Separated from app.py so each frame is encoded once and the same bytes go to every listener
+
+Frontend decoding (page/remotelab.html, payload follows the audio_frames header):
+  pcm16      int16 little-endian samples
+  mulaw/alaw one byte per sample; 256-entry lookup tables built with the G.711 expansions below
+  ima_adpcm  predictor int16, step index u8, reserved u8, then 4-bit codes, high nibble first;
+             each frame decodes on its own from that state
+  opus       u8 packet count, then per packet a u16 length and one 20 ms Opus packet at 48 kHz,
+             decoded with WebCodecs AudioDecoder({codec: 'opus'})
+"""
+
+import struct
+
+import numpy as np
+
+from audio_frames import AUDIO_FORMAT_PCM16
+
+try:
+    import opuslib
+    OPUS_AVAILABLE = True
+except Exception:
+    # opuslib loads libopus through ctypes, so a missing library fails here too
+    OPUS_AVAILABLE = False
+
+AUDIO_FORMAT_MULAW = 2
+AUDIO_FORMAT_ALAW = 3
+AUDIO_FORMAT_IMA_ADPCM = 4
+AUDIO_FORMAT_OPUS = 5
+
+DEFAULT_AUDIO_CODEC = 'pcm16'
+DEFAULT_OPUS_BITRATE = 32000
+OPUS_SAMPLE_RATE = 48000
+OPUS_FRAME_SAMPLES = 960  # 20 ms at 48 kHz
+
+# G.711 segment end points (Sun reference implementation, as used by audioop)
+ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF], dtype=np.int32)
+ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF], dtype=np.int32)
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159
+
+IMA_INDEX_TABLE = [-1, -1, -1, -1, 2, 4, 6, 8, -1, -1, -1, -1, 2, 4, 6, 8]
+IMA_STEP_TABLE = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487,
+    12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767
+]
+IMA_BLOCK_HEADER = struct.Struct('<hBB')
+
+
+def mulaw_encode(samples):
+    """int16 samples -> G.711 mu-law bytes, vectorized"""
+    pcm = samples.astype(np.int32) >> 2  # 14-bit
+    negative = pcm < 0
+    pcm = np.minimum(np.where(negative, -pcm, pcm), ULAW_CLIP) + (ULAW_BIAS >> 2)
+    segment = np.searchsorted(ULAW_SEGMENT_ENDS, pcm)
+    code = np.where(segment >= 8, 0x7F, (np.minimum(segment, 7) << 4) | ((pcm >> (segment + 1)) & 0x0F))
+    return (code ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8).tobytes()
+
+
+def alaw_encode(samples):
+    """int16 samples -> G.711 A-law bytes, vectorized"""
+    pcm = samples.astype(np.int32) >> 3  # 13-bit
+    negative = pcm < 0
+    pcm = np.where(negative, -pcm - 1, pcm)
+    segment = np.searchsorted(ALAW_SEGMENT_ENDS, pcm)
+    code = np.where(segment >= 8, 0x7F,
+                    (np.minimum(segment, 7) << 4) | ((pcm >> np.maximum(segment, 1)) & 0x0F))
+    return (code ^ np.where(negative, 0x55, 0xD5)).astype(np.uint8).tobytes()
+
+
+def _mulaw_table():
+    code = ~np.arange(256, dtype=np.int32)
+    magnitude = ((((code & 0x0F) << 3) + ULAW_BIAS) << ((code & 0x70) >> 4)) - ULAW_BIAS
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _alaw_table():
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    segment = (code & 0x70) >> 4
+    magnitude = ((code & 0x0F) << 4) + np.where(segment == 0, 8, 0x108)
+    magnitude = np.where(segment > 1, magnitude << np.maximum(segment - 1, 0), magnitude)
+    return np.where(code & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+MULAW_DECODE_TABLE = _mulaw_table()
+ALAW_DECODE_TABLE = _alaw_table()
+
+
+def mulaw_decode(data):
+    return MULAW_DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def alaw_decode(data):
+    return ALAW_DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+class PassthroughEncoder:
+    """Raw int16 PCM"""
+
+    name = 'pcm16'
+    format = AUDIO_FORMAT_PCM16
+    ratio = 1
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def encode(self, samples):
+        return samples.tobytes()
+
+
+class MulawEncoder(PassthroughEncoder):
+    name = 'mulaw'
+    format = AUDIO_FORMAT_MULAW
+    ratio = 2
+
+    def encode(self, samples):
+        return mulaw_encode(samples)
+
+
+class AlawEncoder(PassthroughEncoder):
+    name = 'alaw'
+    format = AUDIO_FORMAT_ALAW
+    ratio = 2
+
+    def encode(self, samples):
+        return alaw_encode(samples)
+
+
+class ImaAdpcmEncoder(PassthroughEncoder):
+    """
+    IMA-ADPCM, 4 bits per sample
+    Prediction is a per-sample recurrence so it can't be vectorized; the loop is kept to local
+    integer arithmetic. State carries across frames and is written into each frame's block header
+    """
+
+    name = 'ima_adpcm'
+    format = AUDIO_FORMAT_IMA_ADPCM
+    ratio = 4
+
+    def __init__(self, sample_rate):
+        super().__init__(sample_rate)
+        self.predictor = 0
+        self.index = 0
+
+    def encode(self, samples):
+        header = IMA_BLOCK_HEADER.pack(self.predictor, self.index, 0)
+        predictor = self.predictor
+        index = self.index
+        index_table = IMA_INDEX_TABLE
+        step_table = IMA_STEP_TABLE
+        codes = bytearray(len(samples))
+        position = 0
+        for value in samples.tolist():
+            step = step_table[index]
+            diff = value - predictor
+            if diff < 0:
+                code = 8
+                diff = -diff
+            else:
+                code = 0
+            delta = step >> 3
+            if diff >= step:
+                code |= 4
+                diff -= step
+                delta += step
+            step >>= 1
+            if diff >= step:
+                code |= 2
+                diff -= step
+                delta += step
+            step >>= 1
+            if diff >= step:
+                code |= 1
+                delta += step
+            if code & 8:
+                predictor -= delta
+                if predictor < -32768:
+                    predictor = -32768
+            else:
+                predictor += delta
+                if predictor > 32767:
+                    predictor = 32767
+            index += index_table[code]
+            if index < 0:
+                index = 0
+            elif index > 88:
+                index = 88
+            codes[position] = code
+            position += 1
+        self.predictor = predictor
+        self.index = index
+
+        # Two codes per byte, high nibble first
+        nibbles = np.frombuffer(bytes(codes), dtype=np.uint8)
+        if len(nibbles) % 2:
+            nibbles = np.append(nibbles, np.uint8(0))
+        packed = (nibbles[0::2] << 4) | nibbles[1::2]
+        return header + packed.tobytes()
+
+
+def ima_adpcm_decode(data):
+    """One ADPCM frame payload -> int16 samples (reference for the frontend decoder)"""
+    predictor, index, _ = IMA_BLOCK_HEADER.unpack_from(data)
+    packed = np.frombuffer(data, dtype=np.uint8, offset=IMA_BLOCK_HEADER.size)
+    codes = np.empty(len(packed) * 2, dtype=np.uint8)
+    codes[0::2] = packed >> 4
+    codes[1::2] = packed & 0x0F
+    out = []
+    for code in codes.tolist():
+        step = IMA_STEP_TABLE[index]
+        delta = step >> 3
+        if code & 4:
+            delta += step
+        if code & 2:
+            delta += step >> 1
+        if code & 1:
+            delta += step >> 2
+        predictor = max(-32768, predictor - delta) if code & 8 else min(32767, predictor + delta)
+        index = min(88, max(0, index + IMA_INDEX_TABLE[code]))
+        out.append(predictor)
+    return np.array(out, dtype=np.int16)
+
+
+class OpusEncoder(PassthroughEncoder):
+    """
+    Opus through opuslib - input is resampled to 48 kHz (linear, phase carried across frames)
+    and cut into 20 ms packets; leftover samples wait for the next capture buffer
+    """
+
+    name = 'opus'
+    format = AUDIO_FORMAT_OPUS
+    ratio = None  # Set by bitrate
+
+    def __init__(self, sample_rate, bitrate=DEFAULT_OPUS_BITRATE):
+        super().__init__(OPUS_SAMPLE_RATE)
+        self.input_rate = sample_rate
+        self.encoder = opuslib.Encoder(OPUS_SAMPLE_RATE, 1, opuslib.APPLICATION_AUDIO)
+        self.encoder.bitrate = int(bitrate)
+        self.step = sample_rate / OPUS_SAMPLE_RATE
+        self.phase = 1.0  # Next output position; index 0 is the previous buffer's last sample
+        self.last = 0.0
+        self.pending = np.empty(0, dtype=np.int16)
+
+    def _resample(self, samples):
+        if self.input_rate == OPUS_SAMPLE_RATE:
+            return samples
+        source = np.concatenate(([self.last], samples.astype(np.float64)))
+        positions = np.arange(self.phase, len(samples) + 1e-9, self.step)
+        self.phase = (positions[-1] + self.step - len(samples)) if len(positions) else self.phase - len(samples)
+        self.last = source[-1]
+        return np.interp(positions, np.arange(len(source)), source).astype(np.int16)
+
+    def encode(self, samples):
+        pending = np.concatenate((self.pending, self._resample(samples)))
+        packets = []
+        start = 0
+        while len(pending) - start >= OPUS_FRAME_SAMPLES and len(packets) < 255:
+            chunk = pending[start:start + OPUS_FRAME_SAMPLES]
+            packets.append(self.encoder.encode(chunk.tobytes(), OPUS_FRAME_SAMPLES))
+            start += OPUS_FRAME_SAMPLES
+        self.pending = pending[start:]
+        parts = [bytes([len(packets)])]
+        for packet in packets:
+            parts.append(struct.pack('<H', len(packet)))
+            parts.append(packet)
+        return b''.join(parts)
+
+
+AUDIO_ENCODERS = {
+    'pcm16': PassthroughEncoder,
+    'mulaw': MulawEncoder,
+    'alaw': AlawEncoder,
+    'ima_adpcm': ImaAdpcmEncoder
+}
+if OPUS_AVAILABLE:
+    AUDIO_ENCODERS['opus'] = OpusEncoder
+
+
+def available_codecs():
+    return list(AUDIO_ENCODERS)
+
+
+def create_audio_encoder(name, sample_rate):
+    """Encoder for a codec name; raises ValueError if it is unknown or its backend is missing"""
+    name = name or DEFAULT_AUDIO_CODEC
+    if name not in AUDIO_ENCODERS:
+        if name == 'opus':
+            raise ValueError('Opus needs opuslib and libopus installed')
+        raise ValueError(f"Unknown audio codec '{name}' (available: {', '.join(AUDIO_ENCODERS)})")
+    return AUDIO_ENCODERS[name](sample_rate)
@@ -0,0 +1,173 @@
+"""
+Audio Devices Module
+Cached inventory of working audio input devices - probed once at startup and again in the background
+when /proc/asound or udev reports a sound device change, with the last device that streamed preferred
+Separated from app.py so starting a stream reads a list instead of opening every device
+"""
+
+import os
+import time
+import threading
+
+try:
+    import pyudev
+    PYUDEV_AVAILABLE = True
+except ImportError:
+    PYUDEV_AVAILABLE = False
+
+ASOUND_FILES = ('/proc/asound/cards', '/proc/asound/devices')
+SOUND_DEVICE_DIR = '/dev/snd'
+DEFAULT_POLL_INTERVAL = 2.0  # Seconds between /proc/asound checks when udev is not available
+SETTLE_DELAY = 0.5  # Seconds to let a hotplugged device finish registering before probing
+STARTUP_PROBE_WAIT = 10.0  # Longest a stream start waits on the startup probe before probing itself
+
+
+def sound_fingerprint():
+    """Cheap snapshot of the kernel's sound devices - changes whenever a card appears or goes away"""
+    parts = []
+    for path in ASOUND_FILES:
+        try:
+            with open(path, 'r') as handle:
+                parts.append(handle.read())
+        except OSError:
+            parts.append('')
+    try:
+        parts.append(' '.join(sorted(os.listdir(SOUND_DEVICE_DIR))))
+    except OSError:
+        parts.append('')
+    return '\n'.join(parts)
+
+
+class AudioDeviceInventory:
+    """
+    probe(in_use) -> [device info dicts] does the expensive open-and-read scan; devices named in
+    `in_use` are held by our own stream and are kept without being opened again.
+    get() never probes once the first scan is done, and returns the preferred device first
+    """
+
+    def __init__(self, probe, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.probe = probe
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.devices = []
+        self.probed = threading.Event()
+        self.dirty = threading.Event()  # Set when a refresh is wanted
+        self.preferred = None  # Name of the last device that streamed - indexes change across hotplug
+        self.in_use = set()
+        self.running = False
+        self.thread = None
+        self.observer = None
+        self.fingerprint = None
+        self.refreshes = 0
+        self.last_refresh = None
+        self.last_probe_seconds = None
+
+    def start(self):
+        """Probe in the background now and watch for device changes"""
+        if self.running:
+            return
+        self.running = True
+        self.fingerprint = sound_fingerprint()
+        self.dirty.set()
+        if PYUDEV_AVAILABLE:
+            try:
+                context = pyudev.Context()
+                monitor = pyudev.Monitor.from_netlink(context)
+                monitor.filter_by(subsystem='sound')
+                self.observer = pyudev.MonitorObserver(monitor, callback=lambda device: self.invalidate())
+                self.observer.daemon = True
+                self.observer.start()
+            except Exception as e:
+                print(f"udev sound monitor unavailable, polling /proc/asound: {e}")
+                self.observer = None
+        self.thread = threading.Thread(target=self._watch_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.dirty.set()
+        if self.observer:
+            try:
+                self.observer.stop()
+            except Exception:
+                pass
+            self.observer = None
+
+    def invalidate(self):
+        """Ask the watcher for a fresh probe"""
+        self.dirty.set()
+
+    def refresh(self):
+        """Probe now on the caller's thread"""
+        with self.lock:
+            in_use = set(self.in_use)
+        started = time.monotonic()
+        try:
+            devices = list(self.probe(in_use))
+        except Exception as e:
+            print(f"Audio device probe failed: {e}")
+            devices = []
+        with self.lock:
+            self.devices = devices
+            self.refreshes += 1
+            self.last_refresh = time.time()
+            self.last_probe_seconds = round(time.monotonic() - started, 3)
+        self.probed.set()
+        return devices
+
+    def _watch_loop(self):
+        while self.running:
+            if self.dirty.wait(self.poll_interval if not self.observer else None):
+                if not self.running:
+                    return
+                if self.probed.is_set():
+                    time.sleep(SETTLE_DELAY)
+                self.dirty.clear()
+                self.fingerprint = sound_fingerprint()
+                self.refresh()
+            elif not self.observer:
+                fingerprint = sound_fingerprint()
+                if fingerprint != self.fingerprint:
+                    print("Sound devices changed, refreshing audio inventory")
+                    self.invalidate()
+
+    def get(self):
+        """(available, devices) with the preferred device first - probes only if nothing has been probed yet"""
+        if not self.probed.is_set():
+            # The startup probe may still be running - wait for it rather than open devices twice
+            if not (self.running and self.probed.wait(STARTUP_PROBE_WAIT)):
+                self.refresh()
+        with self.lock:
+            devices = list(self.devices)
+            preferred = self.preferred
+        devices.sort(key=lambda device: device.get('name') != preferred)
+        return len(devices) > 0, devices
+
+    def mark_working(self, device):
+        """Remember the device a stream opened on; it stays listed while the stream holds it"""
+        with self.lock:
+            self.preferred = device.get('name')
+            self.in_use.add(device.get('name'))
+
+    def release(self, device=None):
+        """Forget that a device is held by our stream (all devices if none given)"""
+        with self.lock:
+            if device is None:
+                self.in_use.clear()
+            else:
+                self.in_use.discard(device.get('name'))
+
+    def get_status(self):
+        """Get the cached inventory"""
+        with self.lock:
+            return {
+                'devices': [{'index': device.get('index'), 'name': device.get('name')} for device in self.devices],
+                'preferred': self.preferred,
+                'in_use': sorted(self.in_use),
+                'probed': self.probed.is_set(),
+                'refreshes': self.refreshes,
+                'last_refresh': self.last_refresh,
+                'last_probe_seconds': self.last_probe_seconds,
+                'watch': 'udev' if self.observer else 'poll'
+            }
@@ -0,0 +1,45 @@
+"""
+Audio Frames Module
+Binary audio frames for Socket.IO - a fixed little-endian header followed by the raw sample bytes,
+sent as a binary attachment instead of a hex string
+Separated from app.py so the capture thread, the dispatcher and the benchmarks share one wire format
+"""
+
+import struct
+
+AUDIO_FRAME_VERSION = 1
+
+# Payload encodings - the header's format byte
+AUDIO_FORMAT_PCM16 = 1  # Signed 16-bit little-endian PCM
+AUDIO_FORMAT_NAMES = {
+    AUDIO_FORMAT_PCM16: 'pcm16'
+}
+
+# Header: version u8, format u8, channels u8, reserved u8, sample rate u32, sequence u32,
+# capture time f64 (epoch seconds of the first sample) - 20 bytes, then the payload
+AUDIO_HEADER = struct.Struct('<BBBBIId')
+AUDIO_HEADER_SIZE = AUDIO_HEADER.size
+
+
+def pack_audio_frame(payload, seq, capture_time, sample_rate, audio_format=AUDIO_FORMAT_PCM16, channels=1):
+    """Prefix a payload with the frame header; returns bytes ready for socketio.emit"""
+    header = AUDIO_HEADER.pack(AUDIO_FRAME_VERSION, audio_format, channels, 0, sample_rate,
+                               seq & 0xFFFFFFFF, capture_time)
+    return header + payload
+
+
+def unpack_audio_frame(frame):
+    """Split a frame into (header dict, payload memoryview)"""
+    if len(frame) < AUDIO_HEADER_SIZE:
+        raise ValueError('Audio frame shorter than its header')
+    version, audio_format, channels, _, sample_rate, seq, capture_time = AUDIO_HEADER.unpack_from(frame)
+    if version != AUDIO_FRAME_VERSION:
+        raise ValueError(f'Unsupported audio frame version {version}')
+    header = {
+        'format': AUDIO_FORMAT_NAMES.get(audio_format, audio_format),
+        'channels': channels,
+        'sample_rate': sample_rate,
+        'seq': seq,
+        'capture_time': capture_time
+    }
+    return header, memoryview(frame)[AUDIO_HEADER_SIZE:]
@@ -0,0 +1,126 @@
+"""
+Audio Frame Benchmark
+Compares the old hex-string audio payload with binary frames (header + raw PCM attachment):
+bytes on the wire per frame and server CPU per frame through Socket.IO packet encoding,
+plus the receiver-side decode as a stand-in for the browser parsing the payload back,
+then each codec in the capture-side codec stage (bytes per frame, encode CPU per frame)
+Run from the repository root: python benchmarks/bench_audio_frames.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from socketio import packet
+
+from audio_codecs import available_codecs, create_audio_encoder
+from audio_frames import pack_audio_frame, unpack_audio_frame
+
+SAMPLE_RATE = 44100
+FRAMES_PER_BUFFER = 4096  # Matches audio_stream_thread
+NUM_FRAMES = 2000
+
+
+def capture_buffers():
+    """int16 buffers like PyAudio returns - noise with a tone so no byte pattern is special"""
+    rng = np.random.default_rng(1)
+    t = np.arange(FRAMES_PER_BUFFER) / SAMPLE_RATE
+    tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+    return [(tone + rng.integers(-500, 500, FRAMES_PER_BUFFER, dtype=np.int16)).tobytes() for _ in range(16)]
+
+
+def wire_size(encoded):
+    """Bytes Engine.IO sends for one encoded Socket.IO packet (text packet plus binary attachments)"""
+    if isinstance(encoded, list):
+        return sum(len(part) for part in encoded)
+    return len(encoded)
+
+
+def encode_hex(data, seq):
+    payload = {'audio': data.hex()}
+    return packet.Packet(packet.EVENT, data=['audio_data', payload]).encode()
+
+
+def encode_binary(data, seq):
+    frame = pack_audio_frame(data, seq, time.time(), SAMPLE_RATE)
+    return packet.Packet(packet.EVENT, data=['audio_data', frame]).encode()
+
+
+def decode_hex(encoded):
+    data = bytes.fromhex(packet.Packet(encoded_packet=encoded).data[1]['audio'])
+    return np.frombuffer(data, dtype=np.int16)
+
+
+def decode_binary(encoded):
+    # Engine.IO hands attachments over as-is; reattach them the way the client does
+    pkt = packet.Packet(encoded_packet=encoded[0])
+    for attachment in encoded[1:]:
+        pkt.add_attachment(attachment)
+    _, samples = unpack_audio_frame(pkt.data[1])
+    return np.frombuffer(samples, dtype=np.int16)
+
+
+def measure(encode, decode, buffers):
+    encoded = []
+    cpu_start = time.process_time()
+    for seq in range(NUM_FRAMES):
+        encoded.append(encode(buffers[seq % len(buffers)], seq))
+    encode_cpu = time.process_time() - cpu_start
+
+    cpu_start = time.process_time()
+    for item in encoded:
+        samples = decode(item)
+    decode_cpu = time.process_time() - cpu_start
+    assert len(samples) == FRAMES_PER_BUFFER
+
+    frame_bytes = wire_size(encoded[0])
+    frames_per_sec = SAMPLE_RATE / FRAMES_PER_BUFFER
+    return {
+        'bytes_per_frame': frame_bytes,
+        'kbit_per_sec': frame_bytes * 8 * frames_per_sec / 1000.0,
+        'encode_us': encode_cpu * 1e6 / NUM_FRAMES,
+        'decode_us': decode_cpu * 1e6 / NUM_FRAMES
+    }
+
+
+def measure_codec(name, buffers):
+    encoder = create_audio_encoder(name, SAMPLE_RATE)
+    samples = [np.frombuffer(data, dtype=np.int16) for data in buffers]
+    sizes = []
+    cpu_start = time.process_time()
+    for seq in range(NUM_FRAMES // 10):
+        frame = pack_audio_frame(encoder.encode(samples[seq % len(samples)]), seq, time.time(),
+                                 encoder.sample_rate, encoder.format)
+        sizes.append(len(frame))
+    encode_cpu = time.process_time() - cpu_start
+    bytes_per_frame = sum(sizes) / len(sizes)
+    return {
+        'bytes_per_frame': bytes_per_frame,
+        'kbit_per_sec': bytes_per_frame * 8 * SAMPLE_RATE / FRAMES_PER_BUFFER / 1000.0,
+        'encode_us': encode_cpu * 1e6 / len(sizes)
+    }
+
+
+def main():
+    buffers = capture_buffers()
+    print(f'{NUM_FRAMES} frames of {FRAMES_PER_BUFFER} samples at {SAMPLE_RATE} Hz '
+          f'(raw PCM {FRAMES_PER_BUFFER * 2} bytes/frame)')
+    print(f'{"payload":<10} {"bytes/frame":>12} {"kbit/s":>9} {"encode us/frame":>16} {"decode us/frame":>16}')
+    for name, encode, decode in (('hex', encode_hex, decode_hex), ('binary', encode_binary, decode_binary)):
+        result = measure(encode, decode, buffers)
+        print(f'{name:<10} {result["bytes_per_frame"]:>12} {result["kbit_per_sec"]:>9.0f} '
+              f'{result["encode_us"]:>16.1f} {result["decode_us"]:>16.1f}')
+
+    print()
+    print(f'{"codec":<10} {"bytes/frame":>12} {"kbit/s":>9} {"encode us/frame":>16}')
+    for name in available_codecs():
+        result = measure_codec(name, buffers)
+        print(f'{name:<10} {result["bytes_per_frame"]:>12.0f} {result["kbit_per_sec"]:>9.0f} '
+              f'{result["encode_us"]:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
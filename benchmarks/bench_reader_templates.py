@@ -0,0 +1,83 @@
+"""
+Reader Template Microbenchmark
+Compares per-line template matching before and after ReaderTemplateRegistry
+Run from the repository root: python benchmarks/bench_reader_templates.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_analysis import ReaderTemplateRegistry, template_to_regex
+
+NUM_CONTROLS = 12
+NUM_LINES = 20000
+
+def make_controls(count):
+    """Build reader controls shaped like the ones create_hub_control produces"""
+    controls = []
+    for i in range(count):
+        controls.append({
+            'id': f'control_{i}',
+            'name': f'Sensor{i}',
+            'type': 'reader',
+            'config': {'type': 'reader', 'command_template': f'Sensor{i}={{value}}'},
+            'awaiting_confirmation': False
+        })
+    return controls
+
+def make_lines(count):
+    """Typical firmware output - mostly matching telemetry with some chatter"""
+    lines = []
+    for i in range(count):
+        if i % 4 == 3:
+            lines.append(f'Loop {i} heartbeat ok')
+        else:
+            lines.append(f'Sensor{i % NUM_CONTROLS}={i * 0.5:.2f}')
+    return lines
+
+def legacy_match(data, controls):
+    """Template matching as analyze_serial_data_for_controls did it before the registry"""
+    results = []
+    for control in controls:
+        if control.get('type') == 'reader':
+            tmpl = control.get('config', {}).get('command_template')
+            if tmpl and '{value}' in tmpl:
+                try:
+                    m = re.search(template_to_regex(tmpl), data, re.IGNORECASE)
+                except re.error:
+                    m = None
+                if m:
+                    results.append((control, m.group(1)))
+    return results
+
+def run(label, func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    elapsed = time.perf_counter() - start
+    rate = len(lines) / elapsed
+    print(f'{label:<10} {rate:>12,.0f} lines/sec')
+    return rate
+
+def main():
+    controls = make_controls(NUM_CONTROLS)
+    lines = make_lines(NUM_LINES)
+    registry = ReaderTemplateRegistry()
+
+    # Both paths must agree before timing them
+    for line in lines[:500]:
+        expected = [(c['id'], v) for c, v in legacy_match(line, controls)]
+        actual = [(c['id'], v) for c, v in registry.match(line, lambda: controls)]
+        assert expected == actual, (line, expected, actual)
+
+    print(f'{NUM_CONTROLS} reader controls, {NUM_LINES} lines')
+    before = run('before', lambda line: legacy_match(line, controls), lines)
+    after = run('after', lambda line: registry.match(line, lambda: controls), lines)
+    print(f'speedup    {after / before:>12.1f}x')
+
+if __name__ == '__main__':
+    main()
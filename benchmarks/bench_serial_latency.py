@@ -0,0 +1,85 @@
+"""
+Serial Read Latency Benchmark
+Compares SerialPortReader modes against a pty stand-in device: line latency
+from write to framed line, and wake-ups/CPU while the port is idle
+Run from the repository root on Linux: python benchmarks/bench_serial_latency.py
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serial
+
+from serial_framing import LineFramer
+from serial_reader import SerialPortReader, READ_MODE_POLL, READ_MODE_BLOCKING, READ_MODE_SELECT
+
+NUM_LINES = 200
+IDLE_SECONDS = 1.0
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def measure(mode):
+    master, slave = os.openpty()
+    connection = serial.Serial(os.ttyname(slave), 115200, timeout=1)
+    reader = SerialPortReader(connection, 1024, mode)
+    framer = LineFramer()
+    latencies = []
+    stats = {}
+    running = True
+
+    def read_loop():
+        cpu_start = time.thread_time()
+        idle_start = None
+        while running:
+            data = reader.read()
+            now = time.perf_counter()
+            for line in framer.feed(data):
+                if line.startswith('t='):
+                    latencies.append(now - float(line[2:]))
+            if idle_start is None and len(latencies) >= NUM_LINES:
+                idle_start = (time.thread_time(), reader.idle_wakeups)
+        stats['cpu_total'] = time.thread_time() - cpu_start
+        if idle_start:
+            stats['idle_cpu'] = time.thread_time() - idle_start[0]
+            stats['idle_wakeups'] = reader.idle_wakeups - idle_start[1]
+
+    thread = threading.Thread(target=read_loop)
+    thread.start()
+
+    # Lines arrive at random phase relative to the reader so polling latency shows up
+    for _ in range(NUM_LINES):
+        time.sleep(random.uniform(0.002, 0.02))
+        os.write(master, f't={time.perf_counter():.9f}\n'.encode())
+
+    while len(latencies) < NUM_LINES:
+        time.sleep(0.01)
+    time.sleep(IDLE_SECONDS)
+
+    running = False
+    reader.wake()
+    thread.join()
+    reader.close()
+    connection.close()
+    os.close(master)
+    os.close(slave)
+    return latencies, stats
+
+def main():
+    print(f'{NUM_LINES} lines through a pty, then {IDLE_SECONDS:.0f} s idle')
+    print(f'{"mode":<10} {"p50 ms":>8} {"p99 ms":>8} {"max ms":>8} {"idle wakeups/s":>15} {"idle cpu ms/s":>14}')
+    for mode in (READ_MODE_POLL, READ_MODE_BLOCKING, READ_MODE_SELECT):
+        latencies, stats = measure(mode)
+        ms = [value * 1000.0 for value in latencies]
+        print(f'{mode:<10} {percentile(ms, 50):>8.3f} {percentile(ms, 99):>8.3f} {max(ms):>8.3f} '
+              f'{stats.get("idle_wakeups", 0) / IDLE_SECONDS:>15.0f} {stats.get("idle_cpu", 0) * 1000.0 / IDLE_SECONDS:>14.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Serial Pipeline Benchmark
+Drives serial_monitor_thread -> analyze_serial_data_for_controls -> Socket.IO emit end to end
+against a VirtualSerialDevice replaying the recorded firmware corpus
+Reports lines/sec, p50/p99 line-to-emit latency and reader-thread CPU per line per scenario,
+with analysis inline on the reader thread or staged on the analyzer/emitter pipeline
+Run from the repository root on Linux: python benchmarks/bench_serial_pipeline.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from serial_sessions import SerialSession
+from virtual_serial import VirtualSerialDevice, load_corpus
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'firmware_corpus.txt')
+THROUGHPUT_LINES = 20000
+PACED_LINES = 2000
+PACED_RATE = 500  # Lines/sec for the latency runs - a chatty board at 115200 baud
+READER_TEMPLATES = ['Speed={value}', 'RPM: {value}', 'Temp = {value}', 'Direction={value}']
+
+# Scenarios: (name, batch option, pipeline option, line rate, baud, lines)
+SCENARIOS = [
+    ('inline max rate', False, False, None, None, THROUGHPUT_LINES),
+    ('staged max rate', False, True, None, None, THROUGHPUT_LINES),
+    ('staged batched max', True, True, None, None, THROUGHPUT_LINES),
+    (f'inline {PACED_RATE}/s', False, False, PACED_RATE, 115200, PACED_LINES),
+    (f'staged {PACED_RATE}/s', False, True, PACED_RATE, 115200, PACED_LINES),
+    (f'staged batched {PACED_RATE}/s', True, True, PACED_RATE, 115200, PACED_LINES),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class EmitRecorder:
+    """Stands in for socketio.emit and stamps each serial line as it leaves the server"""
+
+    def __init__(self):
+        self.emit_times = []
+        self.lock = threading.Lock()
+
+    def emit(self, event, payload=None, **kwargs):
+        now = time.perf_counter()
+        if event == 'serial_data':
+            count = 1
+        elif event == 'serial_batch':
+            count = len(payload['lines'])
+        else:
+            return
+        with self.lock:
+            self.emit_times.extend([now] * count)
+
+
+def install_reader_controls():
+    """Reader controls with confirmed templates so every line runs the template scan"""
+    app.hub_controls.clear()
+    for template in READER_TEMPLATES:
+        name = template.split('{')[0].strip(' =:')
+        control = app.create_hub_control(name, None, 'reader')
+        app.hub_controls.update(control['id'], {'config': {'command_template': template}, 'awaiting_confirmation': False})
+
+
+def run_scenario(lines, batch, pipeline, line_rate, baudrate, num_lines):
+    recorder = EmitRecorder()
+    app.socketio.emit = recorder.emit  # Measure the emit boundary without a connected client
+
+    device = VirtualSerialDevice(lines, line_rate=line_rate, baudrate=baudrate)
+    port = device.open()
+    connection = app.initialize_serial_connection(port, baudrate or 115200)
+    session = SerialSession(port, baudrate or 115200, connection)
+    app.configure_serial_batcher(session, batch)
+    app.configure_serial_pipeline(session, pipeline)
+    session.active = True
+    cpu = {}
+
+    def monitor():
+        cpu_start = time.thread_time()
+        app.serial_monitor_thread(session)
+        cpu['monitor'] = time.thread_time() - cpu_start
+
+    thread = threading.Thread(target=monitor)
+    started = time.perf_counter()
+    thread.start()
+    device.start(max_lines=num_lines)
+
+    # Wait for every line, or give up once the device is done and nothing arrives for a second
+    last_count, last_change = 0, time.monotonic()
+    while len(recorder.emit_times) < num_lines:
+        time.sleep(0.005)
+        if len(recorder.emit_times) != last_count:
+            last_count, last_change = len(recorder.emit_times), time.monotonic()
+        elif device.done.is_set() and time.monotonic() - last_change > 1.0:
+            break
+    elapsed = (recorder.emit_times[-1] if recorder.emit_times else time.perf_counter()) - started
+
+    session.stop()
+    thread.join(timeout=2.0)
+    device.stop()
+
+    emitted = min(len(recorder.emit_times), len(device.sent_times))
+    latencies = [(recorder.emit_times[i] - device.sent_times[i]) * 1000.0 for i in range(emitted)]
+    return {
+        'lines': emitted,
+        'lines_per_sec': emitted / elapsed if elapsed > 0 else 0.0,
+        'p50': percentile(latencies, 50) if latencies else 0.0,
+        'p99': percentile(latencies, 99) if latencies else 0.0,
+        'cpu_us_per_line': cpu.get('monitor', 0.0) * 1e6 / emitted if emitted else 0.0
+    }
+
+
+def main():
+    lines = load_corpus(CORPUS_FILE)
+    install_reader_controls()
+    print(f'Corpus: {len(lines)} lines, {len(READER_TEMPLATES)} reader templates')
+    print(f'{"scenario":<22} {"lines":>7} {"lines/s":>10} {"p50 ms":>8} {"p99 ms":>8} {"reader us/line":>15}')
+    for name, batch, pipeline, line_rate, baudrate, num_lines in SCENARIOS:
+        result = run_scenario(lines, batch, pipeline, line_rate, baudrate, num_lines)
+        print(f'{name:<22} {result["lines"]:>7} {result["lines_per_sec"]:>10.0f} {result["p50"]:>8.3f} '
+              f'{result["p99"]:>8.3f} {result["cpu_us_per_line"]:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
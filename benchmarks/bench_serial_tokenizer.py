@@ -0,0 +1,76 @@
+"""
+Serial Command Tokenizer Benchmark
+Checks extract_commands against the original four findall passes on a recorded
+firmware corpus and reports lines/sec for both
+Run from the repository root: python benchmarks/bench_serial_tokenizer.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_analysis import extract_commands
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'firmware_corpus.txt')
+REPEAT = 500
+
+def legacy_extract_commands(data):
+    """Command detection as analyze_serial_data_for_controls did it before the tokenizer"""
+    command_patterns = [
+        r"'([a-zA-Z0-9_]+)'\s*(?:\w+\s+)*([a-zA-Z0-9_]+)",
+        r"'([a-zA-Z0-9_]+)'\s*or\s*'([a-zA-Z0-9_]+)'",
+        r"(?:commands?|options?)\s*:\s*([a-zA-Z0-9_,\s]+)",
+        r"'([a-zA-Z0-9_]+)'",
+    ]
+    detected_commands = set()
+    for pattern in command_patterns:
+        for match in re.findall(pattern, data, re.IGNORECASE):
+            if isinstance(match, tuple):
+                for cmd in match:
+                    cmd = cmd.strip()
+                    if cmd and len(cmd) > 0:
+                        detected_commands.add(cmd.lower())
+            else:
+                cmd = match.strip()
+                if cmd and len(cmd) > 0:
+                    detected_commands.add(cmd.lower())
+    return detected_commands
+
+def load_corpus():
+    with open(CORPUS_FILE, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def run(label, func, lines):
+    start = time.perf_counter()
+    for line in lines:
+        func(line)
+    elapsed = time.perf_counter() - start
+    rate = len(lines) / elapsed
+    print(f'{label:<10} {rate:>12,.0f} lines/sec')
+    return rate
+
+def main():
+    corpus = load_corpus()
+
+    # Results must be identical line by line before timing anything
+    mismatches = 0
+    for line in corpus:
+        expected = legacy_extract_commands(line)
+        actual = extract_commands(line)
+        if expected != actual:
+            mismatches += 1
+            print(f'MISMATCH {line!r}: {expected} != {actual}')
+    if mismatches:
+        sys.exit(1)
+
+    lines = corpus * REPEAT
+    print(f'{len(corpus)} corpus lines x {REPEAT}, identical results')
+    before = run('before', legacy_extract_commands, lines)
+    after = run('after', extract_commands, lines)
+    print(f'speedup    {after / before:>12.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Serial Reconnect Check
+Drives the Socket.IO handlers with test clients against a VirtualSerialDevice: a viewer leaving
+must not stop the session, and a client reconnecting (a page reload) must rejoin the running
+session and get its scrollback; once the room stays empty the session stops after the idle grace
+Run from the repository root on Linux: python benchmarks/check_serial_reconnect.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from virtual_serial import VirtualSerialDevice
+
+LINE_RATE = 200  # Lines/sec from the stand-in board
+IDLE_GRACE = 1.0  # Shortened so the expiry step doesn't wait a minute
+
+
+def received(client, event):
+    """Payloads of one event name from everything the client has received so far"""
+    return [packet['args'][0] for packet in client.get_received() if packet['name'] == event]
+
+
+def check(condition, message):
+    print(f'{"ok  " if condition else "FAIL"} {message}')
+    if not condition:
+        sys.exit(1)
+
+
+def main():
+    app.serial_sessions.idle_grace = IDLE_GRACE
+    device = VirtualSerialDevice([f'Speed={i}' for i in range(1000)], line_rate=LINE_RATE, baudrate=115200)
+    port = device.open()
+    device.start()
+    try:
+        starter = app.socketio.test_client(app.app)
+        starter.emit('start_serial_monitor', {'port': port, 'baudrate': 115200, 'record': False})
+        statuses = [status['status'] for status in received(starter, 'serial_status')]
+        check('started' in statuses, f'session started on {port}')
+
+        viewer = app.socketio.test_client(app.app)
+        viewer.emit('join_serial_session', {'port': port})
+        time.sleep(0.5)
+        viewer.disconnect()
+        received(starter, 'serial_data')  # Discard what arrived before the viewer left
+        time.sleep(0.5)
+        check(app.serial_sessions.resolve(port) is not None, 'session survives a viewer disconnecting')
+        check(len(received(starter, 'serial_data')) > 0, 'starter still receives lines after the viewer left')
+
+        # A reload: the starter's socket goes away and a new one rejoins, as the page does on connect
+        starter.disconnect()
+        time.sleep(0.3)
+        check(app.serial_sessions.resolve(port) is not None, 'session survives its starter disconnecting')
+        reloaded = app.socketio.test_client(app.app)
+        reloaded.emit('join_serial_session', {'port': port})
+        packets = reloaded.get_received()
+        statuses = [packet['args'][0]['status'] for packet in packets if packet['name'] == 'serial_status']
+        scrollback = [packet['args'][0] for packet in packets if packet['name'] == 'serial_scrollback']
+        check(statuses == ['joined'], f'reconnected client rejoins the session ({statuses})')
+        check(len(scrollback) == 1 and len(scrollback[0]['lines']) > 0,
+              f'reconnected client receives serial_scrollback '
+              f'({len(scrollback[0]["lines"]) if scrollback else 0} lines)')
+
+        reloaded.disconnect()
+        time.sleep(IDLE_GRACE + 0.5)
+        check(app.serial_sessions.resolve(port) is None, f'session stops {IDLE_GRACE:.0f}s after its room empties')
+    finally:
+        app.serial_sessions.stop_all()
+        device.stop()
+
+
+if __name__ == '__main__':
+    main()
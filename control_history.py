@@ -0,0 +1,153 @@
+"""
+Control History Module
+Fixed-capacity NumPy ring buffers of reader control values with decimated range queries
+Separated from app.py so the serial path only pays for an array store per value
+"""
+
+import time
+import threading
+import numpy as np
+
+# Samples kept per reader control - about 2 minutes at 500 Hz, hours at typical 1-10 Hz
+DEFAULT_HISTORY_CAPACITY = 65536
+DEFAULT_HISTORY_POINTS = 1000
+MAX_HISTORY_POINTS = 10000
+
+
+class ControlHistory:
+    """Ring buffer of (monotonic timestamp, float64 value) samples for one control"""
+
+    def __init__(self, capacity=DEFAULT_HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # Next write position
+        self.count = 0
+
+    def append(self, value, timestamp):
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, values, timestamp):
+        """Append an array of samples sharing one timestamp (a decoded telemetry batch)"""
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        n = len(values)
+        first = min(n, self.capacity - self.head)
+        self.values[self.head:self.head + first] = values[:first]
+        self.timestamps[self.head:self.head + first] = timestamp
+        if n > first:
+            self.values[:n - first] = values[first:]
+            self.timestamps[:n - first] = timestamp
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def ordered(self):
+        """Return (timestamps, values) in chronological order"""
+        if self.count < self.capacity:
+            return self.timestamps[:self.count].copy(), self.values[:self.count].copy()
+        return (np.concatenate((self.timestamps[self.head:], self.timestamps[:self.head])),
+                np.concatenate((self.values[self.head:], self.values[:self.head])))
+
+
+def decimate(timestamps, values, start, end, points):
+    """
+    Reduce samples in [start, end] to at most `points` time buckets
+    Each bucket reports its mean time plus min/max/mean value so spikes survive the reduction
+    """
+    lo = np.searchsorted(timestamps, start, side='left')
+    hi = np.searchsorted(timestamps, end, side='right')
+    ts = timestamps[lo:hi]
+    vs = values[lo:hi]
+
+    if len(ts) <= points:
+        return ts, vs, vs, vs
+
+    # Equal-width time buckets, one per requested pixel; empty buckets are dropped
+    edges = np.linspace(ts[0], ts[-1], points + 1)
+    starts = np.searchsorted(ts, edges[:-1], side='left')
+    starts = np.unique(starts[starts < len(ts)])
+    counts = np.diff(np.append(starts, len(ts)))
+
+    bucket_times = np.add.reduceat(ts, starts) / counts
+    bucket_min = np.minimum.reduceat(vs, starts)
+    bucket_max = np.maximum.reduceat(vs, starts)
+    bucket_mean = np.add.reduceat(vs, starts) / counts
+    return bucket_times, bucket_min, bucket_max, bucket_mean
+
+
+class ControlHistoryStore:
+    """Per-control histories keyed by control id"""
+
+    def __init__(self, capacity=DEFAULT_HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.histories = {}
+        self.lock = threading.Lock()
+
+    def record(self, control_id, value, timestamp=None):
+        """Append one sample for a control"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.lock:
+            history = self.histories.get(control_id)
+            if history is None:
+                history = self.histories[control_id] = ControlHistory(self.capacity)
+            history.append(value, timestamp)
+
+    def record_many(self, control_id, values, timestamp=None):
+        """Append a batch of samples for a control"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.lock:
+            history = self.histories.get(control_id)
+            if history is None:
+                history = self.histories[control_id] = ControlHistory(self.capacity)
+            history.extend(values, timestamp)
+
+    def remove(self, control_id):
+        with self.lock:
+            self.histories.pop(control_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.histories.clear()
+
+    def query(self, control_id, start=None, end=None, points=DEFAULT_HISTORY_POINTS):
+        """
+        Decimated history for a control
+        start/end are wall-clock epoch seconds; negative values are seconds before now
+        Returns None when the control has no history
+        """
+        with self.lock:
+            history = self.histories.get(control_id)
+            if history is None:
+                return None
+            timestamps, values = history.ordered()
+
+        # Samples are stamped with the monotonic clock; convert at the API boundary
+        now_wall = time.time()
+        wall_offset = now_wall - time.monotonic()
+
+        def to_monotonic(wall_time, default):
+            if wall_time is None:
+                return default
+            if wall_time < 0:
+                wall_time = now_wall + wall_time
+            return wall_time - wall_offset
+
+        start_mono = to_monotonic(start, -np.inf)
+        end_mono = to_monotonic(end, np.inf)
+        points = max(1, min(int(points), MAX_HISTORY_POINTS))
+
+        times, mins, maxs, means = decimate(timestamps, values, start_mono, end_mono, points)
+        return {
+            'id': control_id,
+            'points': len(times),
+            'samples': int(history.count),
+            't': np.round(times + wall_offset, 6).tolist(),
+            'min': mins.tolist(),
+            'max': maxs.tolist(),
+            'mean': means.tolist()
+        }
@@ -0,0 +1,308 @@
+"""
+Control Rules Module
+Closed-loop rules on reader control values - a condition on one reader fires an action on a control
+or a raw serial write, with hysteresis, rate limits and fire counts
+Separated from app.py so rules are evaluated on the analysis thread the moment a value is parsed
+"""
+
+import time
+import threading
+import operator
+from collections import deque
+
+COMPARISONS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+OP_STABLE = 'stable'  # Value stays within 'band' for 'duration_ms'
+RULE_OPS = tuple(COMPARISONS) + (OP_STABLE,)
+MAX_RULES = 256
+
+
+def parse_action(spec, field):
+    """Validate an action: {'control', 'value' | 'step'} or {'line', 'port'?}"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"'{field}' must be an object")
+    if 'control' in spec:
+        if 'step' in spec:
+            try:
+                step = float(spec['step'])
+            except (TypeError, ValueError):
+                raise ValueError(f"'{field}.step' must be a number")
+            return {'control': str(spec['control']), 'step': step}
+        if 'value' not in spec:
+            raise ValueError(f"'{field}' needs 'value' or 'step' for its control")
+        return {'control': str(spec['control']), 'value': spec['value']}
+    if isinstance(spec.get('line'), str):
+        return {'line': spec['line'], 'port': spec.get('port')}
+    raise ValueError(f"'{field}' needs 'control' or 'line'")
+
+
+def number(spec, key, default=None, minimum=None):
+    value = spec.get(key, default)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a number")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{key}' must be at least {minimum}")
+    return value
+
+
+class ControlRule:
+    """
+    One rule: when the source reader's value meets the condition, run 'then' once per entry into the
+    condition ('repeat' re-fires on every value while it holds); 'release' runs when it stops holding.
+    'hysteresis' widens the condition once it is met so a noisy value doesn't chatter across it;
+    'min_interval_ms' rate-limits fires and 'max_fires' disables the rule after that many
+    """
+
+    def __init__(self, rule_id, spec):
+        when = spec.get('when')
+        if not isinstance(when, dict) or not when.get('control'):
+            raise ValueError("'when' needs the reader 'control' to watch")
+        self.op = when.get('op', '>')
+        if self.op not in RULE_OPS:
+            raise ValueError(f"'op' must be one of {', '.join(RULE_OPS)}")
+        if self.op == OP_STABLE:
+            self.threshold = None
+            self.band = number(when, 'band', minimum=0)
+            self.duration = number(when, 'duration_ms', minimum=0)
+            if self.band is None or self.duration is None:
+                raise ValueError("'stable' needs 'band' and 'duration_ms'")
+            self.duration /= 1000.0
+        else:
+            self.threshold = number(when, 'threshold')
+            if self.threshold is None:
+                raise ValueError(f"'{self.op}' needs a 'threshold'")
+            self.band = self.duration = None
+        self.hysteresis = number(when, 'hysteresis', 0.0, minimum=0)
+        self.source = str(when['control'])
+
+        self.id = rule_id
+        self.name = str(spec.get('name') or rule_id)
+        self.then = parse_action(spec.get('then'), 'then')
+        self.release = parse_action(spec['release'], 'release') if spec.get('release') else None
+        self.repeat = bool(spec.get('repeat', False))
+        self.min_interval = number(spec, 'min_interval_ms', 0.0, minimum=0) / 1000.0
+        max_fires = number(spec, 'max_fires', minimum=1)
+        self.max_fires = int(max_fires) if max_fires else None
+        self.enabled = bool(spec.get('enabled', True))
+        self.spec = spec
+
+        self.active = False
+        self.last_fire = None  # Monotonic time of the last 'then' action
+        self.last_value = None
+        self.evaluations = 0
+        self.fires = 0
+        self.releases = 0
+        self.rate_limited = 0
+        # 'stable' window: samples covering the last duration, plus monotonic min/max queues
+        self.samples = deque()
+        self.window_min = deque()
+        self.window_max = deque()
+        self.sample_seq = 0
+
+    def _stable(self, value, now):
+        """True once the value has stayed within the band for the whole duration"""
+        band = self.band + self.hysteresis if self.active else self.band
+        sample = (self.sample_seq, now, value)
+        self.sample_seq += 1
+        self.samples.append(sample)
+        while self.window_min and self.window_min[-1][2] >= value:
+            self.window_min.pop()
+        self.window_min.append(sample)
+        while self.window_max and self.window_max[-1][2] <= value:
+            self.window_max.pop()
+        self.window_max.append(sample)
+
+        # Drop the oldest samples until the rest fit in the band, then those older than needed
+        while self.window_max[0][2] - self.window_min[0][2] > band:
+            self._drop_oldest()
+        horizon = now - self.duration
+        while len(self.samples) > 1 and self.samples[1][1] <= horizon:
+            self._drop_oldest()
+        return self.samples[0][1] <= horizon
+
+    def _drop_oldest(self):
+        oldest = self.samples.popleft()
+        if self.window_min[0] is oldest:
+            self.window_min.popleft()
+        if self.window_max[0] is oldest:
+            self.window_max.popleft()
+
+    def condition(self, value, now):
+        if self.op == OP_STABLE:
+            return self._stable(value, now)
+        if self.active and self.hysteresis:
+            # Hold until the value is back past the threshold by the hysteresis margin
+            if self.op in ('>', '>='):
+                return value > self.threshold - self.hysteresis
+            return value < self.threshold + self.hysteresis
+        return COMPARISONS[self.op](value, self.threshold)
+
+    def evaluate(self, value, now):
+        """Update state with a new value; returns the actions to run (caller holds the engine lock)"""
+        self.evaluations += 1
+        self.last_value = value
+        met = self.condition(value, now)
+        actions = []
+        if met and (not self.active or self.repeat):
+            if self.last_fire is not None and now - self.last_fire < self.min_interval:
+                # State is left as it was, so an entry that came too soon retries on the next value
+                self.rate_limited += 1
+                return actions
+            self.last_fire = now
+            self.fires += 1
+            actions.append(self.then)
+            if self.max_fires and self.fires >= self.max_fires:
+                self.enabled = False
+        elif not met and self.active and self.release:
+            self.releases += 1
+            actions.append(self.release)
+        self.active = met
+        return actions
+
+    def reset(self):
+        self.active = False
+        self.samples.clear()
+        self.window_min.clear()
+        self.window_max.clear()
+
+    def get_status(self):
+        """Get the rule definition and its counters"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'when': self.spec.get('when'),
+            'then': self.then,
+            'release': self.release,
+            'repeat': self.repeat,
+            'min_interval_ms': self.min_interval * 1000.0,
+            'max_fires': self.max_fires,
+            'enabled': self.enabled,
+            'active': self.active,
+            'last_value': self.last_value,
+            'evaluations': self.evaluations,
+            'fires': self.fires,
+            'releases': self.releases,
+            'rate_limited': self.rate_limited
+        }
+
+
+class ControlRuleEngine:
+    """
+    Rules indexed by the reader control they watch
+    observe() is called from the analysis path for every parsed reader value; controls no rule watches
+    cost one dict lookup. execute(rule, action, context) performs an action and is called without the lock.
+    validate(rule) -> error message or None is checked before a new definition goes live
+    """
+
+    def __init__(self, execute, validate=None):
+        self.execute = execute
+        self.validate = validate
+        self.lock = threading.Lock()
+        self.rules = {}  # id -> ControlRule, insertion ordered
+        self.by_source = {}  # reader control id -> [rules]; replaced, never mutated
+        self.next_id = 1
+        self.action_errors = 0
+
+    def _reindex(self):
+        """Rebuild the source index - caller holds the lock"""
+        by_source = {}
+        for rule in self.rules.values():
+            by_source.setdefault(rule.source, []).append(rule)
+        self.by_source = by_source
+
+    def _build(self, rule_id, spec):
+        """Parse and validate a rule without installing it"""
+        rule = ControlRule(rule_id, spec)
+        error = self.validate(rule) if self.validate else None
+        if error:
+            raise ValueError(error)
+        return rule
+
+    def add(self, spec):
+        """Create a rule from its JSON spec; raises ValueError if the spec is invalid"""
+        with self.lock:
+            if len(self.rules) >= MAX_RULES:
+                raise ValueError(f'At most {MAX_RULES} rules')
+            rule = self._build(f'rule_{self.next_id}', spec)
+            self.next_id += 1
+            self.rules[rule.id] = rule
+            self._reindex()
+            return rule
+
+    def replace(self, rule_id, spec):
+        """
+        Redefine a rule in place, keeping its id; its state and counters start over
+        Raises ValueError, leaving the current definition running untouched, if the spec is invalid
+        """
+        with self.lock:
+            if rule_id not in self.rules:
+                return None
+            rule = self._build(rule_id, spec)
+            self.rules[rule_id] = rule
+            self._reindex()
+            return rule
+
+    def set_enabled(self, rule_id, enabled):
+        with self.lock:
+            rule = self.rules.get(rule_id)
+            if rule:
+                rule.enabled = bool(enabled)
+                rule.reset()
+            return rule
+
+    def remove(self, rule_id):
+        with self.lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule:
+                self._reindex()
+            return rule
+
+    def get(self, rule_id):
+        return self.rules.get(rule_id)
+
+    def all(self):
+        with self.lock:
+            return list(self.rules.values())
+
+    def watches(self, control_id):
+        return control_id in self.by_source
+
+    def observe(self, control_id, value, context=None):
+        """Evaluate the rules watching a reader control against its new value"""
+        if control_id in self.by_source:
+            self.observe_many(control_id, (value,), context)
+
+    def observe_many(self, control_id, values, context=None):
+        """Evaluate a run of values (one telemetry read) in order, under one lock acquisition"""
+        rules = self.by_source.get(control_id)
+        if not rules:
+            return
+        now = time.monotonic()
+        fired = []
+        with self.lock:
+            for value in values:
+                for rule in rules:
+                    if rule.enabled:
+                        for action in rule.evaluate(value, now):
+                            fired.append((rule, action))
+        for rule, action in fired:
+            try:
+                self.execute(rule, action, context)
+            except Exception as e:
+                self.action_errors += 1
+                print(f"Rule {rule.name} action error: {e}")
+
+    def get_status(self):
+        """Get every rule with its counters"""
+        return {
+            'rules': [rule.get_status() for rule in self.all()],
+            'action_errors': self.action_errors
+        }
@@ -0,0 +1,120 @@
+"""
+Hub Control Registry Module
+Indexed registry of hub controls shared by the Socket.IO handlers, REST routes and serial analysis
+Separated from app.py so every lookup and mutation goes through one lock
+"""
+
+import threading
+
+from serial_analysis import ReaderTemplateRegistry
+
+
+class HubControlRegistry:
+    """
+    Hub controls indexed by id and by lowercase name, plus the active reader controls
+    All indexes are maintained under one lock so lookups are O(1) instead of list scans
+    """
+
+    def __init__(self, on_template_change=None):
+        self.lock = threading.RLock()
+        self.on_template_change = on_template_change  # Called with a control id when its command_template changes
+        self.controls = {}  # id -> control, insertion ordered
+        self.names = {}  # exact name -> control (used to de-duplicate creation)
+        self.lower_names = {}  # lowercase name -> [controls]
+        self.readers = []  # Active reader controls, rebuilt on change
+        self.templates = ReaderTemplateRegistry()  # Compiled reader templates
+
+    def __len__(self):
+        with self.lock:
+            return len(self.controls)
+
+    def _changed(self):
+        """Refresh derived state - caller must hold the lock"""
+        self.readers = [c for c in self.controls.values() if c.get('type') == 'reader']
+        self.templates.invalidate()
+
+    def add(self, control):
+        """Register a new control"""
+        with self.lock:
+            self.controls[control['id']] = control
+            self.names[control['name']] = control
+            self.lower_names.setdefault(control['name'].lower(), []).append(control)
+            self._changed()
+            return control
+
+    def get(self, control_id):
+        """Look up a control by id"""
+        return self.controls.get(control_id)
+
+    def find_by_name(self, name):
+        """Look up a control by its exact name"""
+        return self.names.get(name)
+
+    def readers_named(self, name):
+        """Reader controls whose name matches case-insensitively"""
+        return [c for c in self.lower_names.get(name.lower(), ()) if c.get('type') == 'reader']
+
+    def update(self, control_id, changes):
+        """Apply allowed field changes to a control; returns the control or None if not found"""
+        with self.lock:
+            control = self.controls.get(control_id)
+            if control is None:
+                return None
+            template = control['config'].get('command_template')
+            if 'config' in changes:
+                control['config'].update(changes['config'])
+            if 'device' in changes:
+                control['device'].update(changes['device'])
+            if 'enabled' in changes:
+                control['enabled'] = changes['enabled']
+            if 'awaiting_confirmation' in changes:
+                control['awaiting_confirmation'] = changes['awaiting_confirmation']
+            self._changed()
+            if self.on_template_change and control['config'].get('command_template') != template:
+                self.on_template_change(control_id)
+            return control
+
+    def remove(self, control_id):
+        """Remove a control by id; returns the removed control or None"""
+        with self.lock:
+            control = self.controls.pop(control_id, None)
+            if control is None:
+                return None
+            if self.names.get(control['name']) is control:
+                del self.names[control['name']]
+            lower = control['name'].lower()
+            same_name = [c for c in self.lower_names.get(lower, ()) if c is not control]
+            if same_name:
+                self.lower_names[lower] = same_name
+            else:
+                self.lower_names.pop(lower, None)
+            self._changed()
+            return control
+
+    def clear(self):
+        """Remove every control"""
+        with self.lock:
+            self.controls.clear()
+            self.names.clear()
+            self.lower_names.clear()
+            self._changed()
+
+    def all(self):
+        """Snapshot of every control in creation order"""
+        with self.lock:
+            return list(self.controls.values())
+
+    def reader_controls(self):
+        """Current list of reader controls - replaced, never mutated, so safe to iterate"""
+        return self.readers
+
+    def match_readers(self, data):
+        """Run every reader template against a serial line"""
+        # The readers list is read inside the templates lock, after any pending _changed() swapped it in
+        return self.templates.match(data, lambda: self.readers)
+
+
+def control_port(control):
+    """Serial port a control is bound to - 'auto' follows the most recent serial session"""
+    device = control.get('device') or {}
+    return device.get('port') or 'auto'
@@ -0,0 +1,292 @@
+"""
+Serial Analysis Module
+Compiled matchers used by analyze_serial_data_for_controls in app.py
+Kept separate from app.py so the per-line hot path can be benchmarked on its own
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+# Numeric capture used for the {value} placeholder in reader templates
+VALUE_PATTERN = r'([+-]?\d*\.?\d+)'
+
+
+def template_to_regex(tmpl):
+    """
+    Convert a reader command_template into a permissive regex string
+    e.g. 'Test={value}RPM' matches 'Test = 3RPM'
+    """
+    # Replace {value} placeholder first so it survives escaping
+    tmpl_pattern = tmpl.replace('{value}', '<<<VALUE>>>')
+    # Escape special regex characters
+    tmpl_escaped = re.escape(tmpl_pattern)
+    # Replace the placeholder with numeric capture
+    tmpl_escaped = tmpl_escaped.replace('<<<VALUE>>>', VALUE_PATTERN)
+    # Allow optional whitespace around = or :
+    tmpl_escaped = tmpl_escaped.replace(r'\=', r'\s*=\s*')
+    tmpl_escaped = tmpl_escaped.replace(r'\:', r'\s*:\s*')
+    # Replace escaped spaces with flexible whitespace
+    tmpl_escaped = tmpl_escaped.replace(r'\ ', r'\s+')
+    return tmpl_escaped
+
+
+class ReaderTemplateRegistry:
+    """
+    Compiles reader control templates once and matches them in a single scan
+    The registry is rebuilt lazily after invalidate() is called on control create/update/delete
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dirty = True
+        self.entries = []  # (control, compiled pattern) pairs
+        self.combined = None  # One regex that evaluates every template per line
+        self.builds = 0
+
+    def invalidate(self):
+        """Mark the compiled matchers stale - call after a control is created, updated or deleted"""
+        with self.lock:
+            self.dirty = True
+
+    def rebuild(self, controls):
+        """Compile every active reader template and merge them into one combined pattern"""
+        entries = []
+        branches = []
+        for control in controls:
+            try:
+                if control.get('type') != 'reader':
+                    continue
+                tmpl = control.get('config', {}).get('command_template')
+                if not tmpl or '{value}' not in tmpl:
+                    continue
+                pattern = template_to_regex(tmpl)
+                compiled = re.compile(pattern, re.IGNORECASE)
+            except (re.error, AttributeError, TypeError):
+                # Skip templates that cannot be compiled, same as the per-line fallback did
+                continue
+            # Each template becomes an optional lookahead anchored at the start of the line,
+            # so every template is searched independently exactly like re.search would
+            group_pattern = pattern.replace(VALUE_PATTERN, f'(?P<v{len(entries)}>[+-]?\\d*\\.?\\d+)', 1)
+            branches.append(f'(?:(?=.*?{group_pattern}))?')
+            entries.append((control, compiled))
+
+        combined = None
+        if entries:
+            try:
+                combined = re.compile(''.join(branches), re.IGNORECASE | re.DOTALL)
+            except re.error:
+                combined = None
+
+        self.entries = entries
+        self.combined = combined
+        self.dirty = False
+        self.builds += 1
+
+    def match(self, data, get_controls):
+        """
+        Return (control, value_string) for every reader template that matches the line
+        get_controls() is only called when the registry has been invalidated, and under the lock -
+        a list fetched before an invalidate() could otherwise be compiled and marked current
+        """
+        with self.lock:
+            if self.dirty:
+                self.rebuild(get_controls())
+            entries = self.entries
+            combined = self.combined
+
+        if not entries:
+            return []
+
+        results = []
+        if combined is not None:
+            m = combined.match(data)
+            if m is None:
+                return results
+            for i, (control, _) in enumerate(entries):
+                value = m.group(f'v{i}')
+                if value is not None:
+                    results.append((control, value))
+            return results
+
+        # Combined pattern unavailable - fall back to the individually compiled matchers
+        for control, compiled in entries:
+            m = compiled.search(data)
+            if m:
+                results.append((control, m.group(1)))
+        return results
+
+
+# Command option patterns from help text - these all need a quote character
+QUOTED_COMMAND_PATTERNS = [
+    # "Enter 'on' to turn LED on, 'off' to turn LED off"
+    re.compile(r"'([a-zA-Z0-9_]+)'\s*(?:\w+\s+)*([a-zA-Z0-9_]+)", re.IGNORECASE),
+    # "Use 'on' or 'off'"
+    re.compile(r"'([a-zA-Z0-9_]+)'\s*or\s*'([a-zA-Z0-9_]+)'", re.IGNORECASE),
+    # Single quoted commands
+    re.compile(r"'([a-zA-Z0-9_]+)'", re.IGNORECASE),
+]
+
+# "Commands: on, off" - needs a colon
+LISTING_COMMAND_PATTERN = re.compile(r"(?:commands?|options?)\s*:\s*([a-zA-Z0-9_,\s]+)", re.IGNORECASE)
+
+
+def extract_commands(data):
+    """
+    Detect command options from help text in a single serial line
+    Telemetry lines carry no quote or colon, so they cost one memchr pass instead of four regex scans
+    """
+    detected_commands = set()
+
+    if "'" in data:
+        for pattern in QUOTED_COMMAND_PATTERNS:
+            for match in pattern.findall(data):
+                if isinstance(match, tuple):
+                    # Multiple commands in one match
+                    for cmd in match:
+                        cmd = cmd.strip()
+                        if cmd:
+                            detected_commands.add(cmd.lower())
+                else:
+                    cmd = match.strip()
+                    if cmd:
+                        detected_commands.add(cmd.lower())
+
+    if ':' in data:
+        for match in LISTING_COMMAND_PATTERN.findall(data):
+            cmd = match.strip()
+            if cmd:
+                detected_commands.add(cmd.lower())
+
+    return detected_commands
+
+
+# Known command tokens kept for the snapshot endpoint
+DEFAULT_COMMAND_CAPACITY = 256
+
+
+class CommandTracker:
+    """
+    Bounded LRU of detected command tokens that reports only newly discovered ones
+    Lets the serial monitor send deltas instead of the whole set after every line
+    """
+
+    def __init__(self, capacity=DEFAULT_COMMAND_CAPACITY):
+        self.capacity = capacity
+        self.known = OrderedDict()
+        self.new_commands = []  # Discovered since the last take_new()
+        self.lock = threading.Lock()
+
+    def observe(self, commands):
+        """Record commands seen on a line; returns the ones not already known"""
+        if not commands:
+            return []
+        discovered = []
+        with self.lock:
+            for cmd in commands:
+                if cmd in self.known:
+                    self.known.move_to_end(cmd)
+                    continue
+                self.known[cmd] = True
+                discovered.append(cmd)
+                if len(self.known) > self.capacity:
+                    self.known.popitem(last=False)
+            self.new_commands.extend(discovered)
+        return discovered
+
+    def take_new(self):
+        """Return and reset the commands discovered since the last call"""
+        with self.lock:
+            discovered = self.new_commands
+            self.new_commands = []
+        return discovered
+
+    def snapshot(self):
+        """Every known command, least recently seen first"""
+        with self.lock:
+            return list(self.known)
+
+    def clear(self):
+        with self.lock:
+            self.known.clear()
+            self.new_commands = []
+
+
+# Detected value names expire this long after they were last seen
+DEFAULT_PATTERN_TTL = 30.0
+DEFAULT_PATTERN_CAPACITY = 512
+
+
+class ValuePatternStore:
+    """
+    Detected values keyed by name, kept in last-seen order so expiry only inspects the oldest entry
+    Replaces a full scan of every name ever seen on each serial line with amortized O(1) eviction
+    """
+
+    def __init__(self, ttl=DEFAULT_PATTERN_TTL, capacity=DEFAULT_PATTERN_CAPACITY):
+        self.ttl = float(ttl)
+        self.capacity = max(1, int(capacity))
+        self.patterns = OrderedDict()  # name -> info dict, least recently seen first
+        self.names = []  # Cached name list, rebuilt only when membership changes
+        self.lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def update(self, name, info):
+        """Merge info for a name and mark it most recently seen"""
+        with self.lock:
+            existing = self.patterns.get(name)
+            if existing is None:
+                self.patterns[name] = info
+                if len(self.patterns) > self.capacity:
+                    self.patterns.popitem(last=False)
+                    self.evicted += 1
+                self.names = list(self.patterns)
+            else:
+                existing.update(info)
+                self.patterns.move_to_end(name)
+
+    def expire(self, now):
+        """Drop names not seen for ttl seconds - stops at the first entry that is still fresh"""
+        cutoff = now - self.ttl
+        removed = False
+        with self.lock:
+            while self.patterns:
+                name, info = next(iter(self.patterns.items()))
+                if info.get('last_seen', 0) >= cutoff:
+                    break
+                del self.patterns[name]
+                self.expired += 1
+                removed = True
+            if removed:
+                self.names = list(self.patterns)
+        return self.names
+
+    def keys(self):
+        """Current names - the returned list is replaced, never mutated"""
+        return self.names
+
+    def get(self, name):
+        with self.lock:
+            return self.patterns.get(name)
+
+    def __contains__(self, name):
+        return name in self.patterns
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def clear(self):
+        with self.lock:
+            self.patterns.clear()
+            self.names = []
+
+    def get_status(self):
+        """Get store statistics"""
+        return {
+            'names': len(self.patterns),
+            'ttl': self.ttl,
+            'capacity': self.capacity,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
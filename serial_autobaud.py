@@ -0,0 +1,153 @@
+"""
+Serial Auto-Baud Module
+Picks a port's baud rate by sampling it at candidate rates and scoring what arrives
+Separated from app.py so a wrong guess costs a few hundred milliseconds, not a stop/start cycle
+"""
+
+import time
+import threading
+
+# Most likely rates first - Arduino sketches default to 9600/115200, ESP32 boot ROM prints at 115200/74880
+COMMON_BAUD_RATES = [115200, 9600, 57600, 38400, 19200, 74880, 230400, 250000, 460800, 921600, 4800, 2400]
+DEFAULT_AUTOBAUD_BUDGET = 2.0  # Seconds for the whole detection
+MIN_SAMPLE_WINDOW = 0.08  # Seconds per candidate, even when the budget is split many ways
+ENOUGH_SAMPLE_BYTES = 96  # Stop sampling a candidate once this much has arrived
+ACCEPT_SCORE = 0.95  # Stop trying candidates once a sample scores this well
+MIN_SCORE = 0.6  # Below this no candidate is trusted
+
+# Bytes a text-printing firmware produces: printable ASCII plus tab, CR and LF
+TEXT_BYTES = bytes(range(0x20, 0x7f)) + b'\t\r\n'
+
+
+def score_sample(sample):
+    """
+    Score bytes read at one baud rate from 0 to 1
+    Wrong rates produce framing garbage (high-bit bytes, NULs, 0xFF), so the printable ratio
+    dominates; a plausible line length (newline cadence) separates text from lucky noise
+    """
+    if not sample:
+        return 0.0
+    printable = 1.0 - len(sample.translate(None, TEXT_BYTES)) / len(sample)
+    newlines = sample.count(b'\n')
+    if newlines:
+        average_line = len(sample) / newlines
+        cadence = 1.0 if 1 <= average_line <= 200 else 0.5
+    else:
+        # A short sample may just be inside one long line
+        cadence = 0.5 if len(sample) < 200 else 0.0
+    return printable * (0.7 + 0.3 * cadence)
+
+
+def usb_serial_number(port):
+    """USB serial number of the adapter behind a port, or None"""
+    try:
+        from serial.tools import list_ports
+        for info in list_ports.comports():
+            if info.device == port:
+                return info.serial_number
+    except Exception:
+        pass
+    return None
+
+
+class BaudDetector:
+    """
+    Samples an open connection at candidate rates by reconfiguring it in place
+    Re-opening would toggle DTR and reset most Arduino boards, so the port stays open throughout
+    Results are cached per (port, USB serial number) and that rate is always tried first
+    """
+
+    def __init__(self):
+        self.cache = {}  # (port, usb serial number) -> baud rate
+        self.lock = threading.Lock()
+        self.detections = 0
+        self.cache_hits = 0
+
+    def cached(self, port):
+        with self.lock:
+            return self.cache.get((port, usb_serial_number(port)))
+
+    def forget(self, port):
+        with self.lock:
+            for key in [key for key in self.cache if key[0] == port]:
+                del self.cache[key]
+
+    def _sample(self, connection, baudrate, window):
+        """Switch the connection to a rate, drop stale bytes and read for up to `window` seconds"""
+        connection.baudrate = baudrate
+        connection.reset_input_buffer()
+        sample = bytearray()
+        deadline = time.monotonic() + window
+        while len(sample) < ENOUGH_SAMPLE_BYTES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            connection.timeout = remaining
+            chunk = connection.read(max(1, min(connection.in_waiting, ENOUGH_SAMPLE_BYTES)))
+            if chunk:
+                sample += chunk
+        return bytes(sample)
+
+    def detect(self, connection, port, candidates=None, budget=DEFAULT_AUTOBAUD_BUDGET, use_cache=True):
+        """
+        Find the best rate for an open connection within `budget` seconds
+        Returns a report dict with 'baudrate' (None when nothing scored well), 'score', 'sample'
+        (bytes read at the winning rate, still unprocessed) and per-candidate 'scores'
+        """
+        started = time.monotonic()
+        candidates = [int(rate) for rate in (candidates or COMMON_BAUD_RATES)]
+        serial_number = usb_serial_number(port) if use_cache else None
+        cached = None
+        if use_cache:
+            with self.lock:
+                cached = self.cache.get((port, serial_number))
+            if cached:
+                candidates = [cached] + [rate for rate in candidates if rate != cached]
+
+        original_timeout = connection.timeout
+        window = max(MIN_SAMPLE_WINDOW, budget / len(candidates))
+        scores = {}
+        best_rate, best_score, best_sample = None, 0.0, b''
+        try:
+            for rate in candidates:
+                if scores and time.monotonic() - started + MIN_SAMPLE_WINDOW > budget:
+                    break
+                sample = self._sample(connection, rate, window)
+                score = score_sample(sample)
+                scores[rate] = round(score, 3)
+                if score > best_score:
+                    best_rate, best_score, best_sample = rate, score, sample
+                if score >= ACCEPT_SCORE and len(sample) >= ENOUGH_SAMPLE_BYTES // 2:
+                    break
+        finally:
+            connection.timeout = original_timeout
+
+        if best_score < MIN_SCORE:
+            best_rate, best_sample = None, b''
+        elif best_rate:
+            connection.baudrate = best_rate
+            if use_cache:
+                with self.lock:
+                    self.cache[(port, serial_number)] = best_rate
+
+        self.detections += 1
+        if cached and best_rate == cached:
+            self.cache_hits += 1
+        return {
+            'baudrate': best_rate,
+            'score': round(best_score, 3),
+            'sample': best_sample,
+            'scores': scores,
+            'cached': bool(cached and best_rate == cached),
+            'elapsed': round(time.monotonic() - started, 3)
+        }
+
+    def get_status(self):
+        """Get detector statistics"""
+        with self.lock:
+            cached_ports = len(self.cache)
+        return {
+            'detections': self.detections,
+            'cache_hits': self.cache_hits,
+            'cached_ports': cached_ports
+        }
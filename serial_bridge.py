@@ -0,0 +1,304 @@
+"""
+Serial Bridge Module
+TCP access to a running serial session - raw bytes (socat, PlatformIO socket://) or RFC 2217
+(pyserial rfc2217://) with remote baud and line settings
+Separated from app.py so desktop tools share the port with the web monitor through one fan-out
+"""
+
+import socket
+import selectors
+import threading
+
+BRIDGE_MODE_RAW = 'raw'
+BRIDGE_MODE_RFC2217 = 'rfc2217'
+BRIDGE_MODES = (BRIDGE_MODE_RAW, BRIDGE_MODE_RFC2217)
+
+DEFAULT_BRIDGE_HOST = '127.0.0.1'  # Loopback unless the operator opts into exposing the port
+MAX_BRIDGE_CLIENTS = 8
+MAX_CLIENT_BACKLOG = 1024 * 1024  # Bytes queued for a client before it is dropped as too slow
+IAC = b'\xff'
+
+
+class ModemLineGuard:
+    """
+    Connection proxy for PortManager - where the adapter (or a pty) has no modem lines,
+    inputs read as inactive and RTS/DTR/break changes are ignored instead of aborting negotiation
+    """
+
+    MODEM_LINES = ('cts', 'dsr', 'ri', 'cd')
+    CONTROL_LINES = ('rts', 'dtr', 'break_condition')
+
+    def __init__(self, connection):
+        object.__setattr__(self, 'connection', connection)
+
+    def __getattr__(self, name):
+        if name in self.MODEM_LINES:
+            try:
+                return getattr(self.connection, name)
+            except Exception:
+                return False
+        return getattr(self.connection, name)
+
+    def __setattr__(self, name, value):
+        # Baud rate and line settings from the client apply to the real port
+        try:
+            setattr(self.connection, name, value)
+        except Exception:
+            if name not in self.CONTROL_LINES:
+                raise
+
+
+class BridgeClient:
+    """One TCP client; bytes it can't take right away wait in `pending`"""
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.pending = bytearray()
+        self.lock = threading.Lock()
+        self.manager = None  # rfc2217.PortManager in RFC 2217 mode
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def write(self, data):
+        """Telnet negotiation replies from PortManager - queued behind any pending serial data"""
+        with self.lock:
+            self.pending += data
+
+
+class SerialBridge:
+    """
+    Serves one serial session over TCP
+    The session's reader calls broadcast() with each raw read; sends are non-blocking and only
+    data a slow client can't accept yet is copied into its backlog
+    """
+
+    def __init__(self, session, tcp_port, host=DEFAULT_BRIDGE_HOST, mode=BRIDGE_MODE_RFC2217):
+        if mode not in BRIDGE_MODES:
+            raise ValueError(f"Unknown bridge mode '{mode}'")
+        self.session = session
+        self.host = host
+        self.tcp_port = int(tcp_port)
+        self.mode = mode
+        self.clients = []  # Replaced, never mutated, so broadcast() iterates without a lock
+        self.clients_lock = threading.Lock()
+        self.selector = None
+        self.listener = None
+        self.wake_receiver = None  # Socket pair that interrupts select(), created once the listener binds
+        self.wake_sender = None
+        self.running = False
+        self.thread = None
+        self.clients_served = 0
+        self.clients_dropped = 0
+        self.bytes_to_clients = 0
+        self.bytes_to_port = 0
+
+    def start(self):
+        """Bind the listening socket and start the I/O thread"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listener.bind((self.host, self.tcp_port))
+            listener.listen(MAX_BRIDGE_CLIENTS)
+        except Exception:
+            # Port in use or a bad host/port from the request - nothing else has been opened yet
+            listener.close()
+            raise
+        listener.setblocking(False)
+        self.wake_receiver, self.wake_sender = socket.socketpair()
+        self.wake_receiver.setblocking(False)
+        self.wake_sender.setblocking(False)
+        self.tcp_port = listener.getsockname()[1]  # Resolves port 0 to the one picked
+        self.listener = listener
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(listener, selectors.EVENT_READ, 'accept')
+        self.selector.register(self.wake_receiver, selectors.EVENT_READ, 'wake')
+        self.running = True
+        self.thread = threading.Thread(target=self._io_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Close the listener and every client"""
+        self.running = False
+        self._wake()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _wake(self):
+        if self.wake_sender is None:
+            return  # Never started
+        try:
+            self.wake_sender.send(b'\0')
+        except OSError:
+            pass  # Already pending, or closed
+
+    def broadcast(self, data):
+        """Forward a raw serial read to every client - called from the session's reader thread"""
+        clients = self.clients
+        if not clients:
+            return
+        if self.mode == BRIDGE_MODE_RFC2217 and IAC in data:
+            data = data.replace(IAC, IAC + IAC)  # Telnet escaping, only when the byte is present
+        view = memoryview(data)
+        need_wake = False
+        for client in clients:
+            with client.lock:
+                if client.pending:
+                    client.pending += view
+                else:
+                    try:
+                        sent = client.sock.send(view)
+                    except BlockingIOError:
+                        sent = 0
+                    except OSError:
+                        continue  # Reaped by the I/O thread
+                    client.bytes_sent += sent
+                    self.bytes_to_clients += sent
+                    if sent < len(view):
+                        client.pending += view[sent:]
+                if client.pending:
+                    need_wake = True
+        if need_wake:
+            self._wake()
+
+    def _accept(self):
+        try:
+            sock, address = self.listener.accept()
+        except OSError:
+            return
+        if len(self.clients) >= MAX_BRIDGE_CLIENTS:
+            sock.close()
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = BridgeClient(sock, address)
+        if self.mode == BRIDGE_MODE_RFC2217:
+            from serial import rfc2217
+            client.manager = rfc2217.PortManager(ModemLineGuard(self.session.connection), client)  # Queues option requests
+        with self.clients_lock:
+            self.clients = self.clients + [client]
+        self.clients_served += 1
+        self.selector.register(sock, selectors.EVENT_READ, client)
+        print(f"Serial bridge client {address[0]}:{address[1]} connected to {self.session.port}")
+
+    def _drop(self, client, reason=None):
+        with self.clients_lock:
+            if client not in self.clients:
+                return
+            self.clients = [other for other in self.clients if other is not client]
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+        if reason:
+            self.clients_dropped += 1
+            print(f"Serial bridge client {client.address[0]} dropped: {reason}")
+
+    def _receive(self, client):
+        """Bytes from a client go to the serial port; RFC 2217 commands are applied to it instead"""
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._drop(client)
+            return
+        client.bytes_received += len(data)
+        if client.manager:
+            try:
+                data = b''.join(client.manager.filter(data))
+            except Exception as e:
+                print(f"Serial bridge RFC 2217 error: {e}")
+                data = b''
+            # A client may have changed the baud rate - keep the session and its write pacing in step
+            self.session.baudrate = self.session.connection.baudrate
+            self.session.writer.baudrate = self.session.baudrate
+        if data:
+            try:
+                self.session.write_bytes(data)
+                self.bytes_to_port += len(data)
+            except Exception as e:
+                print(f"Serial bridge write error on {self.session.port}: {e}")
+
+    def _flush(self, client):
+        """Send as much of a client's backlog as it will take"""
+        with client.lock:
+            if not client.pending:
+                return True
+            if len(client.pending) > MAX_CLIENT_BACKLOG:
+                overflow = True
+            else:
+                overflow = False
+                try:
+                    sent = client.sock.send(client.pending)
+                except BlockingIOError:
+                    sent = 0
+                except OSError:
+                    return False
+                del client.pending[:sent]
+                client.bytes_sent += sent
+                self.bytes_to_clients += sent
+        if overflow:
+            self._drop(client, 'too slow')
+            return False
+        return True
+
+    def _io_loop(self):
+        while self.running:
+            # Ask for write readiness only while a client has a backlog
+            for client in self.clients:
+                events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.pending else 0)
+                try:
+                    self.selector.modify(client.sock, events, client)
+                except (KeyError, ValueError, OSError):
+                    pass
+            for key, events in self.selector.select(timeout=1.0):
+                if key.data == 'accept':
+                    self._accept()
+                elif key.data == 'wake':
+                    try:
+                        while self.wake_receiver.recv(256):
+                            pass
+                    except OSError:
+                        pass
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ:
+                        self._receive(client)
+                    if events & selectors.EVENT_WRITE and client in self.clients:
+                        if not self._flush(client):
+                            self._drop(client)
+            # Negotiation replies queued during _accept/_receive
+            for client in self.clients:
+                if client.pending:
+                    self._flush(client)
+
+        for client in self.clients:
+            self._drop(client)
+        for sock in (self.listener, self.wake_receiver, self.wake_sender):
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.selector.close()
+
+    def get_status(self):
+        """Get bridge statistics"""
+        return {
+            'host': self.host,
+            'tcp_port': self.tcp_port,
+            'mode': self.mode,
+            'clients': [f'{client.address[0]}:{client.address[1]}' for client in self.clients],
+            'clients_served': self.clients_served,
+            'clients_dropped': self.clients_dropped,
+            'bytes_to_clients': self.bytes_to_clients,
+            'bytes_to_port': self.bytes_to_port
+        }
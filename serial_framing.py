@@ -0,0 +1,99 @@
+"""
+Serial Framing Module
+Splits raw serial bytes into lines without re-slicing strings for every newline
+Separated from app.py so framing can be reused by every serial reader
+"""
+
+# Longest line kept before it is force-flushed - protects memory against binary noise
+DEFAULT_MAX_LINE_LENGTH = 4096
+
+
+class LineFramer:
+    """
+    Bytes-level line framer backed by a preallocated bytearray
+    Complete lines are found with find() offsets and decoded once; partial lines
+    longer than max_line_length are flushed as-is so the buffer stays bounded
+    """
+
+    def __init__(self, max_line_length=DEFAULT_MAX_LINE_LENGTH, encoding='utf-8'):
+        self.max_line_length = max(1, int(max_line_length))
+        self.encoding = encoding
+        self.buffer = bytearray(self.max_line_length)  # Holds the current partial line only
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        self.lines_framed = 0
+        self.overflows = 0
+
+    def decode(self, raw):
+        """Decode one complete line - errors are dropped like the original reader did"""
+        return str(raw, self.encoding, 'ignore').strip()
+
+    def stash(self, source, start, end, lines):
+        """Append bytes to the partial line, flushing it whenever it reaches max_line_length"""
+        while start < end:
+            count = min(end - start, self.max_line_length - self.length)
+            self.buffer[self.length:self.length + count] = source[start:start + count]
+            self.length += count
+            start += count
+            if self.length >= self.max_line_length:
+                # Line too long (or binary noise) - flush it rather than growing
+                lines.append(self.decode(self.view[:self.length]))
+                self.length = 0
+                self.overflows += 1
+
+    def feed(self, data):
+        """
+        Consume a chunk of bytes and return the decoded complete lines it finished
+        Runs in time linear in len(data) regardless of how many lines the chunk holds
+        """
+        lines = []
+        if not data:
+            return lines
+
+        source = memoryview(data)
+        find = data.find
+        decode = self.decode
+        max_length = self.max_line_length
+        size = len(data)
+        pos = 0
+
+        while pos < size:
+            newline = find(b'\n', pos)
+            if newline == -1:
+                # No newline in the rest of the chunk - keep it as a partial line
+                self.stash(source, pos, size, lines)
+                break
+
+            if self.length or newline - pos >= max_length:
+                # Finish the buffered partial line (or split an oversized one)
+                self.stash(source, pos, newline, lines)
+                lines.append(decode(self.view[:self.length]))
+                self.length = 0
+            else:
+                # Whole line inside this chunk - decode straight from the source
+                lines.append(decode(source[pos:newline]))
+            self.lines_framed += 1
+            pos = newline + 1
+
+        return lines
+
+    def flush(self):
+        """Return and clear whatever partial line is buffered"""
+        if not self.length:
+            return ''
+        line = self.decode(self.view[:self.length])
+        self.length = 0
+        return line
+
+    def reset(self):
+        """Drop any buffered partial line"""
+        self.length = 0
+
+    def get_status(self):
+        """Get framing statistics"""
+        return {
+            'max_line_length': self.max_line_length,
+            'buffered_bytes': self.length,
+            'lines_framed': self.lines_framed,
+            'overflows': self.overflows
+        }
@@ -0,0 +1,352 @@
+"""
+Serial Log Module
+Append-only on-disk recording of serial sessions with a sparse time index and range queries
+Separated from app.py so the reader thread only appends to a list - a flusher thread does the disk I/O
+"""
+
+import os
+import re
+import mmap
+import time
+import bisect
+import threading
+
+DEFAULT_LOG_MAX_BYTES = 8 * 1024 * 1024  # Segment size before rotation
+DEFAULT_LOG_MAX_SEGMENTS = 4  # Segments kept per port - older ones are deleted
+DEFAULT_LOG_FLUSH_INTERVAL = 0.25  # Seconds between batched writes
+DEFAULT_LOG_LIMIT = 1000
+MAX_LOG_LIMIT = 10000
+INDEX_EVERY_LINES = 128  # One sparse index entry per this many lines
+
+# Record layout: "<seq>\t<timestamp>\t<line>\n"; index layout: "<timestamp> <seq> <byte offset>\n"
+LOG_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+PORT_KEY_PREFIX = 'port_'
+PORT_NAME_FILE = 'port.txt'  # The raw port name, so a recorded directory maps back to its port
+
+
+def port_key(port):
+    """
+    Directory name for a port ('/dev/ttyUSB0' -> 'port_dev_ttyUSB0')
+    The prefix means no port name, whatever the request supplies, can name '.', '..' or a path
+    """
+    return PORT_KEY_PREFIX + re.sub(r'[^A-Za-z0-9_.-]+', '_', port).strip('_')
+
+
+def recorded_port(directory):
+    """Port name stored in a recording directory, or None"""
+    try:
+        with open(os.path.join(directory, PORT_NAME_FILE), 'r') as name_file:
+            return name_file.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_index(path):
+    """Load a segment's sparse index as parallel (timestamps, offsets) lists"""
+    timestamps = []
+    offsets = []
+    try:
+        with open(path, 'r') as index:
+            for entry in index:
+                parts = entry.split()
+                if len(parts) == 3:
+                    timestamps.append(float(parts[0]))
+                    offsets.append(int(parts[2]))
+    except OSError:
+        pass
+    return timestamps, offsets
+
+
+class SerialRecorder:
+    """Records one session's lines into rotating segment files under a per-port directory"""
+
+    def __init__(self, directory, port, max_bytes=DEFAULT_LOG_MAX_BYTES, max_segments=DEFAULT_LOG_MAX_SEGMENTS,
+                 flush_interval=DEFAULT_LOG_FLUSH_INTERVAL):
+        self.directory = os.path.join(directory, port_key(port))
+        self.port = port
+        self.max_bytes = max_bytes
+        self.max_segments = max(1, int(max_segments))
+        self.flush_interval = flush_interval
+        self.pending = []  # (line, timestamp) awaiting the flusher
+        self.condition = threading.Condition()
+        self.io_lock = threading.Lock()  # Serializes file writes between the flusher and queries
+        self.running = False
+        self.thread = None
+        self.log_file = None
+        self.index_file = None
+        self.segment_bytes = 0
+        self.seq = 0
+        self.last_timestamp = 0.0
+        self.lines_written = 0
+        self.bytes_written = 0
+        self.segments_rotated = 0
+        self.errors = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(os.path.join(self.directory, PORT_NAME_FILE), 'w') as name_file:
+                name_file.write(self.port)
+        except OSError as e:
+            print(f"Serial log could not record the port name for {self.port}: {e}")
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._flush_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Flush everything pending and close the segment"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.thread = None
+        self.flush()
+        with self.io_lock:
+            self._close_segment()
+
+    def append(self, line, timestamp):
+        """Queue one line - the only cost on the reader thread"""
+        with self.condition:
+            self.pending.append((line, timestamp))
+
+    def flush(self):
+        """Write all pending lines now"""
+        with self.condition:
+            pending = self.pending
+            self.pending = []
+        if not pending:
+            return
+        with self.io_lock:
+            try:
+                self._write(pending)
+            except OSError as e:
+                self.errors += 1
+                print(f"Serial log write error on {self.port}: {e}")
+
+    def _open_segment(self, timestamp):
+        name = f'{int(timestamp * 1000)}'
+        path = os.path.join(self.directory, name)
+        while os.path.exists(path + LOG_SUFFIX):
+            name = f'{int(name) + 1}'  # Two segments in one millisecond
+            path = os.path.join(self.directory, name)
+        self.log_file = open(path + LOG_SUFFIX, 'ab')
+        self.index_file = open(path + INDEX_SUFFIX, 'a')
+        self.segment_bytes = 0
+        self._prune_segments()
+
+    def _close_segment(self):
+        for handle in (self.log_file, self.index_file):
+            if handle:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self.log_file = None
+        self.index_file = None
+
+    def _prune_segments(self):
+        """Delete the oldest segments beyond max_segments"""
+        stems = sorted((int(name[:-len(LOG_SUFFIX)]) for name in os.listdir(self.directory)
+                        if name.endswith(LOG_SUFFIX) and name[:-len(LOG_SUFFIX)].isdigit()))
+        for stem in stems[:-self.max_segments]:
+            for suffix in (LOG_SUFFIX, INDEX_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.directory, f'{stem}{suffix}'))
+                except OSError:
+                    pass
+
+    def _write(self, pending):
+        """Encode a batch of lines into the current segment, rotating when it fills - caller holds io_lock"""
+        chunks = []
+        index_entries = []
+        for line, timestamp in pending:
+            # Timestamps never go backwards within a session, so the index stays sorted
+            if timestamp < self.last_timestamp:
+                timestamp = self.last_timestamp
+            self.last_timestamp = timestamp
+
+            if self.log_file is None or self.segment_bytes >= self.max_bytes:
+                if chunks:
+                    self._write_chunks(chunks, index_entries)
+                    chunks, index_entries = [], []
+                if self.log_file is not None:
+                    self._close_segment()
+                    self.segments_rotated += 1
+                self._open_segment(timestamp)
+
+            record = f'{self.seq}\t{timestamp:.6f}\t{line}\n'.encode('utf-8')
+            if self.segment_bytes == 0 or self.seq % INDEX_EVERY_LINES == 0:
+                index_entries.append(f'{timestamp:.6f} {self.seq} {self.segment_bytes}\n')
+            chunks.append(record)
+            self.segment_bytes += len(record)
+            self.seq += 1
+        self._write_chunks(chunks, index_entries)
+
+    def _write_chunks(self, chunks, index_entries):
+        data = b''.join(chunks)
+        self.log_file.write(data)
+        self.log_file.flush()
+        if index_entries:
+            # Index after data, so an index entry never points past the end of the log
+            self.index_file.write(''.join(index_entries))
+            self.index_file.flush()
+        self.lines_written += len(chunks)
+        self.bytes_written += len(data)
+
+    def _flush_loop(self):
+        while True:
+            with self.condition:
+                if not self.running:
+                    return
+                self.condition.wait(self.flush_interval)
+            self.flush()
+
+    def get_status(self):
+        """Get recording statistics"""
+        with self.condition:
+            pending = len(self.pending)
+        return {
+            'directory': self.directory,
+            'pending_lines': pending,
+            'lines_written': self.lines_written,
+            'bytes_written': self.bytes_written,
+            'segments_rotated': self.segments_rotated,
+            'errors': self.errors
+        }
+
+
+def scan_segment(path, start_offset, since, until, limit, lines, timestamps, seqs):
+    """Memory-map a segment and collect records in [since, until] from start_offset; returns True if limit was hit"""
+    try:
+        with open(path, 'rb') as log_file:
+            size = os.fstat(log_file.fileno()).st_size
+            if size == 0 or start_offset >= size:
+                return False
+            with mmap.mmap(log_file.fileno(), size, access=mmap.ACCESS_READ) as data:
+                pos = start_offset
+                while pos < size:
+                    end = data.find(b'\n', pos)
+                    if end < 0:
+                        break  # Record still being written
+                    record = data[pos:end]
+                    pos = end + 1
+                    parts = record.split(b'\t', 2)
+                    if len(parts) != 3:
+                        continue
+                    timestamp = float(parts[1])
+                    if timestamp < since:
+                        continue
+                    if timestamp > until:
+                        return False
+                    if len(lines) >= limit:
+                        return True
+                    seqs.append(int(parts[0]))
+                    timestamps.append(timestamp)
+                    lines.append(parts[2].decode('utf-8', 'ignore'))
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+class SerialLogStore:
+    """Recorders for live sessions plus time-range queries over every port's segments on disk"""
+
+    def __init__(self, directory, max_bytes=DEFAULT_LOG_MAX_BYTES, max_segments=DEFAULT_LOG_MAX_SEGMENTS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        self.recorders = {}  # port -> SerialRecorder of the running session
+
+    def open_recorder(self, port):
+        """Start recording a session on a port"""
+        recorder = SerialRecorder(self.directory, port, self.max_bytes, self.max_segments)
+        recorder.start()
+        with self.lock:
+            previous = self.recorders.get(port)
+            self.recorders[port] = recorder
+        if previous:
+            previous.stop()
+        return recorder
+
+    def close_recorder(self, recorder):
+        """Stop a recorder and forget it if it is still the port's current one"""
+        with self.lock:
+            if self.recorders.get(recorder.port) is recorder:
+                del self.recorders[recorder.port]
+        recorder.stop()
+
+    def ports(self):
+        """Ports that have recorded segments on disk"""
+        with self.lock:
+            ports = set(self.recorders)
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                directory = os.path.join(self.directory, name)
+                if name.startswith(PORT_KEY_PREFIX) and os.path.isdir(directory):
+                    ports.add(recorded_port(directory) or name[len(PORT_KEY_PREFIX):])
+        return sorted(ports)
+
+    def query(self, port, since=None, until=None, limit=DEFAULT_LOG_LIMIT):
+        """
+        Recorded lines for a port in [since, until], oldest first, or None if the port was never recorded
+        since/until are epoch seconds; negative values are seconds before now
+        """
+        now = time.time()
+        since = float('-inf') if since is None else (now + since if since < 0 else since)
+        until = float('inf') if until is None else (now + until if until < 0 else until)
+        limit = max(1, min(int(limit), MAX_LOG_LIMIT))
+
+        directory = os.path.join(self.directory, port_key(port))
+        with self.lock:
+            recorder = self.recorders.get(port)
+        if recorder:
+            recorder.flush()  # Make the live segment current on disk
+        elif not os.path.isdir(directory) or recorded_port(directory) not in (None, port):
+            # Never recorded - or only a different port that sanitizes to the same directory
+            return None
+        try:
+            stems = sorted(int(name[:-len(LOG_SUFFIX)]) for name in os.listdir(directory)
+                           if name.endswith(LOG_SUFFIX) and name[:-len(LOG_SUFFIX)].isdigit())
+        except OSError:
+            stems = []
+
+        lines, timestamps, seqs = [], [], []
+        more = False
+        for i, stem in enumerate(stems):
+            # A segment ends where the next one starts; skip those entirely outside the range
+            if i + 1 < len(stems) and stems[i + 1] / 1000.0 < since:
+                continue
+            base = os.path.join(directory, str(stem))
+            index_times, index_offsets = read_index(base + INDEX_SUFFIX)
+            if index_times and index_times[0] > until:
+                break
+            # Start from the last indexed record at or before 'since' instead of the top of the file
+            position = bisect.bisect_right(index_times, since) - 1
+            start_offset = index_offsets[position] if position >= 0 else 0
+            if scan_segment(base + LOG_SUFFIX, start_offset, since, until, limit, lines, timestamps, seqs):
+                more = True
+                break
+
+        return {
+            'port': port,
+            'count': len(lines),
+            'lines': lines,
+            'timestamps': timestamps,
+            'seq': seqs,
+            'more': more
+        }
+
+    def close_all(self):
+        with self.lock:
+            recorders = list(self.recorders.values())
+            self.recorders.clear()
+        for recorder in recorders:
+            recorder.stop()
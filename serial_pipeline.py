@@ -0,0 +1,206 @@
+"""
+Serial Pipeline Module
+Staged serial processing: reader -> bounded queue -> analyzer worker -> bounded queue -> emitter
+Separated from app.py so a slow regex pass or a blocked emit never stops the reader draining the port
+"""
+
+import time
+import threading
+from collections import deque
+
+# What a full stage queue does with a new item
+OVERFLOW_DROP_OLDEST = 'drop_oldest'  # Discard the oldest queued item - newest data wins
+OVERFLOW_DROP_NEWEST = 'drop_newest'  # Discard the incoming item
+OVERFLOW_BLOCK = 'block'  # Back-pressure - the producer waits (can stall the reader)
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK)
+
+DEFAULT_STAGE_CAPACITY = 10000  # Lines per stage queue - seconds of backlog even at high baud
+DEFAULT_SHED_THRESHOLD = 1000  # Analyzer backlog above which lines pass through unanalyzed
+MAX_STAGE_BATCH = 256  # Items handed to a stage handler per wake-up
+
+
+class PipelineStage:
+    """
+    One worker thread fed by a bounded deque
+    The handler receives lists of items so queue locking is paid per batch, not per line
+    """
+
+    def __init__(self, name, handler, capacity=DEFAULT_STAGE_CAPACITY, overflow=OVERFLOW_DROP_OLDEST):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'")
+        self.name = name
+        self.handler = handler
+        self.capacity = max(1, int(capacity))
+        self.overflow = overflow
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.closed = False  # No worker will take further items - set once it has drained or been given up on
+        self.thread = None
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.discarded = 0  # Items lost at shutdown - still queued when stop() gave up, or put after it
+        self.high_water = 0
+        self.busy_time = 0.0  # Seconds spent inside the handler
+        self.errors = 0
+
+    def start(self):
+        """Start the worker thread"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.closed = False
+        self.thread = threading.Thread(target=self._worker)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Stop accepting work and let the worker drain what is already queued
+        If it has not drained within timeout, whatever is still queued is discarded and counted
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        thread = self.thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+        with self.condition:
+            if not self.closed and thread and thread.is_alive():
+                # A slow handler is still busy - it finishes its current batch and then exits
+                self.closed = True
+                self.discarded += len(self.items)
+                self.items.clear()
+            if self.discarded:
+                print(f"Serial pipeline {self.name} stage discarded {self.discarded} lines at shutdown")
+        self.thread = None
+
+    def put(self, item):
+        """Queue one item; returns False if it was dropped by the overflow policy"""
+        with self.condition:
+            self.received += 1
+            if self.closed:
+                # The worker is gone - nothing would ever take this item
+                self.discarded += 1
+                return False
+            if len(self.items) >= self.capacity:
+                if self.overflow == OVERFLOW_DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    self.items.popleft()
+                    self.dropped += 1
+                else:
+                    while self.running and len(self.items) >= self.capacity:
+                        self.condition.wait(0.1)
+            self.items.append(item)
+            if len(self.items) > self.high_water:
+                self.high_water = len(self.items)
+            self.condition.notify_all()
+        return True
+
+    def depth(self):
+        return len(self.items)
+
+    def _worker(self):
+        items = self.items
+        while True:
+            with self.condition:
+                while self.running and not items:
+                    self.condition.wait()
+                if not items or self.closed:
+                    self.closed = True  # Stopped and drained, or given up on by stop()
+                    return
+                batch = [items.popleft() for _ in range(min(len(items), MAX_STAGE_BATCH))]
+                self.condition.notify_all()  # Wake producers blocked on a full queue
+
+            started = time.perf_counter()
+            try:
+                self.handler(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"Serial pipeline {self.name} stage error: {e}")
+            self.busy_time += time.perf_counter() - started
+            self.processed += len(batch)
+
+    def get_status(self):
+        """Get stage counters"""
+        return {
+            'depth': len(self.items),
+            'capacity': self.capacity,
+            'overflow': self.overflow,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'discarded': self.discarded,
+            'high_water': self.high_water,
+            'busy_seconds': round(self.busy_time, 6),
+            'errors': self.errors
+        }
+
+
+class SerialPipeline:
+    """
+    Moves analysis and emission off the serial reader thread
+    analyze(line) -> (values, commands) runs on the analyzer stage; emit(line, timestamp, values, commands)
+    runs on the emitter stage. Line order is preserved end to end. When the analyzer backlog passes
+    shed_threshold, lines skip analysis but are still emitted, so raw capture keeps up with the wire.
+    """
+
+    def __init__(self, analyze, emit, capacity=DEFAULT_STAGE_CAPACITY, overflow=OVERFLOW_DROP_OLDEST,
+                 shed_threshold=DEFAULT_SHED_THRESHOLD):
+        self.analyze = analyze
+        self.emit = emit
+        self.shed_threshold = max(0, int(shed_threshold))
+        self.analyzer = PipelineStage('analyze', self._analyze_batch, capacity, overflow)
+        self.emitter = PipelineStage('emit', self._emit_batch, capacity, overflow)
+        self.analysis_skipped = 0
+
+    def start(self):
+        """Start both stage workers"""
+        self.emitter.start()
+        self.analyzer.start()
+
+    def stop(self):
+        """Drain and stop both stages, upstream first"""
+        self.analyzer.stop()
+        self.emitter.stop()
+
+    def submit(self, line, timestamp):
+        """Hand a framed line to the pipeline - called from the reader thread"""
+        return self.analyzer.put((line, timestamp))
+
+    def _analyze_batch(self, batch):
+        # Shed analysis, not lines, while the backlog is too deep to catch up
+        shed = self.analyzer.depth() > self.shed_threshold
+        for line, timestamp in batch:
+            values, commands = None, None
+            if shed:
+                self.analysis_skipped += 1
+            else:
+                try:
+                    values, commands = self.analyze(line)
+                except Exception as e:
+                    # A bad line loses its analysis, never its place in the output
+                    self.analyzer.errors += 1
+                    print(f"Serial pipeline analyze error: {e}")
+            self.emitter.put((line, timestamp, values, commands))
+
+    def _emit_batch(self, batch):
+        for line, timestamp, values, commands in batch:
+            try:
+                self.emit(line, timestamp, values, commands)
+            except Exception as e:
+                self.emitter.errors += 1
+                print(f"Serial pipeline emit error: {e}")
+
+    def get_status(self):
+        """Get per-stage counters"""
+        return {
+            'analyze': self.analyzer.get_status(),
+            'emit': self.emitter.get_status(),
+            'shed_threshold': self.shed_threshold,
+            'analysis_skipped': self.analysis_skipped
+        }
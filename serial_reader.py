@@ -0,0 +1,134 @@
+"""
+Serial Reader Module
+Event-driven reads from a serial port - the thread sleeps in the kernel until bytes arrive
+Separated from app.py so the wait strategy can be measured against the old polling loop
+"""
+
+import os
+import select
+import time
+
+READ_MODE_SELECT = 'select'      # select() on the port fd plus a wake-up pipe (POSIX)
+READ_MODE_BLOCKING = 'blocking'  # blocking read(1) with a short timeout, then drain in_waiting
+READ_MODE_POLL = 'poll'          # legacy in_waiting polling with 10 ms sleeps
+READ_MODES = (READ_MODE_SELECT, READ_MODE_BLOCKING, READ_MODE_POLL)
+
+# How long a reader may sleep before re-checking its stop flag when nothing wakes it
+IDLE_TIMEOUT = 0.25
+POLL_INTERVAL = 0.01
+
+
+def default_read_mode(connection):
+    """Prefer select() when the port exposes a file descriptor"""
+    try:
+        connection.fileno()
+        return READ_MODE_SELECT
+    except Exception:
+        return READ_MODE_BLOCKING
+
+
+class SerialPortReader:
+    """
+    Reads chunks from an open serial connection without busy polling
+    read() returns b'' on idle timeout or after wake(), so callers can re-check their stop flag
+    """
+
+    def __init__(self, connection, chunk_size=1024, mode=None):
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.mode = mode if mode in READ_MODES else default_read_mode(connection)
+        self.wake_read = None
+        self.wake_write = None
+        self.stopped = False
+        self.reads = 0
+        self.idle_wakeups = 0
+
+        if self.mode == READ_MODE_SELECT:
+            try:
+                self.fd = connection.fileno()
+                self.wake_read, self.wake_write = os.pipe()
+                os.set_blocking(self.wake_read, False)
+                os.set_blocking(self.wake_write, False)
+            except Exception:
+                self.mode = READ_MODE_BLOCKING
+
+        if self.mode == READ_MODE_BLOCKING:
+            # read(1) returns as soon as one byte arrives; the timeout only bounds stop latency
+            self.original_timeout = connection.timeout
+            connection.timeout = IDLE_TIMEOUT
+
+    def read(self):
+        """Wait for data and return whatever is available (up to chunk_size bytes)"""
+        if self.stopped:
+            return b''
+
+        if self.mode == READ_MODE_SELECT:
+            ready, _, _ = select.select([self.fd, self.wake_read], [], [], IDLE_TIMEOUT)
+            if self.wake_read in ready:
+                self._drain_wake_pipe()
+                return b''
+            if not ready:
+                self.idle_wakeups += 1
+                return b''
+            waiting = self.connection.in_waiting
+            data = self.connection.read(min(max(waiting, 1), self.chunk_size))
+
+        elif self.mode == READ_MODE_BLOCKING:
+            data = self.connection.read(1)
+            if not data:
+                self.idle_wakeups += 1
+                return b''
+            waiting = self.connection.in_waiting
+            if waiting:
+                data += self.connection.read(min(waiting, self.chunk_size - 1))
+
+        else:
+            waiting = self.connection.in_waiting
+            if waiting <= 0:
+                self.idle_wakeups += 1
+                time.sleep(POLL_INTERVAL)
+                return b''
+            data = self.connection.read(min(waiting, self.chunk_size))
+
+        self.reads += 1
+        return data
+
+    def wake(self):
+        """Interrupt a pending read() - used by stop_serial_monitor"""
+        self.stopped = True
+        if self.wake_write is not None:
+            try:
+                os.write(self.wake_write, b'\0')
+            except OSError:
+                pass
+
+    def _drain_wake_pipe(self):
+        try:
+            while os.read(self.wake_read, 64):
+                pass
+        except OSError:
+            pass
+
+    def close(self):
+        """Release the wake-up pipe and restore the port timeout"""
+        for fd in (self.wake_read, self.wake_write):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.wake_read = None
+        self.wake_write = None
+        if self.mode == READ_MODE_BLOCKING:
+            try:
+                self.connection.timeout = self.original_timeout
+            except Exception:
+                pass
+
+    def get_status(self):
+        """Get reader statistics"""
+        return {
+            'mode': self.mode,
+            'reads': self.reads,
+            'idle_wakeups': self.idle_wakeups
+        }
@@ -0,0 +1,263 @@
+"""
+Serial Sequencer Module
+Server-side timed command sequences - each step fires at a fixed offset from the sequence start
+on the monotonic clock and reports when it was actually written
+Separated from app.py so browser timers and network jitter never decide when a step is sent
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+
+MAX_SEQUENCE_STEPS = 10000
+MAX_SEQUENCE_REPEAT = 1000
+MAX_STEP_DELAY_MS = 3600 * 1000.0
+SPIN_WINDOW = 0.002  # Seconds before a deadline where sleeping stops and the thread spins
+EMIT_SLACK = 0.005  # Step results are only reported when the next step is at least this far away
+MAX_FINISHED_SEQUENCES = 32  # Completed runs kept for GET after they finish
+MAX_SEQUENCE_RESULTS = 1000  # Latest step results kept per sequence - totals cover every step
+
+SEQUENCE_PENDING = 'pending'
+SEQUENCE_RUNNING = 'running'
+SEQUENCE_COMPLETE = 'complete'
+SEQUENCE_CANCELLED = 'cancelled'
+SEQUENCE_FAILED = 'failed'
+
+
+def parse_steps(steps):
+    """
+    Normalize steps to (delay_ms, kind, target, value) with kind 'control' or 'line'
+    Accepts [delay_ms, control_id or line, value] lists or {'delay_ms', 'control'|'line', 'value'} dicts;
+    a list step with no value is a raw line, and a control step without a value is rejected.
+    delay_ms is measured from the previous step's scheduled time
+    """
+    if not isinstance(steps, list) or not steps:
+        raise ValueError('Steps must be a non-empty list')
+    if len(steps) > MAX_SEQUENCE_STEPS:
+        raise ValueError(f'At most {MAX_SEQUENCE_STEPS} steps per sequence')
+
+    parsed = []
+    for index, step in enumerate(steps):
+        if isinstance(step, dict):
+            delay = step.get('delay_ms', 0)
+            if 'control' in step:
+                if step.get('value') is None:
+                    raise ValueError(f"Step {index} sets a control but has no 'value'")
+                kind, target, value = 'control', step['control'], step['value']
+            elif 'line' in step:
+                kind, target, value = 'line', step['line'], None
+            else:
+                raise ValueError(f"Step {index} needs 'control' or 'line'")
+        elif isinstance(step, (list, tuple)) and len(step) in (2, 3):
+            delay, target = step[0], step[1]
+            kind, value = ('control', step[2]) if len(step) == 3 else ('line', None)
+            if kind == 'control' and value is None:
+                raise ValueError(f'Step {index} sets a control but has no value')
+        else:
+            raise ValueError(f'Step {index} is not a [delay_ms, target, value] list or object')
+
+        try:
+            delay = float(delay)
+        except (TypeError, ValueError):
+            raise ValueError(f'Step {index} has an invalid delay')
+        if not 0 <= delay <= MAX_STEP_DELAY_MS:
+            raise ValueError(f'Step {index} delay must be between 0 and {MAX_STEP_DELAY_MS:.0f} ms')
+        if not isinstance(target, str) or not target:
+            raise ValueError(f'Step {index} has an empty target')
+        parsed.append((delay, kind, target, value))
+    return parsed
+
+
+def wait_until(deadline, cancelled):
+    """Sleep until close to a perf_counter deadline, then spin the rest; returns False if cancelled"""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return not cancelled.is_set()
+        if remaining > SPIN_WINDOW:
+            # Event.wait both sleeps and returns early on cancel
+            if cancelled.wait(remaining - SPIN_WINDOW):
+                return False
+        elif cancelled.is_set():
+            return False
+
+
+class CommandSequence:
+    """
+    One run of a compiled step list on its own thread
+    Steps are (offset_seconds, send, info): send() writes the step, info is echoed in its result.
+    Deadlines are absolute offsets from one start instant, so a late step never shifts the ones after it
+    """
+
+    def __init__(self, sequence_id, steps, repeat=1, on_step=None, on_complete=None):
+        self.sequence_id = sequence_id
+        self.steps = steps
+        self.repeat = max(1, min(int(repeat), MAX_SEQUENCE_REPEAT))
+        self.period = steps[-1][0] if steps else 0.0  # A repeat starts where the last step was due
+        self.on_step = on_step
+        self.on_complete = on_complete
+        self.cancelled = threading.Event()
+        self.state = SEQUENCE_PENDING
+        self.results = deque(maxlen=MAX_SEQUENCE_RESULTS)  # Latest results, for GET
+        self.unreported = deque(maxlen=MAX_SEQUENCE_RESULTS)  # Results not yet handed to on_step
+        self.steps_sent = 0
+        self.errors = 0
+        self.reports_dropped = 0  # Results pushed out of unreported before a gap let them be sent
+        self.lateness_total = 0.0
+        self.lateness_max = None
+        self.started_at = None  # Wall clock, for clients correlating with serial timestamps
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        """Start the sequence thread"""
+        self.state = SEQUENCE_RUNNING
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def cancel(self):
+        """Stop before the next step"""
+        self.cancelled.set()
+
+    def done(self):
+        return self.state not in (SEQUENCE_PENDING, SEQUENCE_RUNNING)
+
+    def _report(self, force=False, next_deadline=None):
+        """Hand unreported results to on_step unless the next step is too close to risk it"""
+        if not self.on_step or not self.unreported:
+            return
+        if not force and next_deadline is not None and next_deadline - time.perf_counter() < EMIT_SLACK:
+            return
+        pending = list(self.unreported)
+        self.unreported.clear()
+        try:
+            self.on_step(self, pending)
+        except Exception as e:
+            print(f"Sequence {self.sequence_id} report error: {e}")
+
+    def _run(self):
+        self.started_at = time.time()
+        start = time.perf_counter()
+        count = len(self.steps)
+        try:
+            for iteration in range(self.repeat):
+                base = start + iteration * self.period
+                for index, (offset, send, info) in enumerate(self.steps):
+                    deadline = base + offset
+                    if not wait_until(deadline, self.cancelled):
+                        self.state = SEQUENCE_CANCELLED
+                        return
+                    sent = time.perf_counter()
+                    error = None
+                    try:
+                        send()
+                    except Exception as e:
+                        error = str(e)
+                    written = time.perf_counter()
+                    result = {
+                        'iteration': iteration,
+                        'index': index,
+                        'scheduled_ms': round((deadline - start) * 1000.0, 3),
+                        'sent_ms': round((sent - start) * 1000.0, 3),
+                        'lateness_ms': round((sent - deadline) * 1000.0, 3),
+                        'write_ms': round((written - sent) * 1000.0, 3),
+                        'error': error,
+                        **info
+                    }
+                    self.results.append(result)
+                    if len(self.unreported) == self.unreported.maxlen:
+                        self.reports_dropped += 1
+                    self.unreported.append(result)
+                    self.steps_sent += 1
+                    if error:
+                        self.errors += 1
+                    self.lateness_total += result['lateness_ms']
+                    if self.lateness_max is None or result['lateness_ms'] > self.lateness_max:
+                        self.lateness_max = result['lateness_ms']
+                    # Report in the gap before the next step, never at its expense
+                    if index + 1 < count:
+                        next_deadline = base + self.steps[index + 1][0]
+                    elif iteration + 1 < self.repeat:
+                        next_deadline = base + self.period + self.steps[0][0]
+                    else:
+                        next_deadline = None
+                    self._report(next_deadline=next_deadline)
+            self.state = SEQUENCE_COMPLETE
+        except Exception as e:
+            self.error = str(e)
+            self.state = SEQUENCE_FAILED
+            print(f"Sequence {self.sequence_id} error: {e}")
+        finally:
+            self._report(force=True)
+            if self.on_complete:
+                try:
+                    self.on_complete(self)
+                except Exception as e:
+                    print(f"Sequence {self.sequence_id} completion error: {e}")
+
+    def timing_summary(self):
+        """Lateness statistics - totals over every step sent, percentiles over the kept results"""
+        lateness = sorted(result['lateness_ms'] for result in list(self.results))
+        if not lateness:
+            return {'steps_sent': 0}
+        return {
+            'steps_sent': self.steps_sent,
+            'lateness_p50_ms': lateness[len(lateness) // 2],
+            'lateness_p99_ms': lateness[min(len(lateness) - 1, int(len(lateness) * 0.99))],
+            'lateness_max_ms': self.lateness_max,
+            'lateness_mean_ms': round(self.lateness_total / self.steps_sent, 3),
+            'percentile_window': len(lateness),
+            'errors': self.errors
+        }
+
+    def get_status(self, include_results=True):
+        """Get sequence state, timing summary and (optionally) the latest MAX_SEQUENCE_RESULTS step results"""
+        status = {
+            'id': self.sequence_id,
+            'state': self.state,
+            'steps': len(self.steps),
+            'repeat': self.repeat,
+            'started_at': self.started_at,
+            'error': self.error,
+            'timing': self.timing_summary(),
+            'reports_dropped': self.reports_dropped
+        }
+        if include_results:
+            status['results'] = list(self.results)
+        return status
+
+
+class SequenceManager:
+    """Running and recently finished sequences by id"""
+
+    def __init__(self):
+        self.sequences = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+    def start(self, steps, repeat=1, on_step=None, on_complete=None):
+        """Create and start a sequence from compiled steps"""
+        with self.lock:
+            sequence_id = f'seq_{self.next_id}'
+            self.next_id += 1
+            sequence = CommandSequence(sequence_id, steps, repeat, on_step, on_complete)
+            self.sequences[sequence_id] = sequence
+            # Forget the oldest finished runs
+            finished = [key for key, other in self.sequences.items() if other.done()]
+            for key in finished[:max(0, len(finished) - MAX_FINISHED_SEQUENCES)]:
+                del self.sequences[key]
+        sequence.start()
+        return sequence
+
+    def get(self, sequence_id):
+        with self.lock:
+            return self.sequences.get(sequence_id)
+
+    def all(self):
+        with self.lock:
+            return list(self.sequences.values())
+
+    def cancel_all(self):
+        for sequence in self.all():
+            sequence.cancel()
@@ -0,0 +1,233 @@
+"""
+Serial Sessions Module
+One serial session per port - each owns its connection, reader, framer and detection state
+Separated from app.py so several boards can be monitored at once without module globals
+
+A session lives until it is stopped explicitly or its room has had no subscribers for the idle
+grace period - a client disconnecting (or reloading the page) never stops it for the others
+"""
+
+import time
+import threading
+
+from serial_analysis import CommandTracker, ValuePatternStore, DEFAULT_PATTERN_TTL, DEFAULT_PATTERN_CAPACITY
+from serial_framing import LineFramer, DEFAULT_MAX_LINE_LENGTH
+from serial_writer import SerialWriter
+from serial_streaming import SerialScrollback, DEFAULT_SCROLLBACK_LINES
+
+DEFAULT_IDLE_GRACE = 60.0  # Seconds a session keeps running with nobody subscribed (long enough to reload)
+
+
+def session_room(port):
+    """Socket.IO room that receives a port's serial output"""
+    return f'serial:{port}'
+
+
+class SerialSession:
+    """State for one monitored serial port"""
+
+    def __init__(self, port, baudrate, connection, max_line_length=DEFAULT_MAX_LINE_LENGTH, read_mode=None,
+                 pattern_ttl=DEFAULT_PATTERN_TTL, pattern_capacity=DEFAULT_PATTERN_CAPACITY,
+                 scrollback_lines=DEFAULT_SCROLLBACK_LINES):
+        self.port = port
+        self.baudrate = baudrate
+        self.connection = connection
+        self.room = session_room(port)
+        self.read_mode = read_mode
+        self.active = False
+        self.thread = None
+        self.reader = None  # SerialPortReader, created by the monitor thread
+        self.framer = LineFramer(max_line_length)
+        self.initial_data = b''  # Read before the monitor thread started (auto-baud sample)
+        self.batcher = None  # SerialBatcher when the client opted into batched events
+        self.batcher_lock = threading.Lock()  # The monitor thread and stop() may both close it
+        self.scrollback = SerialScrollback(scrollback_lines)  # Recent emitted lines for clients that join late
+        self.bridge = None  # SerialBridge serving this port over TCP
+        self.recorder = None  # SerialRecorder appending this session to the on-disk log
+        self.pipeline = None  # SerialPipeline moving analysis and emits off the reader thread
+        self.telemetry = None  # TelemetryDecoder when the port carries binary frames instead of text lines
+        self.value_patterns = ValuePatternStore(pattern_ttl, pattern_capacity)  # Detected value names for this port
+        self.command_tracker = CommandTracker()
+        self.write_lock = threading.Lock()
+        self.writer = SerialWriter(self.write_line, baudrate)  # Paced, coalescing writes for handlers
+        self.started = time.time()
+        self.lines_received = 0
+        self.subscribers = set()  # Socket.IO sids in this session's room - kept by SerialSessionManager
+        self.idle_since = None  # Monotonic time the last subscriber left, None while someone is subscribed
+
+    def is_open(self):
+        return self.connection is not None and self.connection.is_open
+
+    def write_line(self, message):
+        """Write one newline-terminated line to the port"""
+        with self.write_lock:
+            self.connection.write((message + '\n').encode('utf-8'))
+
+    def write_bytes(self, data):
+        """Write raw bytes to the port (TCP bridge clients)"""
+        with self.write_lock:
+            self.connection.write(data)
+
+    def stop(self):
+        """
+        Stop monitoring: drop pending writes, close any bridge, wake the reader and close the port
+        The batcher stays attached until the monitor thread has drained its pipeline into it
+        """
+        self.active = False
+        self.writer.stop()
+        bridge = self.bridge
+        self.bridge = None
+        if bridge:
+            bridge.stop()
+        reader = self.reader
+        if reader:
+            reader.wake()
+        if self.connection is not None:
+            try:
+                if self.connection.is_open:
+                    self.connection.close()
+            except Exception as e:
+                print(f"Error closing serial connection on {self.port}: {e}")
+        thread = self.thread
+        if thread is None or not thread.is_alive():
+            # No monitor thread left to flush through the batcher
+            self.close_batcher()
+
+    def close_batcher(self):
+        """Detach the batcher and emit anything still pending"""
+        with self.batcher_lock:
+            batcher = self.batcher
+            self.batcher = None
+        if batcher:
+            batcher.stop()
+
+    def get_status(self):
+        """Get session status"""
+        status = {
+            'port': self.port,
+            'baudrate': self.baudrate,
+            'active': self.active,
+            'room': self.room,
+            'started': self.started,
+            'lines_received': self.lines_received,
+            'subscribers': len(self.subscribers),
+            'idle_seconds': round(time.monotonic() - self.idle_since, 1) if self.idle_since is not None else None,
+            'scrollback': self.scrollback.get_status(),
+            'framer': self.framer.get_status(),
+            'patterns': self.value_patterns.get_status(),
+            'writer': self.writer.get_status()
+        }
+        if self.reader:
+            status['reader'] = self.reader.get_status()
+        bridge = self.bridge
+        if bridge:
+            status['bridge'] = bridge.get_status()
+        recorder = self.recorder
+        if recorder:
+            status['recorder'] = recorder.get_status()
+        pipeline = self.pipeline
+        if pipeline:
+            status['pipeline'] = pipeline.get_status()
+        if self.telemetry:
+            status['telemetry'] = self.telemetry.get_status()
+        if self.batcher:
+            status['batch'] = self.batcher.get_status()
+        return status
+
+
+class SerialSessionManager:
+    """
+    Serial sessions keyed by port, with the clients subscribed to each session's room
+    When the last subscriber leaves, the session is stopped after idle_grace seconds unless
+    someone subscribes again first (None keeps idle sessions running until stopped)
+    """
+
+    def __init__(self, idle_grace=DEFAULT_IDLE_GRACE):
+        self.lock = threading.Lock()
+        self.sessions = {}  # port -> SerialSession, in start order
+        self.idle_grace = idle_grace
+        self.expired = 0
+
+    def add(self, session):
+        """Register a session, stopping any previous session on the same port"""
+        with self.lock:
+            previous = self.sessions.pop(session.port, None)
+            self.sessions[session.port] = session
+        if previous:
+            previous.stop()
+        return session
+
+    def get(self, port):
+        return self.sessions.get(port)
+
+    def resolve(self, port=None):
+        """
+        Find the session for a port; 'auto' or no port means the most recently started session
+        Returns None when nothing matches
+        """
+        with self.lock:
+            if port and port != 'auto':
+                return self.sessions.get(port)
+            if not self.sessions:
+                return None
+            return next(reversed(self.sessions.values()))
+
+    def remove(self, port):
+        """Stop and forget the session on a port; returns it or None"""
+        with self.lock:
+            session = self.sessions.pop(port, None)
+        if session:
+            session.stop()
+        return session
+
+    def subscribe(self, session, sid):
+        """Record a client joining a session's room"""
+        with self.lock:
+            session.subscribers.add(sid)
+            session.idle_since = None
+
+    def unsubscribe(self, session, sid):
+        """Record a client leaving a session's room; starts the idle grace when it was the last one"""
+        with self.lock:
+            if sid not in session.subscribers:
+                return
+            session.subscribers.discard(sid)
+            if session.subscribers or self.sessions.get(session.port) is not session:
+                return
+            session.idle_since = idle_since = time.monotonic()
+        if self.idle_grace is not None:
+            timer = threading.Timer(self.idle_grace, self._expire, (session, idle_since))
+            timer.daemon = True
+            timer.start()
+
+    def unsubscribe_all(self, sid):
+        """Remove a disconnected client from every session it was subscribed to"""
+        for session in self.all():
+            self.unsubscribe(session, sid)
+
+    def _expire(self, session, idle_since):
+        """Stop a session that is still idle since the grace period started"""
+        with self.lock:
+            if self.sessions.get(session.port) is not session or session.idle_since != idle_since:
+                return  # Rejoined, restarted or already stopped
+            del self.sessions[session.port]
+            self.expired += 1
+        print(f"Stopping serial session on {session.port} - no subscribers for {self.idle_grace:.0f}s")
+        session.stop()
+
+    def stop_all(self):
+        """Stop every session"""
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.stop()
+        return sessions
+
+    def all(self):
+        with self.lock:
+            return list(self.sessions.values())
+
+    def __len__(self):
+        with self.lock:
+            return len(self.sessions)
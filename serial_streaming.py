@@ -0,0 +1,308 @@
+"""
+Serial Streaming Module
+Coalesces serial monitor output before it is emitted over Socket.IO
+Separated from app.py so emission policy can change without touching the reader loop
+"""
+
+import time
+import threading
+
+# Batch defaults - a window in this range keeps the terminal responsive while
+# collapsing kHz line rates into a few dozen events per second
+DEFAULT_BATCH_WINDOW_MS = 30
+DEFAULT_BATCH_MAX_LINES = 200
+MIN_BATCH_WINDOW_MS = 5
+MAX_BATCH_WINDOW_MS = 1000
+
+
+class SerialBatcher:
+    """
+    Collects serial lines and emits them as one 'serial_batch' event per window
+    A batch is flushed when the window since its first line elapses or max_lines is reached
+    """
+
+    def __init__(self, socketio, window_ms=DEFAULT_BATCH_WINDOW_MS, max_lines=DEFAULT_BATCH_MAX_LINES, room=None, port=None):
+        self.socketio = socketio
+        self.room = room  # Socket.IO room of the serial session, None to broadcast
+        self.port = port
+        self.window = min(max(float(window_ms), MIN_BATCH_WINDOW_MS), MAX_BATCH_WINDOW_MS) / 1000.0
+        self.max_lines = max(1, int(max_lines))
+        self.lines = []
+        self.timestamps = []
+        self.values = None  # Latest detected values seen during this batch
+        self.commands = None  # Commands newly discovered during this batch
+        self.batch_started = None
+        self.condition = threading.Condition()
+        self.running = False
+        self.flush_thread = None
+        self.batches_sent = 0
+        self.lines_sent = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.flush_thread = threading.Thread(target=self._flush_loop)
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+
+    def stop(self):
+        """Stop the flush thread and emit anything still pending"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.flush_thread and self.flush_thread is not threading.current_thread():
+            self.flush_thread.join(timeout=1.0)
+        self.flush_thread = None
+        self.flush()
+
+    def add(self, line, timestamp=None, values=None, commands=None):
+        """Queue one line with its capture time; optionally attach the latest detection results"""
+        with self.condition:
+            if not self.lines:
+                self.batch_started = time.monotonic()
+                self.condition.notify()
+            self.lines.append(line)
+            self.timestamps.append(timestamp if timestamp is not None else time.time())
+            if values:
+                self.values = values
+            if commands:
+                # Commands are deltas, so accumulate them across the batch
+                self.commands = (self.commands or []) + list(commands)
+            full = len(self.lines) >= self.max_lines
+
+        if full:
+            self.flush()
+
+    def _take_batch(self):
+        """Detach the pending batch - caller must hold the condition"""
+        if not self.lines:
+            return None
+        payload = {'lines': self.lines, 'timestamps': self.timestamps}
+        if self.port:
+            payload['port'] = self.port
+        if self.values:
+            payload['values'] = self.values
+        if self.commands:
+            payload['commands'] = self.commands
+        self.lines = []
+        self.timestamps = []
+        self.values = None
+        self.commands = None
+        self.batch_started = None
+        return payload
+
+    def flush(self):
+        """Emit the pending batch immediately"""
+        with self.condition:
+            payload = self._take_batch()
+        if payload:
+            self._emit(payload)
+
+    def _emit(self, payload):
+        try:
+            self.socketio.emit('serial_batch', payload, to=self.room)
+            self.batches_sent += 1
+            self.lines_sent += len(payload['lines'])
+        except Exception as e:
+            print(f"Error emitting serial batch: {e}")
+
+    def _flush_loop(self):
+        """Wait for the first line of a batch, then flush it once its window has elapsed"""
+        while True:
+            with self.condition:
+                while self.running and not self.lines:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                remaining = self.batch_started + self.window - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    # A size-triggered flush may have emptied or restarted the batch
+                    if not self.lines or self.batch_started + self.window > time.monotonic():
+                        continue
+                payload = self._take_batch()
+            if payload:
+                self._emit(payload)
+
+    def get_status(self):
+        """Get batching statistics"""
+        with self.condition:
+            pending = len(self.lines)
+        return {
+            'window_ms': self.window * 1000.0,
+            'max_lines': self.max_lines,
+            'pending_lines': pending,
+            'batches_sent': self.batches_sent,
+            'lines_sent': self.lines_sent
+        }
+
+
+# UI refresh rate for coalesced control values
+DEFAULT_VALUE_RATE_HZ = 30
+MAX_VALUE_RATE_HZ = 200
+
+
+class ControlValuePublisher:
+    """
+    Coalesces reader control values and emits only the latest one per control
+    Flushes a compact 'hub_control_values' map at a fixed UI rate instead of one
+    full 'hub_control_updated' config per matched serial line
+    """
+
+    def __init__(self, socketio, rate_hz=DEFAULT_VALUE_RATE_HZ):
+        self.socketio = socketio
+        self.interval = 1.0 / min(max(float(rate_hz), 1.0), MAX_VALUE_RATE_HZ)
+        self.pending = {}  # control id -> (value, timestamp)
+        self.condition = threading.Condition()
+        self.running = False
+        self.flush_thread = None
+        self.values_recorded = 0
+        self.values_sent = 0
+        self.flushes = 0
+
+    def set_rate(self, rate_hz):
+        """Change the flush rate"""
+        self.interval = 1.0 / min(max(float(rate_hz), 1.0), MAX_VALUE_RATE_HZ)
+
+    def start(self):
+        """Start the background flush thread"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.flush_thread = threading.Thread(target=self._flush_loop)
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+
+    def stop(self):
+        """Stop the flush thread and emit the last pending values"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.flush_thread and self.flush_thread is not threading.current_thread():
+            self.flush_thread.join(timeout=1.0)
+        self.flush_thread = None
+        self.flush()
+
+    def record(self, control_id, value, timestamp=None):
+        """Remember the latest value for a control - older unsent values are overwritten"""
+        with self.condition:
+            was_empty = not self.pending
+            self.pending[control_id] = (value, timestamp if timestamp is not None else time.time())
+            self.values_recorded += 1
+            if was_empty:
+                self.condition.notify()
+
+    def discard(self, control_id):
+        """Forget a pending value (control deleted)"""
+        with self.condition:
+            self.pending.pop(control_id, None)
+
+    def flush(self):
+        """Emit all pending values now"""
+        with self.condition:
+            pending = self.pending
+            self.pending = {}
+        if not pending:
+            return
+        payload = {
+            'values': {control_id: value for control_id, (value, _) in pending.items()},
+            'ts': {control_id: ts for control_id, (_, ts) in pending.items()}
+        }
+        try:
+            self.socketio.emit('hub_control_values', payload)
+            self.flushes += 1
+            self.values_sent += len(pending)
+        except Exception as e:
+            print(f"Error emitting control values: {e}")
+
+    def _flush_loop(self):
+        """Sleep until a value is pending, then flush at most once per interval"""
+        last_flush = 0.0
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+            remaining = last_flush + self.interval - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            last_flush = time.monotonic()
+            self.flush()
+
+    def get_status(self):
+        """Get coalescing statistics"""
+        with self.condition:
+            pending = len(self.pending)
+        return {
+            'rate_hz': 1.0 / self.interval,
+            'pending': pending,
+            'values_recorded': self.values_recorded,
+            'values_sent': self.values_sent,
+            'flushes': self.flushes
+        }
+
+
+# Lines kept per session for clients that join mid-session
+DEFAULT_SCROLLBACK_LINES = 2000
+DEFAULT_SCROLLBACK_PAGE = 500
+MAX_SCROLLBACK_LINES = 100000
+
+
+class SerialScrollback:
+    """
+    Ring of a session's most recent lines (UTF-8 bytes plus capture time) for late joiners
+    Every line gets a sequence number, so clients page back with a 'before' cursor
+    """
+
+    def __init__(self, capacity=DEFAULT_SCROLLBACK_LINES):
+        self.capacity = min(max(1, int(capacity)), MAX_SCROLLBACK_LINES)
+        self.lines = [b''] * self.capacity
+        self.timestamps = [0.0] * self.capacity
+        self.next_seq = 0  # Sequence number of the next line appended
+        self.lock = threading.Lock()
+
+    def append(self, line, timestamp):
+        with self.lock:
+            slot = self.next_seq % self.capacity
+            self.lines[slot] = line.encode('utf-8')
+            self.timestamps[slot] = timestamp
+            self.next_seq += 1
+
+    def page(self, before=None, limit=DEFAULT_SCROLLBACK_PAGE):
+        """
+        Up to `limit` lines older than sequence `before` (the newest lines when None), oldest first
+        'cursor' is the 'before' value for the next older page; 'more' says whether one exists
+        """
+        limit = max(1, int(limit))
+        with self.lock:
+            oldest = max(0, self.next_seq - self.capacity)
+            end = self.next_seq if before is None else min(max(int(before), oldest), self.next_seq)
+            start = max(oldest, end - limit)
+            slots = [seq % self.capacity for seq in range(start, end)]
+            lines = [self.lines[slot] for slot in slots]
+            timestamps = [self.timestamps[slot] for slot in slots]
+        return {
+            'lines': [line.decode('utf-8', 'ignore') for line in lines],
+            'timestamps': timestamps,
+            'start': start,
+            'end': end,
+            'cursor': start,
+            'more': start > oldest
+        }
+
+    def clear(self):
+        with self.lock:
+            self.next_seq = 0
+
+    def get_status(self):
+        """Get scrollback fill level"""
+        return {
+            'capacity': self.capacity,
+            'lines': min(self.next_seq, self.capacity),
+            'total_lines': self.next_seq
+        }
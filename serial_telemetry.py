@@ -0,0 +1,211 @@
+"""
+Serial Telemetry Module
+Binary framed telemetry (COBS or length-prefixed) decoded into typed channel arrays with NumPy
+Separated from app.py so packed firmware samples skip text decoding and regex parsing entirely
+"""
+
+import numpy as np
+
+FRAMING_COBS = 'cobs'  # Zero-delimited COBS frames
+FRAMING_LENGTH = 'length'  # Sync byte + length prefix + payload
+TELEMETRY_FRAMINGS = (FRAMING_COBS, FRAMING_LENGTH)
+
+DEFAULT_SYNC_BYTE = 0xA5
+MAX_FRAME_SIZE = 1024  # Larger payloads are treated as line noise and dropped
+
+# Layout field types -> NumPy scalar codes, byte order is applied per layout
+FIELD_TYPES = {
+    'u8': 'u1', 'i8': 'i1',
+    'u16': 'u2', 'i16': 'i2',
+    'u32': 'u4', 'i32': 'i4',
+    'u64': 'u8', 'i64': 'i8',
+    'f32': 'f4', 'f64': 'f8'
+}
+BYTE_ORDERS = {'little': '<', 'big': '>'}
+
+
+def cobs_decode(frame):
+    """Decode one COBS frame (without its zero delimiter); returns None if malformed"""
+    out = bytearray()
+    pos = 0
+    end = len(frame)
+    while pos < end:
+        code = frame[pos]
+        if code == 0:
+            return None
+        block_end = pos + code
+        if block_end > end:
+            return None
+        out += frame[pos + 1:block_end]
+        pos = block_end
+        # A full 0xFF block carries no implicit zero, nor does the final block
+        if code != 0xFF and pos < end:
+            out.append(0)
+    return bytes(out)
+
+
+def build_layout_dtype(fields, byte_order='little'):
+    """
+    Build a packed NumPy structured dtype from a layout
+    fields: list of [name, type] pairs or {'name', 'type'} dicts, types from FIELD_TYPES
+    Fields whose name starts with '_' are padding/header bytes and are not reported as channels
+    """
+    prefix = BYTE_ORDERS.get(byte_order)
+    if prefix is None:
+        raise ValueError(f"Unknown byte order '{byte_order}'")
+    if not fields:
+        raise ValueError('Telemetry layout needs at least one field')
+
+    names = []
+    formats = []
+    for field in fields:
+        if isinstance(field, dict):
+            name, field_type = field.get('name'), field.get('type')
+        else:
+            name, field_type = field
+        if not name or not isinstance(name, str):
+            raise ValueError('Telemetry field names must be non-empty strings')
+        if name in names:
+            raise ValueError(f"Duplicate telemetry field '{name}'")
+        code = FIELD_TYPES.get(field_type)
+        if code is None:
+            raise ValueError(f"Unknown telemetry field type '{field_type}'")
+        names.append(name)
+        formats.append(prefix + code)
+    return np.dtype({'names': names, 'formats': formats})  # Packed - no alignment padding
+
+
+class TelemetryDecoder:
+    """
+    Splits a serial byte stream into binary frames and unpacks each read's frames in one
+    np.frombuffer call over the structured layout dtype
+    """
+
+    def __init__(self, fields, framing=FRAMING_COBS, byte_order='little', sync_byte=DEFAULT_SYNC_BYTE):
+        if framing not in TELEMETRY_FRAMINGS:
+            raise ValueError(f"Unknown telemetry framing '{framing}'")
+        self.dtype = build_layout_dtype(fields, byte_order)
+        self.frame_size = self.dtype.itemsize
+        if self.frame_size > MAX_FRAME_SIZE or (framing == FRAMING_LENGTH and self.frame_size > 0xFF):
+            raise ValueError('Telemetry layout is too large for one frame')
+        self.channels = [name for name in self.dtype.names if not name.startswith('_')]
+        self.framing = framing
+        self.sync_byte = int(sync_byte) & 0xFF
+        self.buffer = bytearray()
+        self.frames_decoded = 0
+        self.frames_dropped = 0  # Malformed frames or payloads that don't match the layout, one per resync
+        self.bytes_received = 0
+        self.bytes_skipped = 0  # Bytes discarded while looking for the next frame header
+        self.resyncing = False  # Bytes were skipped since the last complete frame
+
+    def _split_cobs(self, payloads):
+        """Cut complete zero-delimited frames from the buffer"""
+        buffer = self.buffer
+        start = 0
+        while True:
+            end = buffer.find(0, start)
+            if end < 0:
+                break
+            if end > start:
+                payload = cobs_decode(bytes(buffer[start:end]))
+                if payload is not None and len(payload) == self.frame_size:
+                    payloads.append(payload)
+                else:
+                    self.frames_dropped += 1
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > MAX_FRAME_SIZE + 2:
+            # No delimiter in far more bytes than a frame can hold - resynchronise
+            self.frames_dropped += 1
+            buffer.clear()
+
+    def _split_length(self, payloads):
+        """Cut complete sync + length + payload frames from the buffer"""
+        buffer = self.buffer
+        start = 0
+        last_end = 0  # End of the last frame cut in this pass - a header further on means bytes were skipped
+        framed = 0
+        size = self.frame_size
+        while True:
+            sync = buffer.find(self.sync_byte, start)
+            if sync < 0:
+                start = len(buffer)
+                break
+            if sync + 2 > len(buffer):
+                start = sync
+                break
+            length = buffer[sync + 1]
+            if length != size:
+                # Not a frame header after all (a sync value in a payload or line noise) - rescan from the next byte
+                start = sync + 1
+                continue
+            end = sync + 2 + length
+            if end > len(buffer):
+                start = sync
+                break
+            if sync > last_end or self.resyncing:
+                # The skipped run was one lost frame, however many false sync bytes it held
+                self.frames_dropped += 1
+                self.resyncing = False
+            payloads.append(bytes(buffer[sync + 2:end]))
+            framed += end - sync
+            start = last_end = end
+        del buffer[:start]
+        self.bytes_skipped += start - framed
+        if start > last_end:
+            self.resyncing = True
+
+    def feed(self, data):
+        """
+        Add raw bytes; returns {channel: ndarray} for the frames completed by this read,
+        or None when no frame completed
+        """
+        self.bytes_received += len(data)
+        self.buffer += data
+        payloads = []
+        if self.framing == FRAMING_COBS:
+            self._split_cobs(payloads)
+        else:
+            self._split_length(payloads)
+        if not payloads:
+            return None
+
+        # One vectorized unpack for the whole read
+        records = np.frombuffer(b''.join(payloads), dtype=self.dtype)
+        self.frames_decoded += len(records)
+        return {name: records[name] for name in self.channels}
+
+    def reset(self):
+        self.buffer.clear()
+        self.resyncing = False
+
+    def get_status(self):
+        """Get decoder statistics"""
+        return {
+            'framing': self.framing,
+            'frame_size': self.frame_size,
+            'channels': self.channels,
+            'frames_decoded': self.frames_decoded,
+            'frames_dropped': self.frames_dropped,
+            'bytes_skipped': self.bytes_skipped,
+            'bytes_received': self.bytes_received,
+            'buffered_bytes': len(self.buffer)
+        }
+
+
+def create_telemetry_decoder(option):
+    """
+    Build a decoder from the client's 'telemetry' start option
+    option: {'fields': [[name, type], ...], 'framing': 'cobs'|'length', 'byte_order': 'little'|'big', 'sync_byte': int}
+    Returns None for text mode; raises ValueError for an invalid layout
+    """
+    if not option:
+        return None
+    if not isinstance(option, dict):
+        raise ValueError('Telemetry option must be an object')
+    return TelemetryDecoder(
+        option.get('fields'),
+        framing=option.get('framing', FRAMING_COBS),
+        byte_order=option.get('byte_order', 'little'),
+        sync_byte=option.get('sync_byte', DEFAULT_SYNC_BYTE)
+    )
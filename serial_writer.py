@@ -0,0 +1,159 @@
+"""
+Serial Writer Module
+Per-port write scheduler - control values coalesce (latest wins), manual lines keep strict order
+Separated from app.py so Socket.IO and HTTP handlers never block on the serial port
+"""
+
+import time
+import threading
+from collections import deque, OrderedDict
+
+# Default cap on control writes per second per port - a slider drag sends far more than a motor can use
+DEFAULT_CONTROL_RATE_HZ = 50
+BITS_PER_BYTE = 10  # 8N1 framing: start bit + 8 data bits + stop bit
+
+
+class SerialWriter:
+    """
+    Writer thread with a FIFO for manual lines and a latest-wins slot per control
+    Writes are paced by the wire time of each line at the port's baud rate, and control
+    writes additionally by control_rate_hz, so the device's RX buffer never backs up
+    """
+
+    def __init__(self, write_line, baudrate=9600, control_rate_hz=DEFAULT_CONTROL_RATE_HZ):
+        self.write_line = write_line
+        self.baudrate = max(1, int(baudrate))
+        self.set_control_rate(control_rate_hz)
+        self.manual = deque()  # Raw lines from send_serial_data, strict order
+        self.controls = OrderedDict()  # control id -> latest command, oldest pending first
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.next_write = 0.0  # Wire is busy until this monotonic time
+        self.next_control_write = 0.0
+        self.writes = 0
+        self.manual_writes = 0
+        self.control_writes = 0
+        self.dropped_intermediate = 0
+        self.errors = 0
+
+    def set_control_rate(self, control_rate_hz):
+        """Change the control write rate; 0 or None paces by baud rate only"""
+        if control_rate_hz:
+            self.control_interval = 1.0 / max(float(control_rate_hz), 0.1)
+        else:
+            self.control_interval = 0.0
+
+    def start(self):
+        """Start the writer thread"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._write_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop the writer thread; pending writes are discarded"""
+        with self.condition:
+            self.running = False
+            self.manual.clear()
+            self.controls.clear()
+            self.condition.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def send_line(self, line):
+        """Queue a manual line - never coalesced or reordered"""
+        with self.condition:
+            self.manual.append(line)
+            self.condition.notify()
+
+    def send_control(self, control_id, command):
+        """Queue a control command; an unsent earlier command for the same control is replaced"""
+        with self.condition:
+            if control_id in self.controls:
+                self.dropped_intermediate += 1
+            self.controls[control_id] = command
+            self.condition.notify()
+
+    def send_now(self, line):
+        """
+        Write a line on the caller's thread, ahead of anything queued - for timed sequences
+        The wire is still reserved afterwards, so queued lines wait for it to drain
+        """
+        self.write_line(line)
+        with self.condition:
+            self.writes += 1
+            self.manual_writes += 1
+            self.next_write = max(self.next_write, time.monotonic() + (len(line) + 1) * BITS_PER_BYTE / self.baudrate)
+            self.condition.notify()
+
+    def queue_depth(self):
+        """Number of lines waiting to be written"""
+        with self.condition:
+            return len(self.manual) + len(self.controls)
+
+    def _next_item(self, now):
+        """
+        Pick the next line to write, or return the time to wait - caller holds the condition
+        Manual lines go first; control commands wait for their rate slot
+        """
+        if now < self.next_write:
+            return None, self.next_write - now
+        if self.manual:
+            return ('manual', self.manual.popleft()), 0
+        if self.controls:
+            if now < self.next_control_write:
+                return None, self.next_control_write - now
+            _, command = self.controls.popitem(last=False)
+            return ('control', command), 0
+        return None, None
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    item, wait = self._next_item(time.monotonic())
+                    if item:
+                        break
+                    self.condition.wait(wait)
+
+            kind, line = item
+            try:
+                self.write_line(line)
+                self.writes += 1
+                if kind == 'manual':
+                    self.manual_writes += 1
+                else:
+                    self.control_writes += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Serial write error: {e}")
+
+            # Hold the wire for as long as the line takes to transmit
+            now = time.monotonic()
+            self.next_write = now + (len(line) + 1) * BITS_PER_BYTE / self.baudrate
+            if kind == 'control':
+                self.next_control_write = now + self.control_interval
+
+    def get_status(self):
+        """Get writer statistics"""
+        with self.condition:
+            manual_depth = len(self.manual)
+            control_depth = len(self.controls)
+        return {
+            'queue_depth': manual_depth + control_depth,
+            'manual_pending': manual_depth,
+            'control_pending': control_depth,
+            'control_rate_hz': (1.0 / self.control_interval) if self.control_interval else None,
+            'writes': self.writes,
+            'manual_writes': self.manual_writes,
+            'control_writes': self.control_writes,
+            'dropped_intermediate': self.dropped_intermediate,
+            'errors': self.errors
+        }
@@ -0,0 +1,176 @@
+"""
+Virtual Serial Device
+pty-based stand-in for a board - replays recorded firmware output and answers commands
+Lets the serial monitor, hub controls and benchmarks run without hardware (Linux/macOS only)
+
+Run standalone and point the serial monitor at the printed port:
+    python virtual_serial.py benchmarks/firmware_corpus.txt --rate 100 --baud 115200
+"""
+
+import argparse
+import os
+import threading
+import time
+import tty
+
+BITS_PER_BYTE = 10  # 8N1 framing
+
+
+def load_corpus(path):
+    """Read a recorded firmware log; blank lines are skipped since the monitor never emits them"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as corpus:
+        return [line.rstrip('\r\n') for line in corpus if line.strip()]
+
+
+class VirtualSerialDevice:
+    """
+    Replays lines through a pty at a fixed line rate and/or baud rate
+    Lines written to the port by the host are echoed back or answered from a response table
+    """
+
+    def __init__(self, lines, line_rate=None, baudrate=None, loop=True, echo=True, responses=None):
+        self.lines = list(lines)
+        self.line_rate = line_rate  # Lines per second, None for as fast as the baud rate allows
+        self.baudrate = baudrate  # Paces output like a real UART, None for no wire delay
+        self.loop = loop  # Restart the corpus when it runs out
+        self.echo = echo
+        self.responses = dict(responses or {})  # command -> reply line(s)
+        self.master = None
+        self.slave = None
+        self.port = None
+        self.running = False
+        self.threads = []
+        self.write_lock = threading.Lock()
+        self.max_lines = None
+        self.sent_times = []  # perf_counter() when each replayed line was written
+        self.commands_received = []
+        self.done = threading.Event()
+
+    def open(self):
+        """Create the pty; returns the port path to open with pyserial"""
+        if self.master is None:
+            self.master, self.slave = os.openpty()
+            tty.setraw(self.master)
+            tty.setraw(self.slave)
+            self.port = os.ttyname(self.slave)
+        return self.port
+
+    def start(self, max_lines=None):
+        """
+        Start replaying, creating the pty if needed; returns the port path
+        Open the port before calling this when every line matters - pyserial flushes input on open
+        """
+        self.open()
+        self.max_lines = max_lines
+        self.sent_times = []
+        self.done.clear()
+        self.running = True
+        for target in (self._replay_loop, self._command_loop):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        return self.port
+
+    def stop(self):
+        self.running = False
+        self.done.set()
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self.threads = []
+        self.master = self.slave = None
+
+    def _write(self, text):
+        data = (text + '\n').encode('utf-8')
+        with self.write_lock:
+            view = memoryview(data)
+            while view:
+                written = os.write(self.master, view)
+                view = view[written:]
+        return len(data)
+
+    def _replay_loop(self):
+        interval = 1.0 / self.line_rate if self.line_rate else 0.0
+        next_send = time.perf_counter()
+        index = 0
+        try:
+            while self.running:
+                if self.max_lines is not None and len(self.sent_times) >= self.max_lines:
+                    break
+                if index >= len(self.lines):
+                    if not self.loop or not self.lines:
+                        break
+                    index = 0
+
+                now = time.perf_counter()
+                if next_send > now:
+                    time.sleep(next_send - now)
+                self.sent_times.append(time.perf_counter())
+                size = self._write(self.lines[index])
+                index += 1
+
+                next_send += interval
+                if self.baudrate:
+                    # The next line can't start before this one has left the wire
+                    next_send = max(next_send, time.perf_counter() + size * BITS_PER_BYTE / self.baudrate)
+        except OSError:
+            pass  # pty closed by stop()
+        self.done.set()
+
+    def _command_loop(self):
+        buffer = b''
+        try:
+            while self.running:
+                data = os.read(self.master, 1024)
+                if not data:
+                    break
+                buffer += data
+                *commands, buffer = buffer.split(b'\n')
+                for raw in commands:
+                    command = raw.decode('utf-8', 'ignore').strip()
+                    if command:
+                        self.commands_received.append(command)
+                        self._respond(command)
+        except OSError:
+            pass
+
+    def _respond(self, command):
+        reply = self.responses.get(command)
+        if reply is None and self.echo:
+            reply = command
+        if reply is None:
+            return
+        for line in (reply if isinstance(reply, (list, tuple)) else [reply]):
+            self._write(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded firmware output on a virtual serial port')
+    parser.add_argument('corpus', help='Text file of recorded serial output')
+    parser.add_argument('--rate', type=float, default=10.0, help='Lines per second (0 = limited by baud only)')
+    parser.add_argument('--baud', type=int, default=115200, help='Simulated baud rate (0 = no wire delay)')
+    parser.add_argument('--once', action='store_true', help='Play the corpus once instead of looping')
+    parser.add_argument('--no-echo', action='store_true', help="Don't echo received commands")
+    args = parser.parse_args()
+
+    device = VirtualSerialDevice(load_corpus(args.corpus), line_rate=args.rate or None,
+                                 baudrate=args.baud or None, loop=not args.once, echo=not args.no_echo)
+    port = device.start()
+    print(f'Virtual serial device on {port} - Ctrl+C to stop')
+    try:
+        while not device.done.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    device.stop()
+
+
+if __name__ == '__main__':
+    main()